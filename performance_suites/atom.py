@@ -0,0 +1,80 @@
+from pyperform import BenchmarkedFunction
+from pyrsistent import atom, pmap, inc #!
+from threading import Lock, Thread #!
+
+
+class Benchmarked(BenchmarkedFunction):
+    def __init__(self, scale=1, *args, **kwargs):
+        super(Benchmarked, self).__init__(*args, timeit_number=scale*10, **kwargs)
+
+# Each benchmark performs 8000 updates of a counter in a shared pmap,
+# split between 1, 2, 4 or 8 threads.
+
+def _atom():
+    state = atom(pmap({'count': 0}))
+
+    def update(iterations):
+        for _ in range(iterations):
+            state.transform(['count'], inc)
+
+    def run_threads(n):
+        threads = [Thread(target=update, args=(8000 // n,)) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+def _locked():
+    state = [pmap({'count': 0})]
+    lock = Lock()
+
+    def update(iterations):
+        for _ in range(iterations):
+            with lock:
+                state[0] = state[0].transform(['count'], inc)
+
+    def run_threads(n):
+        threads = [Thread(target=update, args=(8000 // n,)) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+################# Atom ###################
+
+@Benchmarked(setup=_atom)
+def atom_swap_1_thread():
+    run_threads(1)
+
+@Benchmarked(setup=_atom)
+def atom_swap_2_threads():
+    run_threads(2)
+
+@Benchmarked(setup=_atom)
+def atom_swap_4_threads():
+    run_threads(4)
+
+@Benchmarked(setup=_atom)
+def atom_swap_8_threads():
+    run_threads(8)
+
+
+################# Lock ###################
+
+@Benchmarked(setup=_locked)
+def reference_locked_update_1_thread():
+    run_threads(1)
+
+@Benchmarked(setup=_locked)
+def reference_locked_update_2_threads():
+    run_threads(2)
+
+@Benchmarked(setup=_locked)
+def reference_locked_update_4_threads():
+    run_threads(4)
+
+@Benchmarked(setup=_locked)
+def reference_locked_update_8_threads():
+    run_threads(8)
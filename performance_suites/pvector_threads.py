@@ -0,0 +1,45 @@
+from pyperform import BenchmarkedFunction
+from pyrsistent import pvector #!
+from threading import Thread #!
+
+
+class Benchmarked(BenchmarkedFunction):
+    def __init__(self, scale=1, *args, **kwargs):
+        super(Benchmarked, self).__init__(*args, timeit_number=scale*10, **kwargs)
+
+# Each benchmark performs 8000 updates and reads of a shared vector, split between
+# 1, 2, 4 or 8 threads. On free-threaded builds the run time should drop with the
+# number of threads, with the GIL it stays roughly constant.
+
+def _shared_vector():
+    shared_vector = pvector(range(100000))
+
+    def update(iterations):
+        v = shared_vector
+        for i in range(iterations):
+            v = shared_vector.set(i, -1).append(i)
+            v[i // 2]
+
+    def run_threads(n):
+        threads = [Thread(target=update, args=(8000 // n,)) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+@Benchmarked(setup=_shared_vector)
+def shared_vector_update_1_thread():
+    run_threads(1)
+
+@Benchmarked(setup=_shared_vector)
+def shared_vector_update_2_threads():
+    run_threads(2)
+
+@Benchmarked(setup=_shared_vector)
+def shared_vector_update_4_threads():
+    run_threads(4)
+
+@Benchmarked(setup=_shared_vector)
+def shared_vector_update_8_threads():
+    run_threads(8)
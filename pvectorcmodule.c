@@ -8,6 +8,12 @@ Please note that they are anything but immutable at this level since
 there is a whole lot of reference counting going on. That's the way
 CPython works though and the GIL makes them appear immutable.
 
+On free-threaded builds (Py_GIL_DISABLED) the module runs without the GIL.
+Node reference counts are then updated atomically and each thread has its
+own node cache. Vectors are never modified once created and can be shared
+freely between threads, evolvers must not be used from several threads at
+the same time.
+
 To the programmer using them from Python they appear immutable and
 behave immutably at least.
 
@@ -33,14 +39,40 @@ typedef struct {
   unsigned int refCount;
 } VNode;
 
-#define NODE_CACHE_MAX_SIZE 1024
-
-typedef struct {
-  unsigned int size;
-  VNode* nodes[NODE_CACHE_MAX_SIZE];
-} vNodeCache;
+/*
+ Released nodes are kept in a cache, a free list linked through the first item of
+ the nodes, for reuse. The maximum number of cached nodes can be changed at runtime
+ with set_node_cache_size(). The allocator also keeps the counters returned by stats().
+
+ On free-threaded builds each thread has its own cache and counters, the counters of
+ all threads are linked together so that they can be summed up by stats(). The
+ allocator of a thread, including its cached nodes, is kept after the thread has
+ exited so the default cache size is smaller there to bound the memory held by
+ allocators of threads that are gone.
+*/
+#ifdef Py_GIL_DISABLED
+#define DEFAULT_NODE_CACHE_SIZE 256
+#else
+#define DEFAULT_NODE_CACHE_SIZE 1024
+#endif
 
-static vNodeCache nodeCache;
+typedef struct vNodeAllocator {
+  VNode *freeList;
+  Py_ssize_t cached;
+  Py_ssize_t allocations;
+  Py_ssize_t cacheHits;
+  Py_ssize_t frees;
+  Py_ssize_t copies;
+  struct vNodeAllocator *next;
+} vNodeAllocator;
+
+#ifdef Py_GIL_DISABLED
+#  if defined(_MSC_VER)
+#    define THREAD_LOCAL __declspec(thread)
+#  else
+#    define THREAD_LOCAL _Thread_local
+#  endif
+#endif
 
 typedef struct {
   PyObject_HEAD
@@ -80,29 +112,145 @@ static PyMemberDef PVector_members[] = {
 #define debug(...)
 // #define debug printf
 
+// Py_TRASHCAN_SAFE_BEGIN/END are deprecated since 3.11 and removed in 3.13
+#if PY_VERSION_HEX >= 0x03080000
+#define TRASHCAN_BEGIN(op, dealloc) Py_TRASHCAN_BEGIN(op, dealloc)
+#define TRASHCAN_END(op) Py_TRASHCAN_END
+#else
+#define TRASHCAN_BEGIN(op, dealloc) Py_TRASHCAN_SAFE_BEGIN(op)
+#define TRASHCAN_END(op) Py_TRASHCAN_SAFE_END(op)
+#endif
+
+/*
+ Nodes are shared between vectors that may be created and released concurrently
+ on free-threaded builds so the reference counts must be updated atomically there.
+ DEC_AND_TEST_NODE_REF_COUNT evaluates to true if the last reference was released.
+*/
+#if defined(Py_GIL_DISABLED) && defined(_MSC_VER)
+#include <intrin.h>
+#define NODE_REF_COUNT(n) ((unsigned int)_InterlockedOr((volatile long*)&(n)->refCount, 0))
+#define SET_NODE_REF_COUNT(n, c) (_InterlockedExchange((volatile long*)&(n)->refCount, (long)(c)))
+#define INC_NODE_REF_COUNT(n) (_InterlockedIncrement((volatile long*)&(n)->refCount))
+#define DEC_NODE_REF_COUNT(n) (_InterlockedDecrement((volatile long*)&(n)->refCount))
+#define DEC_AND_TEST_NODE_REF_COUNT(n) (_InterlockedDecrement((volatile long*)&(n)->refCount) == 0)
+#elif defined(Py_GIL_DISABLED)
+#define NODE_REF_COUNT(n) (__atomic_load_n(&(n)->refCount, __ATOMIC_ACQUIRE))
+#define SET_NODE_REF_COUNT(n, c) (__atomic_store_n(&(n)->refCount, (c), __ATOMIC_RELEASE))
+#define INC_NODE_REF_COUNT(n) (__atomic_fetch_add(&(n)->refCount, 1, __ATOMIC_RELAXED))
+#define DEC_NODE_REF_COUNT(n) (__atomic_fetch_sub(&(n)->refCount, 1, __ATOMIC_ACQ_REL))
+#define DEC_AND_TEST_NODE_REF_COUNT(n) (__atomic_sub_fetch(&(n)->refCount, 1, __ATOMIC_ACQ_REL) == 0)
+#else
 #define NODE_REF_COUNT(n) ((n)->refCount)
 #define SET_NODE_REF_COUNT(n, c) (NODE_REF_COUNT(n) = (c))
 #define INC_NODE_REF_COUNT(n) (NODE_REF_COUNT(n)++)
 #define DEC_NODE_REF_COUNT(n) (NODE_REF_COUNT(n)--)
+#define DEC_AND_TEST_NODE_REF_COUNT(n) (--NODE_REF_COUNT(n) == 0)
+#endif
+
+#if defined(Py_GIL_DISABLED) && defined(_MSC_VER)
+#define LOAD_SSIZE(v) ((Py_ssize_t)_InterlockedOr64((volatile __int64*)&(v), 0))
+#define STORE_SSIZE(v, x) (_InterlockedExchange64((volatile __int64*)&(v), (__int64)(x)))
+#define LOAD_PTR(p) (_InterlockedCompareExchangePointer((void* volatile*)&(p), NULL, NULL))
+// Evaluates to true if p was expected and has been replaced by x, else loads p into expected
+#define CAS_PTR(p, expected, x) casPtr((void* volatile*)&(p), (void**)&(expected), (x))
+static int casPtr(void* volatile *p, void **expected, void *x) {
+  void *previous = _InterlockedCompareExchangePointer(p, x, *expected);
+  if(previous == *expected) {
+    return 1;
+  }
+
+  *expected = previous;
+  return 0;
+}
+#elif defined(Py_GIL_DISABLED)
+#define LOAD_SSIZE(v) (__atomic_load_n(&(v), __ATOMIC_RELAXED))
+#define STORE_SSIZE(v, x) (__atomic_store_n(&(v), (x), __ATOMIC_RELAXED))
+#define LOAD_PTR(p) (__atomic_load_n(&(p), __ATOMIC_ACQUIRE))
+#define CAS_PTR(p, expected, x) (__atomic_compare_exchange_n(&(p), &(expected), (x), 1, __ATOMIC_RELEASE, __ATOMIC_ACQUIRE))
+#else
+#define LOAD_SSIZE(v) (v)
+#define STORE_SSIZE(v, x) ((v) = (x))
+#endif
+
+// Counters are only ever updated by the thread owning them but may be read concurrently
+#define STAT_ADD(a, field, n) STORE_SSIZE((a)->field, (a)->field + (n))
+
+static Py_ssize_t nodeCacheSize = DEFAULT_NODE_CACHE_SIZE;
+
+#ifdef Py_GIL_DISABLED
+// Used if the allocator of a thread cannot be allocated. It is shared between threads
+// so it never caches nodes and its counters are approximate.
+static vNodeAllocator fallbackAllocator;
+
+static THREAD_LOCAL vNodeAllocator *threadAllocator = NULL;
+static vNodeAllocator *allAllocators = &fallbackAllocator;
+
+static vNodeAllocator* nodeAllocator(void) {
+  vNodeAllocator *allocator = threadAllocator;
+  if(allocator != NULL) {
+    return allocator;
+  }
+
+  // Never freed, the counters of a thread that has exited are still part of the totals
+  allocator = PyMem_RawCalloc(1, sizeof(vNodeAllocator));
+  if(allocator == NULL) {
+    return &fallbackAllocator;
+  }
+
+  allocator->next = LOAD_PTR(allAllocators);
+  while(!CAS_PTR(allAllocators, allocator->next, allocator)) {
+  }
+
+  threadAllocator = allocator;
+  return allocator;
+}
+
+#define FIRST_ALLOCATOR() ((vNodeAllocator*)LOAD_PTR(allAllocators))
+#define CACHE_SIZE(a) ((a) == &fallbackAllocator ? 0 : LOAD_SSIZE(nodeCacheSize))
+#else
+static vNodeAllocator globalAllocator;
+
+#define nodeAllocator() (&globalAllocator)
+#define FIRST_ALLOCATOR() (&globalAllocator)
+#define CACHE_SIZE(a) (nodeCacheSize)
+#endif
 
 static VNode* allocNode(void) {
-  if(nodeCache.size > 0) {
-    nodeCache.size--;
-    return nodeCache.nodes[nodeCache.size];
+  vNodeAllocator *allocator = nodeAllocator();
+  VNode *result = allocator->freeList;
+  STAT_ADD(allocator, allocations, 1);
+  if(result != NULL) {
+    allocator->freeList = result->items[0];
+    STAT_ADD(allocator, cached, -1);
+    STAT_ADD(allocator, cacheHits, 1);
+    return result;
   }
 
   return PyMem_Malloc(sizeof(VNode));
 }
 
 static void freeNode(VNode *node) {
-  if(nodeCache.size < NODE_CACHE_MAX_SIZE) {
-    nodeCache.nodes[nodeCache.size] = node;
-    nodeCache.size++;
+  vNodeAllocator *allocator = nodeAllocator();
+  STAT_ADD(allocator, frees, 1);
+  if(allocator->cached < CACHE_SIZE(allocator)) {
+    node->items[0] = allocator->freeList;
+    allocator->freeList = node;
+    STAT_ADD(allocator, cached, 1);
   } else {
     PyMem_Free(node);
   }
 }
 
+static void trimNodeCache(Py_ssize_t size) {
+  vNodeAllocator *allocator = nodeAllocator();
+  while(allocator->cached > size) {
+    VNode *node = allocator->freeList;
+    allocator->freeList = node->items[0];
+    STAT_ADD(allocator, cached, -1);
+    PyMem_Free(node);
+  }
+}
+
 static VNode* newNode(void) {
   VNode* result = allocNode();
   memset(result, 0x0, sizeof(VNode));
@@ -116,6 +264,7 @@ static VNode* copyNode(VNode* source) {
          hold direct references to python objects but only to other nodes. */
   int i;
   VNode* result = allocNode();
+  STAT_ADD(nodeAllocator(), copies, 1);
   debug("copyNode() %p\n", result);
   memcpy(result->items, source->items, sizeof(source->items));
   
@@ -197,9 +346,8 @@ static void releaseNode(int level, VNode *node) {
 
   int i;
 
-  DEC_NODE_REF_COUNT(node);
-  debug("Refcount when trying to release: %u\n", NODE_REF_COUNT(node));
-  if(NODE_REF_COUNT(node) == 0) {
+  // Decrement and test in one step, another thread may release the node concurrently
+  if(DEC_AND_TEST_NODE_REF_COUNT(node)) {
     if(level > 0) {
       for(i = 0; i < BRANCH_FACTOR; i++) {
         if(node->items[i] != NULL) {
@@ -232,13 +380,13 @@ static void PVector_dealloc(PVector *self) {
   }
   
   PyObject_GC_UnTrack((PyObject*)self);
-  Py_TRASHCAN_SAFE_BEGIN(self);
+  TRASHCAN_BEGIN(self, PVector_dealloc);
 
   releaseNode(0, self->tail);
   releaseNode(self->shift, self->root);
   
   PyObject_GC_Del(self);
-  Py_TRASHCAN_SAFE_END(self);
+  TRASHCAN_END(self);
 }
 
 static PyObject *PVector_toList(PVector *self) {
@@ -523,6 +671,512 @@ static PyObject* PVector_pickle_reduce(PVector *self) {
   return result_tuple;
 }
 
+#if PY_VERSION_HEX >= 0x03080000
+/*
+ Pickle protocol 5 support. Vectors of at least OUT_OF_BAND_MIN_SIZE elements that only
+ contain floats, or only ints that fit in 64 bits, are pickled as a single PickleBuffer
+ holding the packed values. The buffer can be transferred out of band and is otherwise
+ written as one block instead of one pickled object per element.
+*/
+#define OUT_OF_BAND_MIN_SIZE 256
+
+/* Returns a bytearray with the packed elements or NULL, without an error set, if
+   the elements are not all of one of the supported types. */
+static PyObject* packPrimitives(PVector *self, char *typeCode) {
+  PyObject *first = _get_item(self, 0);
+  PyObject *data;
+  PyObject *item;
+  char *dest;
+  VNode *node;
+  Py_ssize_t i, j, blockSize;
+  PY_LONG_LONG longValue;
+  double doubleValue;
+  int overflow;
+
+  if(PyFloat_CheckExact(first)) {
+    *typeCode = 'd';
+  } else if(PyLong_CheckExact(first)) {
+    *typeCode = 'q';
+  } else {
+    return NULL;
+  }
+
+  data = PyByteArray_FromStringAndSize(NULL, self->count * 8);
+  if(data == NULL) {
+    return NULL;
+  }
+
+  dest = PyByteArray_AS_STRING(data);
+  for(i = 0; i < self->count; i += BRANCH_FACTOR) {
+    node = nodeFor(self, i);
+    blockSize = (self->count - i) < BRANCH_FACTOR ? (self->count - i) : BRANCH_FACTOR;
+    for(j = 0; j < blockSize; j++, dest += 8) {
+      item = (PyObject*)node->items[j];
+      if(*typeCode == 'd') {
+        if(!PyFloat_CheckExact(item)) {
+          goto not_primitive;
+        }
+
+        doubleValue = PyFloat_AS_DOUBLE(item);
+        memcpy(dest, &doubleValue, 8);
+      } else {
+        if(!PyLong_CheckExact(item)) {
+          goto not_primitive;
+        }
+
+        longValue = PyLong_AsLongLongAndOverflow(item, &overflow);
+        if(overflow) {
+          goto not_primitive;
+        }
+
+        memcpy(dest, &longValue, 8);
+      }
+    }
+  }
+
+  return data;
+
+not_primitive:
+  Py_DECREF(data);
+  return NULL;
+}
+
+static PyObject* PVector_pickle_reduce_ex(PVector *self, PyObject *protocolObj) {
+  long protocol = PyLong_AsLong(protocolObj);
+  if(protocol == -1 && PyErr_Occurred()) {
+    return NULL;
+  }
+
+  if(protocol >= 5 && self->count >= OUT_OF_BAND_MIN_SIZE) {
+    char typeCode;
+    PyObject *data = packPrimitives(self, &typeCode);
+    if(data != NULL) {
+      PyObject *buffer = PyPickleBuffer_FromObject(data);
+      Py_DECREF(data);
+      if(buffer == NULL) {
+        return NULL;
+      }
+
+      PyObject* module = PyImport_ImportModule("pvectorc");
+      if(module == NULL) {
+        Py_DECREF(buffer);
+        return NULL;
+      }
+
+      PyObject* from_buffer_fn = PyObject_GetAttrString(module, "_pvector_from_buffer");
+      Py_DECREF(module);
+      if(from_buffer_fn == NULL) {
+        Py_DECREF(buffer);
+        return NULL;
+      }
+
+      return Py_BuildValue("(N(CNs))", from_buffer_fn, typeCode, buffer, PY_LITTLE_ENDIAN ? "little" : "big");
+    }
+
+    if(PyErr_Occurred()) {
+      return NULL;
+    }
+  }
+
+  return PVector_pickle_reduce(self);
+}
+
+static PyObject* pyrsistent_pvector_from_buffer(PyObject *self, PyObject *args) {
+  int typeCode;
+  Py_buffer buffer;
+  const char *byteOrder;
+  unsigned char bytes[8];
+  unsigned char tmp;
+  PY_LONG_LONG longValue;
+  double doubleValue;
+  PyObject *item;
+  PVector *result;
+  Py_ssize_t i;
+  int k, swap;
+
+  if(!PyArg_ParseTuple(args, "Cy*s", &typeCode, &buffer, &byteOrder)) {
+    return NULL;
+  }
+
+  if((typeCode != 'd' && typeCode != 'q') || (buffer.len % 8) != 0 ||
+     (strcmp(byteOrder, "little") != 0 && strcmp(byteOrder, "big") != 0)) {
+    PyBuffer_Release(&buffer);
+    PyErr_SetString(PyExc_ValueError, "Invalid vector buffer");
+    return NULL;
+  }
+
+  swap = strcmp(byteOrder, PY_LITTLE_ENDIAN ? "little" : "big") != 0;
+  result = emptyNewPvec();
+  for(i = 0; i < buffer.len; i += 8) {
+    memcpy(bytes, (char*)buffer.buf + i, 8);
+    if(swap) {
+      for(k = 0; k < 4; k++) {
+        tmp = bytes[k];
+        bytes[k] = bytes[7 - k];
+        bytes[7 - k] = tmp;
+      }
+    }
+
+    if(typeCode == 'd') {
+      memcpy(&doubleValue, bytes, 8);
+      item = PyFloat_FromDouble(doubleValue);
+    } else {
+      memcpy(&longValue, bytes, 8);
+      item = PyLong_FromLongLong(longValue);
+    }
+
+    if(item == NULL) {
+      PyBuffer_Release(&buffer);
+      Py_DECREF(result);
+      return NULL;
+    }
+
+    // The new reference is owned by the vector
+    extendWithItem(result, item);
+  }
+
+  PyBuffer_Release(&buffer);
+  return (PyObject*)result;
+}
+#endif
+
+/*
+ Structural export and import of the trie, used by pyrsistent.serialization to
+ preserve structural sharing between vectors. Nodes are represented as tuples,
+ leaf nodes hold the elements and internal nodes hold their children. Nodes
+ that have already been converted are looked up in memo. For exports memo is
+ keyed by node address, the owning vector is stored alongside the node tuple
+ to keep the address valid. For imports memo is keyed by id() of the node
+ tuple and the value holds a reference to the created node.
+*/
+static PyObject* exportNode(PVector *owner, VNode *node, unsigned int level, Py_ssize_t size, PyObject *memo) {
+  PyObject *key;
+  PyObject *entry;
+  PyObject *result;
+  Py_ssize_t i;
+
+  if(level == 0) {
+    // Tails may be shared between vectors of different lengths, include the size in the key
+    key = Py_BuildValue("(Nn)", PyLong_FromVoidPtr(node), size);
+  } else {
+    key = PyLong_FromVoidPtr(node);
+  }
+
+  if(key == NULL) {
+    return NULL;
+  }
+
+  entry = PyDict_GetItem(memo, key);
+  if(entry != NULL) {
+    Py_DECREF(key);
+    result = PyTuple_GET_ITEM(entry, 0);
+    Py_INCREF(result);
+    return result;
+  }
+
+  if(level == 0) {
+    result = PyTuple_New(size);
+    if(result != NULL) {
+      for(i = 0; i < size; i++) {
+        Py_INCREF((PyObject*)node->items[i]);
+        PyTuple_SET_ITEM(result, i, (PyObject*)node->items[i]);
+      }
+    }
+  } else {
+    for(size = 0; size < BRANCH_FACTOR && node->items[size] != NULL; size++);
+    result = PyTuple_New(size);
+    for(i = 0; result != NULL && i < size; i++) {
+      PyObject *child = exportNode(owner, node->items[i], level - SHIFT, BRANCH_FACTOR, memo);
+      if(child == NULL) {
+        Py_CLEAR(result);
+      } else {
+        PyTuple_SET_ITEM(result, i, child);
+      }
+    }
+  }
+
+  if(result != NULL) {
+    entry = PyTuple_Pack(2, result, (PyObject*)owner);
+    if(entry == NULL || PyDict_SetItem(memo, key, entry) < 0) {
+      Py_CLEAR(result);
+    }
+    Py_XDECREF(entry);
+  }
+
+  Py_DECREF(key);
+  return result;
+}
+
+static PyObject* PVector_trie_export(PVector *self, PyObject *memo) {
+  PyObject *root;
+  PyObject *tail;
+
+  if(!PyDict_Check(memo)) {
+    PyErr_SetString(PyExc_TypeError, "memo must be a dict");
+    return NULL;
+  }
+
+  root = exportNode(self, self->root, self->shift, BRANCH_FACTOR, memo);
+  if(root == NULL) {
+    return NULL;
+  }
+
+  tail = exportNode(self, self->tail, 0, TAIL_SIZE(self), memo);
+  if(tail == NULL) {
+    Py_DECREF(root);
+    return NULL;
+  }
+
+  return Py_BuildValue("(IINN)", self->count, self->shift, root, tail);
+}
+
+/*
+ Adds the addresses of the nodes that are not in the set seen to it and appends the
+ elements of the new leaf nodes to the list elements, without copying any nodes.
+ Returns the number of new nodes or -1 on error.
+*/
+static Py_ssize_t collectNodes(VNode *node, unsigned int level, PyObject *seen, PyObject *elements) {
+  Py_ssize_t count = 1;
+  Py_ssize_t i;
+  int found;
+  PyObject *key = PyLong_FromVoidPtr(node);
+  if(key == NULL) {
+    return -1;
+  }
+
+  found = PySet_Contains(seen, key);
+  if(found == 0 && PySet_Add(seen, key) < 0) {
+    found = -1;
+  }
+
+  Py_DECREF(key);
+  if(found != 0) {
+    return found < 0 ? -1 : 0;
+  }
+
+  for(i = 0; i < BRANCH_FACTOR; i++) {
+    if(node->items[i] == NULL) {
+      continue;
+    }
+
+    if(level > 0) {
+      Py_ssize_t childCount = collectNodes(node->items[i], level - SHIFT, seen, elements);
+      if(childCount < 0) {
+        return -1;
+      }
+      count += childCount;
+    } else if(PyList_Append(elements, node->items[i]) < 0) {
+      return -1;
+    }
+  }
+
+  return count;
+}
+
+static PyObject* PVector_collect_nodes(PVector *self, PyObject *args) {
+  PyObject *seen;
+  PyObject *elements;
+  Py_ssize_t rootCount;
+  Py_ssize_t tailCount;
+
+  if(!PyArg_ParseTuple(args, "O!O!", &PySet_Type, &seen, &PyList_Type, &elements)) {
+    return NULL;
+  }
+
+  rootCount = collectNodes(self->root, self->shift, seen, elements);
+  if(rootCount < 0) {
+    return NULL;
+  }
+
+  tailCount = collectNodes(self->tail, 0, seen, elements);
+  if(tailCount < 0) {
+    return NULL;
+  }
+
+  return PyLong_FromSsize_t(rootCount + tailCount);
+}
+
+#define IMPORTED_NODE_CAPSULE "pvectorc.importedNode"
+
+typedef struct {
+  VNode *node;
+  unsigned int level;
+  Py_ssize_t size;
+} ImportedNode;
+
+static void releaseImportedNode(PyObject *capsule) {
+  ImportedNode *imported = PyCapsule_GetPointer(capsule, IMPORTED_NODE_CAPSULE);
+  releaseNode(imported->level, imported->node);
+  PyMem_Free(imported);
+}
+
+/*
+ Returns a new node built from the tuple nodeObj, the number of elements in the
+ subtree is stored in size. The structure is validated since the tries
+ are indexed without further checks.
+*/
+static VNode* importNode(PyObject *nodeObj, unsigned int level, PyObject *memo, Py_ssize_t *size) {
+  PyObject *key;
+  PyObject *entry;
+  PyObject *capsule;
+  ImportedNode *imported;
+  VNode *node;
+  Py_ssize_t length;
+  Py_ssize_t childSize;
+  Py_ssize_t i;
+
+  if(!PyTuple_Check(nodeObj)) {
+    PyErr_SetString(PyExc_TypeError, "Trie nodes must be tuples");
+    return NULL;
+  }
+
+  length = PyTuple_GET_SIZE(nodeObj);
+  if(length < 1 || length > BRANCH_FACTOR || (level == 0 && length != BRANCH_FACTOR)) {
+    PyErr_SetString(PyExc_ValueError, "Invalid trie node size");
+    return NULL;
+  }
+
+  key = PyLong_FromVoidPtr(nodeObj);
+  if(key == NULL) {
+    return NULL;
+  }
+
+  entry = PyDict_GetItem(memo, key);
+  if(entry != NULL) {
+    Py_DECREF(key);
+    if(!PyTuple_Check(entry) || PyTuple_GET_SIZE(entry) != 2 || PyTuple_GET_ITEM(entry, 0) != nodeObj ||
+       !PyCapsule_IsValid(PyTuple_GET_ITEM(entry, 1), IMPORTED_NODE_CAPSULE)) {
+      PyErr_SetString(PyExc_ValueError, "Invalid trie memo entry");
+      return NULL;
+    }
+
+    imported = PyCapsule_GetPointer(PyTuple_GET_ITEM(entry, 1), IMPORTED_NODE_CAPSULE);
+    if(imported->level != level) {
+      PyErr_SetString(PyExc_ValueError, "Trie node shared between different levels");
+      return NULL;
+    }
+
+    INC_NODE_REF_COUNT(imported->node);
+    *size = imported->size;
+    return imported->node;
+  }
+
+  node = newNode();
+  *size = 0;
+  for(i = 0; i < length; i++) {
+    PyObject *item = PyTuple_GET_ITEM(nodeObj, i);
+    if(level == 0) {
+      Py_INCREF(item);
+      node->items[i] = item;
+      *size += 1;
+    } else {
+      node->items[i] = importNode(item, level - SHIFT, memo, &childSize);
+      if(node->items[i] == NULL) {
+        goto error;
+      }
+
+      // All but the last child must be full for index lookups to work
+      if(i < length - 1 && childSize != ((Py_ssize_t)1 << level)) {
+        PyErr_SetString(PyExc_ValueError, "Invalid trie structure");
+        goto error;
+      }
+
+      *size += childSize;
+    }
+  }
+
+  imported = PyMem_Malloc(sizeof(ImportedNode));
+  if(imported == NULL) {
+    PyErr_NoMemory();
+    goto error;
+  }
+
+  INC_NODE_REF_COUNT(node);
+  imported->node = node;
+  imported->level = level;
+  imported->size = *size;
+  capsule = PyCapsule_New(imported, IMPORTED_NODE_CAPSULE, releaseImportedNode);
+  if(capsule == NULL) {
+    DEC_NODE_REF_COUNT(node);
+    PyMem_Free(imported);
+    goto error;
+  }
+
+  entry = PyTuple_Pack(2, nodeObj, capsule);
+  Py_DECREF(capsule);
+  if(entry == NULL || PyDict_SetItem(memo, key, entry) < 0) {
+    Py_XDECREF(entry);
+    goto error;
+  }
+
+  Py_DECREF(entry);
+  Py_DECREF(key);
+  return node;
+
+error:
+  Py_DECREF(key);
+  releaseNode(level, node);
+  return NULL;
+}
+
+static PyObject* pyrsistent_trie_import(PyObject *self, PyObject *args) {
+  unsigned int count;
+  unsigned int shift;
+  PyObject *rootObj;
+  PyObject *tailObj;
+  PyObject *memo;
+  VNode *root;
+  Py_ssize_t rootSize = 0;
+  Py_ssize_t i;
+  PVector *pvec;
+
+  if(!PyArg_ParseTuple(args, "IIO!O!O!", &count, &shift, &PyTuple_Type, &rootObj, &PyTuple_Type, &tailObj, &PyDict_Type, &memo)) {
+    return NULL;
+  }
+
+  if(shift < SHIFT || shift > 6 * SHIFT || shift % SHIFT != 0) {
+    PyErr_SetString(PyExc_ValueError, "Invalid trie shift");
+    return NULL;
+  }
+
+  pvec = PyObject_GC_New(PVector, &PVectorType);
+  if(pvec == NULL) {
+    return NULL;
+  }
+
+  pvec->count = count;
+  pvec->shift = shift;
+  pvec->in_weakreflist = NULL;
+  pvec->tail = newNode();
+  if(PyTuple_GET_SIZE(rootObj) == 0) {
+    root = newNode();
+  } else {
+    root = importNode(rootObj, shift, memo, &rootSize);
+  }
+
+  pvec->root = root;
+  if(root == NULL) {
+    pvec->root = newNode();
+    Py_DECREF(pvec);
+    return NULL;
+  }
+
+  if(rootSize != TAIL_OFF(pvec) || PyTuple_GET_SIZE(tailObj) != TAIL_SIZE(pvec)) {
+    PyErr_SetString(PyExc_ValueError, "Trie does not match vector size");
+    Py_DECREF(pvec);
+    return NULL;
+  }
+
+  for(i = 0; i < PyTuple_GET_SIZE(tailObj); i++) {
+    PyObject *item = PyTuple_GET_ITEM(tailObj, i);
+    Py_INCREF(item);
+    pvec->tail->items[i] = item;
+  }
+
+  PyObject_GC_Track((PyObject*)pvec);
+  return (PyObject*)pvec;
+}
+
 static PVector* rawCopyPVector(PVector* vector) {
   PVector* newVector = PyObject_GC_New(PVector, &PVectorType);
   newVector->count = vector->count;
@@ -572,6 +1226,12 @@ static PyObject* PVector_set(PVector *self, PyObject *obj);
 
 static PyObject* PVector_mset(PVector *self, PyObject *args);
 
+static PyObject* PVector_take(PVector *self, PyObject *indices);
+
+static PyObject* PVector_mset_many(PVector *self, PyObject *args);
+
+static PyObject* PVector_map(PVector *self, PyObject *fn);
+
 static PyObject* PVector_subscript(PVector* self, PyObject* item);
 
 static PyObject* PVector_extend(PVector *self, PyObject *args);
@@ -609,8 +1269,16 @@ static PyMethodDef PVector_methods[] = {
         {"index",       (PyCFunction)PVector_index, METH_VARARGS, "Return first index of value"},
 	{"count",       (PyCFunction)PVector_count, METH_O, "Return number of occurrences of value"},
         {"__reduce__",  (PyCFunction)PVector_pickle_reduce, METH_NOARGS, "Pickle support method"},
+#if PY_VERSION_HEX >= 0x03080000
+        {"__reduce_ex__", (PyCFunction)PVector_pickle_reduce_ex, METH_O, "Pickle support method"},
+#endif
+        {"_trie_export", (PyCFunction)PVector_trie_export, METH_O, "Export the trie structure, see pyrsistent.serialization"},
+        {"_collect_nodes", (PyCFunction)PVector_collect_nodes, METH_VARARGS, "Collect the nodes not seen before, see PHistory.retained_size"},
         {"evolver",     (PyCFunction)PVector_evolver, METH_NOARGS, "Return new evolver for pvector"},
 	{"mset",        (PyCFunction)PVector_mset, METH_VARARGS, "Inserts multiple elements at the specified positions"},
+        {"mset_many",   (PyCFunction)PVector_mset_many, METH_VARARGS, "Sets the elements at the given indices to the given values"},
+        {"take",        (PyCFunction)PVector_take, METH_O, "Return a new vector with the elements at the given indices"},
+        {"map",         (PyCFunction)PVector_map, METH_O, "Return a new vector with fn applied to every element"},
         {"tolist",      (PyCFunction)PVector_toList, METH_NOARGS, "Convert to list"},
         {"delete",      (PyCFunction)PVector_delete, METH_VARARGS, "Delete element(s) by index"},
         {"remove",      (PyCFunction)PVector_remove, METH_VARARGS, "Remove element(s) by equality"},
@@ -940,6 +1608,7 @@ static VNode* doSet(VNode* node, unsigned int level, unsigned int position, PyOb
     // TODO-OPT: Perhaps an alloc followed by a reset of reference
     // count is enough here since we overwrite all subnodes below.
     VNode* theNewNode = newNode();
+    STAT_ADD(nodeAllocator(), copies, 1);
     copyInsert(theNewNode->items, node->items, position & BIT_MASK, value);
     incRefs((PyObject**)theNewNode->items);
     return theNewNode;
@@ -965,6 +1634,7 @@ static PyObject* internalSet(PVector *self, Py_ssize_t position, PyObject *argOb
       // Reuse the root, replace the tail
       INC_NODE_REF_COUNT(self->root);
       PVector *new_pvec = newPvec(self->count, self->shift, self->root);
+      STAT_ADD(nodeAllocator(), copies, 1);
       copyInsert(new_pvec->tail->items, self->tail->items, position & BIT_MASK, argObj);
       incRefs((PyObject**)new_pvec->tail->items);
       return (PyObject*)new_pvec;
@@ -1030,6 +1700,156 @@ static PyObject* PVector_mset(PVector *self, PyObject *args) {
 }
 
 
+/*
+ Bulk operations. take() and map() walk the trie one leaf at a time, mset_many() uses
+ an evolver which copies each touched node only once.
+*/
+static PyObject* PVector_take(PVector *self, PyObject *indices) {
+  PyObject *it = PyObject_GetIter(indices);
+  PyObject *item;
+  PyObject *value;
+  PVector *result;
+  VNode *leaf = NULL;
+  Py_ssize_t leafIndex = -1;
+  Py_ssize_t position;
+
+  if(it == NULL) {
+    return NULL;
+  }
+
+  result = emptyNewPvec();
+  while((item = PyIter_Next(it)) != NULL) {
+    position = PyNumber_AsSsize_t(item, PyExc_IndexError);
+    Py_DECREF(item);
+    if(position == -1 && PyErr_Occurred()) {
+      goto error;
+    }
+
+    if(position < 0) {
+      position += self->count;
+    }
+
+    if(position < 0 || position >= self->count) {
+      PyErr_Format(PyExc_IndexError, "Index out of range: %zd", position);
+      goto error;
+    }
+
+    // Consecutive indices in the same leaf are common, only walk the trie on leaf changes
+    if((position >> SHIFT) != leafIndex) {
+      leafIndex = position >> SHIFT;
+      leaf = nodeFor(self, position);
+    }
+
+    value = (PyObject*)leaf->items[position & BIT_MASK];
+    Py_INCREF(value);
+    extendWithItem(result, value);
+  }
+
+  Py_DECREF(it);
+  if(PyErr_Occurred()) {
+    Py_DECREF(result);
+    return NULL;
+  }
+
+  return (PyObject*)result;
+
+error:
+  Py_DECREF(it);
+  Py_DECREF(result);
+  return NULL;
+}
+
+static PyObject* PVector_mset_many(PVector *self, PyObject *args) {
+  PyObject *indices;
+  PyObject *values;
+  PyObject *indexIt;
+  PyObject *valueIt;
+  PyObject *index;
+  PyObject *value;
+  PVectorEvolver *evolver;
+  PyObject *result = NULL;
+
+  if(!PyArg_ParseTuple(args, "OO", &indices, &values)) {
+    return NULL;
+  }
+
+  indexIt = PyObject_GetIter(indices);
+  if(indexIt == NULL) {
+    return NULL;
+  }
+
+  valueIt = PyObject_GetIter(values);
+  if(valueIt == NULL) {
+    Py_DECREF(indexIt);
+    return NULL;
+  }
+
+  evolver = (PVectorEvolver*)PVector_evolver(self);
+  while((index = PyIter_Next(indexIt)) != NULL) {
+    value = PyIter_Next(valueIt);
+    if(value == NULL) {
+      Py_DECREF(index);
+      if(!PyErr_Occurred()) {
+        PyErr_SetString(PyExc_ValueError, "mset_many expected the same number of indices and values");
+      }
+      goto done;
+    }
+
+    if(PVectorEvolver_set_item(evolver, index, value) < 0) {
+      Py_DECREF(index);
+      Py_DECREF(value);
+      goto done;
+    }
+
+    Py_DECREF(index);
+    Py_DECREF(value);
+  }
+
+  if(PyErr_Occurred()) {
+    goto done;
+  }
+
+  value = PyIter_Next(valueIt);
+  if(value != NULL) {
+    Py_DECREF(value);
+    PyErr_SetString(PyExc_ValueError, "mset_many expected the same number of indices and values");
+    goto done;
+  }
+
+  if(!PyErr_Occurred()) {
+    result = PVectorEvolver_persistent(evolver);
+  }
+
+done:
+  Py_DECREF(evolver);
+  Py_DECREF(indexIt);
+  Py_DECREF(valueIt);
+  return result;
+}
+
+static PyObject* PVector_map(PVector *self, PyObject *fn) {
+  PVector *result = emptyNewPvec();
+  PyObject *value;
+  VNode *leaf;
+  Py_ssize_t i, j, leafSize;
+
+  for(i = 0; i < self->count; i += BRANCH_FACTOR) {
+    leaf = nodeFor(self, i);
+    leafSize = (self->count - i) < BRANCH_FACTOR ? (self->count - i) : BRANCH_FACTOR;
+    for(j = 0; j < leafSize; j++) {
+      value = PyObject_CallFunctionObjArgs(fn, (PyObject*)leaf->items[j], NULL);
+      if(value == NULL) {
+        Py_DECREF(result);
+        return NULL;
+      }
+
+      extendWithItem(result, value);
+    }
+  }
+
+  return (PyObject*)result;
+}
+
 static PyObject* internalDelete(PVector *self, Py_ssize_t index, PyObject *stop_obj) {
   Py_ssize_t stop;
   PyObject *list;
@@ -1270,10 +2090,11 @@ static PyTypeObject PVectorEvolverType = {
 
 // Indicate that a node is "dirty" (has been updated by the evolver)
 // by setting the MSB of the refCount. This will be cleared when
-// creating a pvector from the evolver (cleaning it).
+// creating a pvector from the evolver (cleaning it). Dirty nodes are
+// only reachable from the evolver so they are updated non-atomically.
 #define DIRTY_BIT 0x80000000
 #define REF_COUNT_MASK (~DIRTY_BIT)
-#define IS_DIRTY(node) ((node)->refCount & DIRTY_BIT)
+#define IS_DIRTY(node) (NODE_REF_COUNT(node) & DIRTY_BIT)
 #define SET_DIRTY(node) ((node)->refCount |= DIRTY_BIT)
 #define CLEAR_DIRTY(node) ((node)->refCount &= REF_COUNT_MASK)
 
@@ -1314,7 +2135,7 @@ static void cleanVector(PVector *vector) {
 
 static void PVectorEvolver_dealloc(PVectorEvolver *self) {
   PyObject_GC_UnTrack(self);
-  Py_TRASHCAN_SAFE_BEGIN(self);
+  TRASHCAN_BEGIN(self, PVectorEvolver_dealloc);
 
   if(self->originalVector != self->newVector) {
     cleanVector(self->newVector);
@@ -1325,7 +2146,7 @@ static void PVectorEvolver_dealloc(PVectorEvolver *self) {
   Py_DECREF(self->appendList);
 
   PyObject_GC_Del(self);
-  Py_TRASHCAN_SAFE_END(self);
+  TRASHCAN_END(self);
 }
 
 static PyObject *PVectorEvolver_append(PVectorEvolver *self, PyObject *args) {
@@ -1338,7 +2159,8 @@ static PyObject *PVectorEvolver_append(PVectorEvolver *self, PyObject *args) {
 }
 
 static PyObject *PVectorEvolver_extend(PVectorEvolver *self, PyObject *args) {
-  PyObject *retVal = _PyList_Extend((PyListObject *)self->appendList, args);
+  // _PyList_Extend is not available from 3.13
+  PyObject *retVal = PyObject_CallMethod(self->appendList, "extend", "O", args);
   if (retVal == NULL) {
     return NULL;
   }
@@ -1383,6 +2205,7 @@ static VNode* doSetWithDirty(VNode* node, unsigned int level, unsigned int posit
   if(level == 0) {
     if(!IS_DIRTY(node)) {
       resultNode = allocNode();
+      STAT_ADD(nodeAllocator(), copies, 1);
       copyInsert(resultNode->items, node->items, position & BIT_MASK, value);
       incRefs((PyObject**)resultNode->items);
       SET_DIRTY(resultNode);
@@ -1564,6 +2387,48 @@ static int PVectorEvolver_traverse(PVectorEvolver *self, visitproc visit, void *
   return 0;
 }
 
+/*********************** Node allocator ****************************/
+
+static PyObject* pyrsistent_stats(PyObject *self, PyObject *args) {
+  vNodeAllocator *allocator;
+  Py_ssize_t cached = 0, allocations = 0, cacheHits = 0, frees = 0, copies = 0;
+
+  for(allocator = FIRST_ALLOCATOR(); allocator != NULL; allocator = allocator->next) {
+    cached += LOAD_SSIZE(allocator->cached);
+    allocations += LOAD_SSIZE(allocator->allocations);
+    cacheHits += LOAD_SSIZE(allocator->cacheHits);
+    frees += LOAD_SSIZE(allocator->frees);
+    copies += LOAD_SSIZE(allocator->copies);
+  }
+
+  return Py_BuildValue("{s:n,s:n,s:n,s:n,s:n,s:n,s:n,s:n}",
+                       "node_size", (Py_ssize_t)sizeof(VNode),
+                       "node_cache_size", LOAD_SSIZE(nodeCacheSize),
+                       "cached_nodes", cached,
+                       "allocations", allocations,
+                       "cache_hits", cacheHits,
+                       "frees", frees,
+                       "live_nodes", allocations - frees,
+                       "copies", copies);
+}
+
+static PyObject* pyrsistent_set_node_cache_size(PyObject *self, PyObject *args) {
+  Py_ssize_t size, previous;
+  if(!PyArg_ParseTuple(args, "n", &size)) {
+    return NULL;
+  }
+
+  if(size < 0) {
+    PyErr_SetString(PyExc_ValueError, "Node cache size must be non-negative");
+    return NULL;
+  }
+
+  previous = LOAD_SSIZE(nodeCacheSize);
+  STORE_SSIZE(nodeCacheSize, size);
+  trimNodeCache(size);
+  return PyLong_FromSsize_t(previous);
+}
+
 static PyMethodDef PyrsistentMethods[] = {
   {"pvector", pyrsistent_pvec, METH_VARARGS, 
    "pvector([iterable])\n"
@@ -1571,6 +2436,23 @@ static PyMethodDef PyrsistentMethods[] = {
    ">>> v1 = pvector([1, 2, 3])\n"
    ">>> v1\n"
    "pvector([1, 2, 3])"},
+  {"stats", pyrsistent_stats, METH_NOARGS,
+   "stats()\n"
+   "Return a dict with the counters of the node allocator: node_size in bytes, node_cache_size,\n"
+   "cached_nodes, allocations (including those served from the cache), cache_hits, frees,\n"
+   "live_nodes and copies, the number of nodes created by copying an existing node."},
+  {"set_node_cache_size", pyrsistent_set_node_cache_size, METH_VARARGS,
+   "set_node_cache_size(size)\n"
+   "Set the maximum number of released nodes kept for reuse, per thread on free-threaded\n"
+   "builds, and return the previous size."},
+  {"_trie_import", pyrsistent_trie_import, METH_VARARGS,
+   "_trie_import(count, shift, root, tail, memo)\n"
+   "Create a new persistent vector from a trie exported with PVector._trie_export()."},
+#if PY_VERSION_HEX >= 0x03080000
+  {"_pvector_from_buffer", pyrsistent_pvector_from_buffer, METH_VARARGS,
+   "_pvector_from_buffer(typecode, buffer, byteorder)\n"
+   "Create a new persistent vector from packed values, used when unpickling."},
+#endif
   {NULL, NULL, 0, NULL}
 };
 
@@ -1623,7 +2505,9 @@ static PyObject* pyrsistent_pvectorc_moduleinit(void) {
     EMPTY_VECTOR = emptyNewPvec();
   }
 
-  nodeCache.size = 0;
+#ifdef Py_GIL_DISABLED
+  PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED);
+#endif
 
   Py_INCREF(&PVectorType);
   PyModule_AddObject(m, "PVector", (PyObject *)&PVectorType);
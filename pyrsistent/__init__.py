@@ -4,6 +4,8 @@ from pyrsistent._pmap import pmap, m, PMap
 
 from pyrsistent._pvector import pvector, v, PVector
 
+from pyrsistent._ptypedvector import pvector_typed, PTypedVector
+
 from pyrsistent._pset import pset, s, PSet
 
 from pyrsistent._pbag import pbag, b, PBag
@@ -23,9 +25,15 @@ from pyrsistent._precord import PRecord
 
 from pyrsistent._pclass import PClass, PClassMeta
 
+from pyrsistent._phistory import phistory, PHistory, HistoryVersion
+
+from pyrsistent._atom import atom, Atom
+
 from pyrsistent._immutable import immutable
 
-from pyrsistent._helpers import freeze, thaw, mutant
+from pyrsistent._helpers import freeze, thaw, mutant, intern
+
+from pyrsistent._frozen_view import frozen_view
 
 from pyrsistent._transformations import inc, discard, rex, ny
 
@@ -34,6 +42,7 @@ from pyrsistent._toolz import get_in
 
 __all__ = ('pmap', 'm', 'PMap',
            'pvector', 'v', 'PVector',
+           'pvector_typed', 'PTypedVector',
            'pset', 's', 'PSet',
            'pbag', 'b', 'PBag',
            'plist', 'l', 'PList',
@@ -41,7 +50,9 @@ __all__ = ('pmap', 'm', 'PMap',
            'CheckedPMap', 'CheckedPVector', 'CheckedPSet', 'InvariantException', 'CheckedKeyTypeError', 'CheckedValueTypeError', 'CheckedType', 'optional',
            'PRecord', 'field', 'pset_field', 'pmap_field', 'pvector_field',
            'PClass', 'PClassMeta',
+           'phistory', 'PHistory', 'HistoryVersion',
+           'atom', 'Atom',
            'immutable',
-           'freeze', 'thaw', 'mutant',
+           'freeze', 'thaw', 'mutant', 'intern', 'frozen_view',
            'get_in',
            'inc', 'discard', 'rex', 'ny')
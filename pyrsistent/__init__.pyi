@@ -5,6 +5,8 @@
 from typing import Any
 from typing import AnyStr
 from typing import Callable
+from typing import Generic
+from typing import IO
 from typing import Iterable
 from typing import Iterator
 from typing import List
@@ -13,6 +15,7 @@ from typing import Mapping
 from typing import MutableMapping
 from typing import Sequence
 from typing import Set
+from typing import Sized
 from typing import Union
 from typing import Tuple
 from typing import Type
@@ -36,6 +39,7 @@ from pyrsistent.typing import PMapEvolver as PMapEvolver
 from pyrsistent.typing import PSet as PSet
 from pyrsistent.typing import PSetEvolver as PSetEvolver
 from pyrsistent.typing import PTypeError as PTypeError
+from pyrsistent.typing import PTypedVector as PTypedVector
 from pyrsistent.typing import PVector as PVector
 from pyrsistent.typing import PVectorEvolver as PVectorEvolver
 
@@ -49,6 +53,52 @@ def m(**kwargs: VT) -> PMap[str, VT]: ...
 def pvector(iterable: Iterable[T] = ...) -> PVector[T]: ...
 def v(*iterable: T) -> PVector[T]: ...
 
+def pvector_typed(typecode: str, iterable: Iterable[Any] = ...) -> PTypedVector[Any]: ...
+
+class HistoryVersion(PClass):
+    number: int
+    value: Any
+    timestamp: float
+    branch: Any
+    parent: Optional[int]
+    metadata: PMap[str, Any]
+
+class PHistory(Sized):
+    def __iter__(self) -> Iterator[HistoryVersion]: ...
+    @property
+    def current_branch(self) -> Any: ...
+    @property
+    def branches(self) -> List[Any]: ...
+    @property
+    def value(self) -> Any: ...
+    def head(self, branch: Any = None) -> Optional[HistoryVersion]: ...
+    def version(self, number: int) -> HistoryVersion: ...
+    def at(self, timestamp: float, branch: Any = None) -> HistoryVersion: ...
+    def log(self, branch: Any = None) -> List[HistoryVersion]: ...
+    def commit(self, value: Any, timestamp: Optional[float] = None, branch: Any = None, **metadata: Any) -> PHistory: ...
+    def undo(self, branch: Any = None) -> PHistory: ...
+    def redo(self, branch: Any = None) -> PHistory: ...
+    def branch(self, name: Any, version: Optional[int] = None) -> PHistory: ...
+    def checkout(self, name: Any) -> PHistory: ...
+    def prune(self, keep_last: Optional[int] = None, max_age: Optional[float] = None, now: Optional[float] = None) -> PHistory: ...
+    def retained_size(self) -> int: ...
+
+def phistory(branch: Any = 'main') -> PHistory: ...
+
+class Atom(Generic[T]):
+    def __init__(self, value: T, validator: Optional[Callable[[T], Tuple[bool, Any]]] = None) -> None: ...
+    def deref(self) -> T: ...
+    def compare_and_set(self, old: T, new: T) -> bool: ...
+    def reset(self, new: T) -> T: ...
+    def swap(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T: ...
+    def transform(self, *transformations: Any) -> T: ...
+    def add_watch(self, key: Any, fn: Callable[[Any, Atom[T], T, T], Any]) -> Atom[T]: ...
+    def remove_watch(self, key: Any) -> Atom[T]: ...
+    @property
+    def watches(self) -> PMap[Any, Callable[[Any, Atom[T], T, T], Any]]: ...
+
+def atom(value: T, validator: Optional[Callable[[T], Tuple[bool, Any]]] = None) -> Atom[T]: ...
+
 def pset(iterable: Iterable[T] = (), pre_size: int = 8) -> PSet[T]: ...
 def s(*iterable: T) -> PSet[T]: ...
 
@@ -150,11 +200,18 @@ class PRecord(PMap[AnyStr, Any]):
         _factory_fields: Optional[Iterable] = None,
         ignore_extra: bool = False,
     ) -> T_PRecord: ...
+    @classmethod
+    def create_many(
+        cls: Type[T_PRecord],
+        iterable: Iterable[Mapping],
+        ignore_extra: bool = False,
+    ) -> List[T_PRecord]: ...
     # This is OK because T_PRecord is a concrete type
     def discard(self: T_PRecord, key: KT) -> T_PRecord: ...
     def remove(self: T_PRecord, key: KT) -> T_PRecord: ...
 
     def serialize(self, format: Optional[Any] = ...) -> MutableMapping: ...
+    def serialize_to(self, fp: IO, format: Optional[Any] = ..., **kwargs: Any) -> None: ...
 
     # From pyrsistent documentation:
     #   This set function differs slightly from that in the PMap
@@ -174,29 +231,38 @@ def immutable(
 # ignore mypy warning "Overloaded function signatures 1 and 5 overlap with
 # incompatible return types"
 @overload
-def freeze(o: Mapping[KT, VT]) -> PMap[KT, VT]: ... # type: ignore
+def freeze(o: Mapping[KT, VT], intern: bool = False) -> PMap[KT, VT]: ... # type: ignore
+@overload
+def freeze(o: List[T], intern: bool = False) -> PVector[T]: ... # type: ignore
+@overload
+def freeze(o: Tuple[T, ...], intern: bool = False) -> Tuple[T, ...]: ...
 @overload
-def freeze(o: List[T]) -> PVector[T]: ... # type: ignore
+def freeze(o: Set[T], intern: bool = False) -> PSet[T]: ... # type: ignore
+@overload
+def freeze(o: T, intern: bool = False) -> T: ...
+
+def intern(o: T) -> T: ...
+
 @overload
-def freeze(o: Tuple[T, ...]) -> Tuple[T, ...]: ...
+def frozen_view(o: Mapping[KT, VT]) -> Mapping[KT, VT]: ... # type: ignore
 @overload
-def freeze(o: Set[T]) -> PSet[T]: ... # type: ignore
+def frozen_view(o: List[T]) -> Sequence[T]: ... # type: ignore
 @overload
-def freeze(o: T) -> T: ...
+def frozen_view(o: T) -> T: ...
 
 
 @overload
-def thaw(o: PMap[KT, VT]) -> MutableMapping[KT, VT]: ... # type: ignore
+def thaw(o: PMap[KT, VT], share: bool = False) -> MutableMapping[KT, VT]: ... # type: ignore
 @overload
-def thaw(o: PVector[T]) -> List[T]: ... # type: ignore
+def thaw(o: PVector[T], share: bool = False) -> List[T]: ... # type: ignore
 @overload
-def thaw(o: Tuple[T, ...]) -> Tuple[T, ...]: ...
+def thaw(o: Tuple[T, ...], share: bool = False) -> Tuple[T, ...]: ...
 # collections.abc.MutableSet is kind of garbage:
 # https://stackoverflow.com/questions/24977898/why-does-collections-mutableset-not-bestow-an-update-method
 @overload
-def thaw(o: PSet[T]) -> Set[T]: ... # type: ignore
+def thaw(o: PSet[T], share: bool = False) -> Set[T]: ... # type: ignore
 @overload
-def thaw(o: T) -> T: ...
+def thaw(o: T, share: bool = False) -> T: ...
 
 def mutant(fn: Callable) -> Callable: ...
 
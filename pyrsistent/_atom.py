@@ -0,0 +1,143 @@
+from threading import Lock
+
+from pyrsistent._checked_types import InvariantException, wrap_invariant
+from pyrsistent._pmap import pmap
+
+
+class Atom(object):
+    """
+    Managed reference to a value, typically a persistent data structure, shared between threads.
+
+    Updates are made by applying a function to the current value with :py:meth:`swap`. The
+    function is called without holding any lock and the result is only installed if the
+    reference has not been changed by another thread in the meantime, otherwise the function
+    is retried with the new value. Readers never block. The function may hence be called
+    several times and should be free of side effects.
+
+    Changes are compared by identity. Since persistent data structures are never modified in
+    place a new value is a new object.
+
+    An optional validator, a function following the same conventions as field invariants
+    returning a tuple (bool, error_code), is called for every new value. Watches, added with
+    :py:meth:`add_watch`, are called after every change.
+
+    >>> from pyrsistent import atom, inc, pmap
+    >>> a = atom(pmap({'count': 0}))
+    >>> a.swap(lambda s: s.set('count', s['count'] + 1))['count']
+    1
+    >>> a.transform(['count'], inc)['count']
+    2
+    >>> a.deref()['count']
+    2
+    """
+    __slots__ = ('_value', '_lock', '_validator', '_watches', '__weakref__')
+
+    def __init__(self, value, validator=None):
+        self._validator = wrap_invariant(validator) if validator is not None else None
+        self._validate(value)
+        self._value = value
+        self._watches = pmap()
+
+        # Only held for the short compare and set, never while calling user code
+        self._lock = Lock()
+
+    def __repr__(self):
+        return 'atom({0!r})'.format(self._value)
+
+    def _validate(self, value):
+        if self._validator is not None:
+            is_ok, error_code = self._validator(value)
+            if not is_ok:
+                raise InvariantException((error_code,), (), 'Atom validator failed')
+
+    def _notify(self, old, new):
+        for key, fn in self._watches.items():
+            fn(key, self, old, new)
+
+    def deref(self):
+        """
+        Return the current value.
+        """
+        return self._value
+
+    def compare_and_set(self, old, new):
+        """
+        Set the value to new if the current value is old, compared by identity. Return True
+        if the value was set.
+        """
+        self._validate(new)
+        with self._lock:
+            if self._value is not old:
+                return False
+
+            self._value = new
+
+        self._notify(old, new)
+        return True
+
+    def reset(self, new):
+        """
+        Set the value to new regardless of the current value. Return new.
+        """
+        self._validate(new)
+        with self._lock:
+            old = self._value
+            self._value = new
+
+        self._notify(old, new)
+        return new
+
+    def swap(self, fn, *args, **kwargs):
+        """
+        Set the value to fn(current value, *args, **kwargs), retrying until no other thread
+        has changed the value while fn was being called. Return the new value.
+        """
+        while True:
+            old = self._value
+            new = fn(old, *args, **kwargs)
+            if self.compare_and_set(old, new):
+                return new
+
+    def transform(self, *transformations):
+        """
+        Apply the transformations to the current value as with :py:meth:`swap`, see
+        :py:meth:`PMap.transform`. Return the new value.
+        """
+        return self.swap(lambda value: value.transform(*transformations))
+
+    def add_watch(self, key, fn):
+        """
+        Add a watch, fn(key, atom, old, new), called after every change in the thread making
+        the change. A watch with the same key is replaced.
+        """
+        with self._lock:
+            self._watches = self._watches.set(key, fn)
+
+        return self
+
+    def remove_watch(self, key):
+        """
+        Remove the watch with the given key.
+        """
+        with self._lock:
+            self._watches = self._watches.discard(key)
+
+        return self
+
+    @property
+    def watches(self):
+        """
+        A map of all watches by key.
+        """
+        return self._watches
+
+
+def atom(value, validator=None):
+    """
+    Create a new :py:class:`Atom` holding value.
+
+    >>> from pyrsistent import pvector
+    >>> atom(pvector([1, 2])).swap(lambda v: v.append(3))
+    pvector([1, 2, 3])
+    """
+    return Atom(value, validator)
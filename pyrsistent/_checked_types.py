@@ -17,9 +17,35 @@ class CheckedType(object):
     def create(cls, source_data, _factory_fields=None):
         raise NotImplementedError()
 
+    @classmethod
+    def create_many(cls, iterable, ignore_extra=False):
+        """
+        Create a list of instances from an iterable of source data, the equivalent of calling
+        create() for each element. Elements that already are instances are kept as they are.
+        """
+        if ignore_extra:
+            return [source_data if isinstance(source_data, cls) else cls.create(source_data, ignore_extra=ignore_extra)
+                    for source_data in iterable]
+
+        return [source_data if isinstance(source_data, cls) else cls.create(source_data) for source_data in iterable]
+
     def serialize(self, format=None):
         raise NotImplementedError()
 
+    def serialize_to(self, fp, format=None, **kwargs):
+        """
+        Write the result of serialize(format) as JSON to the file like object fp, without building
+        the intermediate dicts and lists. The keyword arguments are passed on to
+        :py:func:`pyrsistent.json.dump`.
+        """
+        from pyrsistent.json import dump
+        dump(self, fp, format=format, **kwargs)
+
+
+def _customizes_create(cls, base):
+    # The fast create_many() of base bypasses create() and __new__ which subclasses may override
+    return cls.create.__func__ is not base.create.__func__ or cls.__new__ is not base.__new__
+
 
 def _restore_pickle(cls, data):
     return cls.create(data, _factory_fields=set())
@@ -159,17 +185,22 @@ def store_invariants(dct, bases, destination_name, source_name):
     dct[destination_name] = tuple(wrap_invariant(inv) for inv in invariants)
 
 
+def _default_serializer(self, _, value):
+    if isinstance(value, CheckedType):
+        return value.serialize()
+    return value
+
+
+# Types whose values are never CheckedTypes and are hence serialized as is
+_SCALAR_TYPES = frozenset((bool, float, complex, bytes, type(None)) + six.integer_types + six.string_types)
+
+
 class _CheckedTypeMeta(type):
     def __new__(mcs, name, bases, dct):
         _store_types(dct, bases, '_checked_types', '__type__')
         store_invariants(dct, bases, '_checked_invariants', '__invariant__')
 
-        def default_serializer(self, _, value):
-            if isinstance(value, CheckedType):
-                return value.serialize()
-            return value
-
-        dct.setdefault('__serializer__', default_serializer)
+        dct.setdefault('__serializer__', _default_serializer)
 
         dct['__slots__'] = ()
 
@@ -228,24 +259,54 @@ def get_types(typs):
     return [get_type(typ) for typ in typs]
 
 
-def _check_types(it, expected_types, source_class, exception_type=CheckedValueTypeError):
+def _resolved_types(cls, name):
+    # Types given as strings may refer to classes that are defined after the collection class,
+    # they are therefore resolved on first use and then cached on the class itself.
+    resolved_name = name + '_resolved'
+    try:
+        return cls.__dict__[resolved_name]
+    except KeyError:
+        types = tuple(get_types(getattr(cls, name)))
+        setattr(cls, resolved_name, types)
+        return types
+
+
+def _serializes_as_is(cls, *names):
+    # True if the default serializer is used and all declared types are scalars, the values of
+    # the collection are then serialized as they are.
+    try:
+        return cls.__dict__['_checked_serializes_as_is']
+    except KeyError:
+        serializer = cls.__serializer__
+        result = getattr(serializer, '__func__', serializer) in (_default_serializer, _default_map_serializer) and \
+            all(getattr(cls, name) and _SCALAR_TYPES.issuperset(_resolved_types(cls, name)) for name in names)
+        cls._checked_serializes_as_is = result
+        return result
+
+
+def _check_types(it, cls, name, exception_type=CheckedValueTypeError):
+    expected_types = getattr(cls, name)
     if expected_types:
+        types = _resolved_types(cls, name)
         for e in it:
-            if not any(isinstance(e, get_type(t)) for t in expected_types):
+            if not isinstance(e, types):
                 actual_type = type(e)
                 msg = "Type {source_class} can only be used with {expected_types}, not {actual_type}".format(
-                    source_class=source_class.__name__,
-                    expected_types=tuple(get_type(et).__name__ for et in expected_types),
+                    source_class=cls.__name__,
+                    expected_types=tuple(t.__name__ for t in types),
                     actual_type=actual_type.__name__)
-                raise exception_type(source_class, expected_types, actual_type, e, msg)
-
-
-def _invariant_errors(elem, invariants):
-    return [data for valid, data in (invariant(elem) for invariant in invariants) if not valid]
+                raise exception_type(cls, expected_types, actual_type, e, msg)
 
 
 def _invariant_errors_iterable(it, invariants):
-    return sum([_invariant_errors(elem, invariants) for elem in it], [])
+    errors = []
+    for elem in it:
+        for invariant in invariants:
+            valid, data = invariant(elem)
+            if not valid:
+                errors.append(data)
+
+    return errors
 
 
 def optional(*typs):
@@ -259,11 +320,14 @@ def _checked_type_create(cls, source_data, _factory_fields=None, ignore_extra=Fa
 
     # Recursively apply create methods of checked types if the types of the supplied data
     # does not match any of the valid types.
-    types = get_types(cls._checked_types)
+    types = _resolved_types(cls, '_checked_types')
     checked_type = next((t for t in types if issubclass(t, CheckedType)), None)
+    if checked_type and len(types) == 1:
+        return cls(checked_type.create_many(source_data, ignore_extra=ignore_extra))
+
     if checked_type:
         return cls([checked_type.create(data, ignore_extra=ignore_extra)
-                    if not any(isinstance(data, t) for t in types) else data
+                    if not isinstance(data, types) else data
                     for data in source_data])
 
     return cls(source_data)
@@ -296,11 +360,28 @@ class CheckedPVector(PythonPVector, CheckedType):
         return self.evolver().append(val).persistent()
 
     def extend(self, it):
+        if not self and type(it) is type(self):
+            return it
+
         return self.evolver().extend(it).persistent()
 
+    def take(self, indices):
+        # The elements have already been checked when they were added to this vector
+        return self.__class__(super(CheckedPVector, self).take(indices))
+
+    def map(self, fn):
+        """
+        Return a new vector of the same class with the result of applying fn to each element.
+        The results are checked against the types and invariants of the class.
+        """
+        return CheckedPVector.Evolver(self.__class__, python_pvector()).extend(fn(x) for x in self).persistent()
+
     create = classmethod(_checked_type_create)
 
     def serialize(self, format=None):
+        if _serializes_as_is(self.__class__, '_checked_types'):
+            return self.tolist()
+
         serializer = self.__serializer__
         return list(serializer(format, v) for v in self)
 
@@ -317,9 +398,10 @@ class CheckedPVector(PythonPVector, CheckedType):
             self._invariant_errors = []
 
         def _check(self, it):
-            _check_types(it, self._destination_class._checked_types, self._destination_class)
-            error_data = _invariant_errors_iterable(it, self._destination_class._checked_invariants)
-            self._invariant_errors.extend(error_data)
+            _check_types(it, self._destination_class, '_checked_types')
+            invariants = self._destination_class._checked_invariants
+            if invariants:
+                self._invariant_errors.extend(_invariant_errors_iterable(it, invariants))
 
         def __setitem__(self, key, value):
             self._check([value])
@@ -330,8 +412,11 @@ class CheckedPVector(PythonPVector, CheckedType):
             return super(CheckedPVector.Evolver, self).append(elem)
 
         def extend(self, it):
-            it = list(it)
-            self._check(it)
+            # Vectors of the destination class have already been checked
+            if type(it) is not self._destination_class:
+                it = list(it)
+                self._check(it)
+
             return super(CheckedPVector.Evolver, self).extend(it)
 
         def persistent(self):
@@ -387,11 +472,27 @@ class CheckedPSet(PSet, CheckedType):
         return self.__repr__()
 
     def serialize(self, format=None):
+        if _serializes_as_is(self.__class__, '_checked_types'):
+            return set(self)
+
         serializer = self.__serializer__
         return set(serializer(format, v) for v in self)
 
     create = classmethod(_checked_type_create)
 
+    def update(self, iterable):
+        if type(iterable) is not type(self):
+            return super(CheckedPSet, self).update(iterable)
+
+        # Sets of the same class have already been checked, add the elements of the smaller
+        # set to the larger one without checking them again.
+        larger, smaller = (self, iterable) if len(self) >= len(iterable) else (iterable, self)
+        evolver = larger.evolver()
+        for element in smaller:
+            PSet._Evolver.add(evolver, element)
+
+        return evolver.persistent()
+
     def __reduce__(self):
         # Pickling support
         return _restore_pickle, (self.__class__, list(self),)
@@ -408,9 +509,10 @@ class CheckedPSet(PSet, CheckedType):
             self._invariant_errors = []
 
         def _check(self, it):
-            _check_types(it, self._destination_class._checked_types, self._destination_class)
-            error_data = _invariant_errors_iterable(it, self._destination_class._checked_invariants)
-            self._invariant_errors.extend(error_data)
+            _check_types(it, self._destination_class, '_checked_types')
+            invariants = self._destination_class._checked_invariants
+            if invariants:
+                self._invariant_errors.extend(_invariant_errors_iterable(it, invariants))
 
         def add(self, element):
             self._check([element])
@@ -427,24 +529,41 @@ class CheckedPSet(PSet, CheckedType):
             return self._original_pset
 
 
+def _default_map_serializer(self, _, key, value):
+    sk = key
+    if isinstance(key, CheckedType):
+        sk = key.serialize()
+
+    sv = value
+    if isinstance(value, CheckedType):
+        sv = value.serialize()
+
+    return sk, sv
+
+
+def _merge_checked_maps(left, right):
+    # Both maps are of the same class and have already been checked. Items from right take
+    # precedence, the items of the smaller map are inserted into the larger one without
+    # checking them again.
+    if len(left) >= len(right):
+        evolver = left.evolver()
+        for key, value in right.items():
+            PMap._Evolver.set(evolver, key, value)
+    else:
+        evolver = right.evolver()
+        for key, value in left.items():
+            if key not in right:
+                PMap._Evolver.set(evolver, key, value)
+
+    return evolver.persistent()
+
 class _CheckedMapTypeMeta(type):
     def __new__(mcs, name, bases, dct):
         _store_types(dct, bases, '_checked_key_types', '__key_type__')
         _store_types(dct, bases, '_checked_value_types', '__value_type__')
         store_invariants(dct, bases, '_checked_invariants', '__invariant__')
 
-        def default_serializer(self, _, key, value):
-            sk = key
-            if isinstance(key, CheckedType):
-                sk = key.serialize()
-
-            sv = value
-            if isinstance(value, CheckedType):
-                sv = value.serialize()
-
-            return sk, sv
-
-        dct.setdefault('__serializer__', default_serializer)
+        dct.setdefault('__serializer__', _default_map_serializer)
 
         dct['__slots__'] = ()
 
@@ -489,6 +608,9 @@ class CheckedPMap(PMap, CheckedType):
     __str__ = __repr__
 
     def serialize(self, format=None):
+        if _serializes_as_is(self.__class__, '_checked_key_types', '_checked_value_types'):
+            return dict(self.iteritems())
+
         serializer = self.__serializer__
         return dict(serializer(format, k, v) for k, v in self.items())
 
@@ -499,18 +621,25 @@ class CheckedPMap(PMap, CheckedType):
 
         # Recursively apply create methods of checked types if the types of the supplied data
         # does not match any of the valid types.
-        key_types = get_types(cls._checked_key_types)
+        key_types = _resolved_types(cls, '_checked_key_types')
         checked_key_type = next((t for t in key_types if issubclass(t, CheckedType)), None)
-        value_types = get_types(cls._checked_value_types)
+        value_types = _resolved_types(cls, '_checked_value_types')
         checked_value_type = next((t for t in value_types if issubclass(t, CheckedType)), None)
 
         if checked_key_type or checked_value_type:
-            return cls(dict((checked_key_type.create(key) if checked_key_type and not any(isinstance(key, t) for t in key_types) else key,
-                             checked_value_type.create(value) if checked_value_type and not any(isinstance(value, t) for t in value_types) else value)
+            return cls(dict((checked_key_type.create(key) if checked_key_type and not isinstance(key, key_types) else key,
+                             checked_value_type.create(value) if checked_value_type and not isinstance(value, value_types) else value)
                             for key, value in source_data.items()))
 
         return cls(source_data)
 
+    def update(self, *maps):
+        result = self
+        for m in maps:
+            result = _merge_checked_maps(result, m) if type(m) is type(result) else super(CheckedPMap, result).update(m)
+
+        return result
+
     def __reduce__(self):
         # Pickling support
         return _restore_pickle, (self.__class__, dict(self),)
@@ -524,11 +653,13 @@ class CheckedPMap(PMap, CheckedType):
             self._invariant_errors = []
 
         def set(self, key, value):
-            _check_types([key], self._destination_class._checked_key_types, self._destination_class, CheckedKeyTypeError)
-            _check_types([value], self._destination_class._checked_value_types, self._destination_class)
-            self._invariant_errors.extend(data for valid, data in (invariant(key, value)
-                                                                   for invariant in self._destination_class._checked_invariants)
-                                          if not valid)
+            destination_class = self._destination_class
+            _check_types((key,), destination_class, '_checked_key_types', CheckedKeyTypeError)
+            _check_types((value,), destination_class, '_checked_value_types')
+            for invariant in destination_class._checked_invariants:
+                valid, data = invariant(key, value)
+                if not valid:
+                    self._invariant_errors.append(data)
 
             return super(CheckedPMap.Evolver, self).set(key, value)
 
@@ -7,6 +7,7 @@ from pyrsistent._checked_types import (
     CheckedPVector,
     CheckedType,
     InvariantException,
+    _SCALAR_TYPES,
     _restore_pickle,
     get_type,
     maybe_parse_user_type,
@@ -42,6 +43,38 @@ def serialize(serializer, format, value):
     return serializer(format, value)
 
 
+def _serialize_checked(format, value):
+    return value.serialize(format)
+
+
+def _serialize_any(format, value):
+    return serialize(PFIELD_NO_SERIALIZER, format, value)
+
+
+def value_serializer(field):
+    """
+    Return the function, taking format and value, that serializes the values of field. None
+    if the values are serialized as they are. Specialised for the type of the field when
+    there is no custom serializer.
+    """
+    if field.serializer is not PFIELD_NO_SERIALIZER:
+        return field.serializer
+
+    try:
+        types = [get_type(t) for t in field.type]
+    except Exception:
+        # Types that cannot be resolved yet
+        return _serialize_any
+
+    if types and _SCALAR_TYPES.issuperset(types):
+        return None
+
+    if len(types) == 1 and issubclass(types[0], CheckedType):
+        return _serialize_checked
+
+    return _serialize_any
+
+
 def check_type(destination_cls, field, name, value):
     if field.type and not any(isinstance(value, get_type(t)) for t in field.type):
         actual_type = type(value)
@@ -183,9 +216,13 @@ SEQ_FIELD_TYPE_SUFFIXES = {
 # Global dictionary to hold auto-generated field types: used for unpickling
 _seq_field_types = {}
 
+def _seq_field_type(checked_class, item_type):
+    """Lookup function for auto-generated PVec/PSet field types, used when unpickling."""
+    return _seq_field_types[checked_class, item_type]
+
 def _restore_seq_field_pickle(checked_class, item_type, data):
     """Unpickling function for auto-generated PVec/PSet field types."""
-    type_ = _seq_field_types[checked_class, item_type]
+    type_ = _seq_field_type(checked_class, item_type)
     return _restore_pickle(type_, data)
 
 def _types_to_names(types):
@@ -200,6 +237,7 @@ def _make_seq_field_type(checked_class, item_type):
 
     class TheType(checked_class):
         __type__ = item_type
+        _field_type_restorer = (_seq_field_type, (checked_class, item_type))
 
         def __reduce__(self):
             return (_restore_seq_field_pickle,
@@ -276,9 +314,13 @@ _valid = lambda item: (True, "")
 # Global dictionary to hold auto-generated field types: used for unpickling
 _pmap_field_types = {}
 
+def _pmap_field_type(key_type, value_type):
+    """Lookup function for auto-generated PMap field types, used when unpickling."""
+    return _pmap_field_types[key_type, value_type]
+
 def _restore_pmap_field_pickle(key_type, value_type, data):
     """Unpickling function for auto-generated PMap field types."""
-    type_ = _pmap_field_types[key_type, value_type]
+    type_ = _pmap_field_type(key_type, value_type)
     return _restore_pickle(type_, data)
 
 def _make_pmap_field_type(key_type, value_type):
@@ -290,6 +332,7 @@ def _make_pmap_field_type(key_type, value_type):
     class TheMap(CheckedPMap):
         __key_type__ = key_type
         __value_type__ = value_type
+        _field_type_restorer = (_pmap_field_type, (key_type, value_type))
 
         def __reduce__(self):
             return (_restore_pmap_field_pickle,
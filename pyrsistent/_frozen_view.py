@@ -0,0 +1,290 @@
+from ._compat import Mapping, Sequence, Hashable
+import operator
+import six
+from pyrsistent._helpers import freeze
+from pyrsistent._pmap import pmap, _pmap_from_unique_items
+from pyrsistent._pvector import pvector
+
+
+def frozen_view(o):
+    """
+    Return a read only, persistent, view of the simple Python container o without
+    converting it up front.
+
+    - dict is viewed as a pmap
+    - list is viewed as a pvector
+    - everything else is frozen immediately using :py:func:`freeze`
+
+    Reading from the view, by subscript, dot-notation, :py:func:`get_in` or iteration, only
+    wraps the sub-documents that are actually touched. Operations that create a new structure,
+    such as set(), evolver() and transform(), convert the view into a pmap or pvector on first
+    use. Sub-documents that already have a view are converted through it and every conversion
+    is cached, so each part of the document is only converted once.
+
+    Since the original document is not copied it must not be modified while views
+    of it are in use.
+
+    >>> doc = frozen_view({'a': [1, {'b': 2}], 'c': 3})
+    >>> doc['a'][1]['b']
+    2
+    >>> doc.c
+    3
+    >>> doc['a'].set(0, 17)
+    pvector([17, pmap({'b': 2})])
+    """
+    typ = type(o)
+    if typ is dict:
+        return _FrozenMapView(o)
+
+    if typ is list:
+        return _FrozenVectorView(o)
+
+    return freeze(o)
+
+
+class _FrozenView(object):
+    __slots__ = ('_data', '_children', '_persistent', '__weakref__')
+
+    def __new__(cls, data):
+        self = super(_FrozenView, cls).__new__(cls)
+        self._data = data
+        self._children = {}
+        self._persistent = None
+        return self
+
+    def _child(self, key, value):
+        typ = type(value)
+        if typ is dict or typ is list or typ is tuple or typ is set:
+            try:
+                return self._children[key]
+            except KeyError:
+                child = frozen_view(value)
+                self._children[key] = child
+                return child
+
+        return value
+
+    def _persistent_child(self, key, value):
+        child = self._children.get(key)
+        if child is None:
+            return freeze(value)
+
+        if isinstance(child, _FrozenView):
+            return child.persistent()
+
+        return child
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, _FrozenView):
+            other = other._data
+
+        return self._data == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.persistent())
+
+    def __str__(self):
+        return self.__repr__()
+
+    def __reduce__(self):
+        # Pickling support, the view is restored over a copy of the original document
+        return frozen_view, (self._data,)
+
+    def transform(self, *transformations):
+        return self.persistent().transform(*transformations)
+
+    def evolver(self):
+        return self.persistent().evolver()
+
+    def set(self, *args):
+        return self.persistent().set(*args)
+
+    def remove(self, *args):
+        return self.persistent().remove(*args)
+
+    def copy(self):
+        return self
+
+
+class _FrozenMapView(_FrozenView):
+    """
+    Read only view of a dict with the same reading API as PMap.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self._child(key, self._data[key])
+
+    def __contains__(self, key):
+        return key in self._data
+
+    get = Mapping.get
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(
+                "{0} has no attribute '{1}'".format(type(self).__name__, key)
+            )
+
+    def iterkeys(self):
+        return iter(self._data)
+
+    def itervalues(self):
+        for k, v in six.iteritems(self._data):
+            yield self._child(k, v)
+
+    def iteritems(self):
+        for k, v in six.iteritems(self._data):
+            yield k, self._child(k, v)
+
+    def keys(self):
+        return pvector(self._data)
+
+    def values(self):
+        return pvector(self.itervalues())
+
+    def items(self):
+        return pvector(self.iteritems())
+
+    def __repr__(self):
+        return 'frozen_view({0})'.format(repr(self._data))
+
+    def __lt__(self, other):
+        raise TypeError('PMaps are not orderable')
+
+    __le__ = __lt__
+    __gt__ = __lt__
+    __ge__ = __lt__
+
+    def persistent(self):
+        """
+        Return the pmap corresponding to this view. The conversion is only done once.
+        """
+        if self._persistent is None:
+            data = self._data
+            if data:
+                self._persistent = _pmap_from_unique_items(
+                    [(k, self._persistent_child(k, v)) for k, v in six.iteritems(data)], len(data), 2 * len(data))
+            else:
+                self._persistent = pmap()
+
+        return self._persistent
+
+    def discard(self, key):
+        return self.persistent().discard(key)
+
+    def update(self, *maps):
+        return self.persistent().update(*maps)
+
+    def update_with(self, update_fn, *maps):
+        return self.persistent().update_with(update_fn, *maps)
+
+    def __add__(self, other):
+        return self.persistent().update(other)
+
+
+class _FrozenVectorView(_FrozenView):
+    """
+    Read only view of a list with the same reading API as PVector.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _FrozenVectorView(self._data[index])
+
+        value = self._data[index]
+        if index < 0:
+            index += len(self._data)
+
+        return self._child(index, value)
+
+    def __iter__(self):
+        for i, e in enumerate(self._data):
+            yield self._child(i, e)
+
+    def __repr__(self):
+        return 'frozen_view({0})'.format(repr(self._data))
+
+    def _compare(self, other, operator):
+        if isinstance(other, _FrozenView):
+            other = other._data
+        elif not isinstance(other, list):
+            other = list(other)
+
+        return operator(self._data, other)
+
+    def __lt__(self, other):
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other):
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other):
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other):
+        return self._compare(other, operator.ge)
+
+    def index(self, value, *args, **kwargs):
+        return self._data.index(value, *args, **kwargs)
+
+    def count(self, value):
+        return self._data.count(value)
+
+    def tolist(self):
+        return list(self)
+
+    def persistent(self):
+        """
+        Return the pvector corresponding to this view. The conversion is only done once.
+        """
+        if self._persistent is None:
+            self._persistent = pvector([self._persistent_child(i, e) for i, e in enumerate(self._data)])
+
+        return self._persistent
+
+    def append(self, val):
+        return self.persistent().append(val)
+
+    def extend(self, obj):
+        return self.persistent().extend(obj)
+
+    def mset(self, *args):
+        return self.persistent().mset(*args)
+
+    def delete(self, *args):
+        return self.persistent().delete(*args)
+
+    def mset_many(self, indices, values):
+        return self.persistent().mset_many(indices, values)
+
+    def take(self, indices):
+        return self.persistent().take(indices)
+
+    def map(self, fn):
+        return self.persistent().map(fn)
+
+    def __add__(self, other):
+        return self.persistent().extend(other)
+
+    def __mul__(self, times):
+        return self.persistent() * times
+
+    __rmul__ = __mul__
+
+
+Mapping.register(_FrozenMapView)
+Sequence.register(_FrozenVectorView)
+Hashable.register(_FrozenView)
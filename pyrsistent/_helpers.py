@@ -1,11 +1,13 @@
 from functools import wraps
+import math
+import weakref
 import six
-from pyrsistent._pmap import PMap, pmap
+from pyrsistent._pmap import PMap, pmap, _pmap_from_unique_items
 from pyrsistent._pset import PSet, pset
 from pyrsistent._pvector import PVector, pvector
 
 
-def freeze(o):
+def freeze(o, intern=False):
     """
     Recursively convert simple Python containers into pyrsistent versions
     of those containers.
@@ -20,26 +22,177 @@ def freeze(o):
     dict keys and set elements are often instances of mutable objects that
     support hash-by-id, which this function can't convert anyway.
 
+    The conversion does not recurse on the Python stack so arbitrarily deep
+    documents can be frozen. Containers that occur multiple times in o are
+    only converted once and the result is shared.
+
+    If intern is True every created pvector, pmap and pset is passed through
+    :py:func:`intern`, equal sub-documents will then be represented by the same
+    instance.
+
     >>> freeze(set([1, 2]))
     pset([1, 2])
     >>> freeze([1, {'a': 3}])
     pvector([1, pmap({'a': 3})])
     >>> freeze((1, []))
     (1, pvector([]))
+    >>> doc = freeze([{'a': 1}, {'a': 1}], intern=True)
+    >>> doc[0] is doc[1]
+    True
     """
     typ = type(o)
-    if typ is dict:
-        return pmap(dict((k, freeze(v)) for k, v in six.iteritems(o)))
-    if typ is list:
-        return pvector(map(freeze, o))
-    if typ is tuple:
-        return tuple(map(freeze, o))
     if typ is set:
-        return pset(o)
+        return _freeze_container(o, (), intern)
+
+    if typ not in _CONTAINER_TYPES:
+        return o
+
+    # Depth first traversal using an explicit stack. Each stack entry holds a container,
+    # an iterator over its (remaining) children and the children converted so far.
+    memo = {}
+    active = set([id(o)])
+    stack = [(o, iter(six.itervalues(o) if typ is dict else o), [])]
+    while stack:
+        container, children, frozen_children = stack[-1]
+        for child in children:
+            typ = type(child)
+            if typ in _CONTAINER_TYPES:
+                child_key = id(child)
+                frozen = memo.get(child_key, _MISSING)
+                if frozen is _MISSING:
+                    if child_key in active:
+                        raise ValueError('Cannot freeze self referencing structure')
+
+                    active.add(child_key)
+                    stack.append((child, iter(six.itervalues(child) if typ is dict else child), []))
+                    break
+
+                frozen_children.append(frozen)
+            elif typ is set:
+                frozen_children.append(_freeze_container(child, (), intern))
+            else:
+                frozen_children.append(child)
+        else:
+            stack.pop()
+            key = id(container)
+            active.discard(key)
+            frozen = _freeze_container(container, frozen_children, intern)
+            memo[key] = frozen
+            if stack:
+                stack[-1][2].append(frozen)
+
+    return frozen
+
+
+def _freeze_container(o, frozen_children, intern):
+    typ = type(o)
+    if typ is dict:
+        if not o:
+            result = pmap()
+        else:
+            result = _pmap_from_unique_items(zip(o, frozen_children), len(o), 2 * len(o))
+    elif typ is list:
+        result = pvector(frozen_children)
+    elif typ is tuple:
+        return tuple(frozen_children)
+    else:
+        result = pset(o)
+
+    return _intern(result) if intern else result
+
+
+_MISSING = object()
+_CONTAINER_TYPES = frozenset([dict, list, tuple])
+
+
+# (type, hash) -> list of weak references to the canonical instances with that type and hash
+_INTERNED = {}
+
+
+def _same_value(a, b):
+    # Like ==, but the types of all contained elements must match as well so that
+    # interning never replaces 1 with True or 1.0 or the other way around.
+    if a is b:
+        return True
+
+    if type(a) is not type(b):
+        return False
+
+    if isinstance(a, (PVector, tuple)):
+        return len(a) == len(b) and all(_same_value(x, y) for x, y in zip(a, b))
+
+    if isinstance(a, PMap):
+        if len(a) != len(b):
+            return False
+
+        b_keys = dict((k, k) for k in b)
+        return all(k in b_keys and _same_value(k, b_keys[k]) and _same_value(v, b[k]) for k, v in a.items())
+
+    if isinstance(a, PSet):
+        b_elements = dict((e, e) for e in b)
+        return len(a) == len(b) and all(e in b_elements and _same_value(e, b_elements[e]) for e in a)
+
+    if type(a) is float:
+        # 0.0 == -0.0
+        return a == b and math.copysign(1.0, a) == math.copysign(1.0, b)
+
+    return a == b
+
+
+def _interned_ref(key, o):
+    def remove(ref):
+        refs = _INTERNED.get(key)
+        if refs is not None:
+            refs[:] = [r for r in refs if r is not ref]
+            if not refs:
+                del _INTERNED[key]
+
+    return weakref.ref(o, remove)
+
+
+def intern(o):
+    """
+    Return a canonical instance that is equal to o. The first instance seen for a value
+    becomes the canonical one and is returned for all later equal values as long as
+    it is alive, the interning table only holds weak references.
+
+    The table is keyed on the type and hash of o so this is most efficient for types
+    that cache their hash, such as pmap and pset. Objects that are unhashable or that
+    cannot be weakly referenced (tuples, strings, ints, ...) are returned as is.
+
+    Unlike dict keys, instances are only considered the same value if all their elements
+    have the same types, pvector([1]) and pvector([1.0]) are interned separately.
+
+    >>> from pyrsistent import m
+    >>> m1 = intern(m(a=1))
+    >>> intern(m(a=1)) is m1
+    True
+    """
+    try:
+        key = (type(o), hash(o))
+    except TypeError:
+        return o
+
+    refs = _INTERNED.get(key)
+    if refs is not None:
+        for ref in refs:
+            canonical = ref()
+            if canonical is not None and _same_value(canonical, o):
+                return canonical
+
+    try:
+        ref = _interned_ref(key, o)
+    except TypeError:
+        # Not weakly referenceable
+        return o
+
+    _INTERNED.setdefault(key, []).append(ref)
     return o
 
+_intern = intern
 
-def thaw(o):
+
+def thaw(o, share=False):
     """
     Recursively convert pyrsistent containers into simple Python containers.
 
@@ -48,6 +201,16 @@ def thaw(o):
     - pset is converted to set, but not recursively
     - tuple is converted to tuple, recursively.
 
+    The conversion does not recurse on the Python stack so arbitrarily deep
+    structures can be thawed.
+
+    By default every occurrence of a container is converted separately and results
+    in a new Python container that can be mutated independently of the others. If
+    share is True containers that occur multiple times in o, which is common for
+    structures derived from each other, are only converted once and the same list,
+    dict, set or tuple is returned for all occurrences. Only then is the work of
+    converting shared containers saved.
+
     >>> from pyrsistent import s, m, v
     >>> thaw(s(1, 2))
     {1, 2}
@@ -55,16 +218,143 @@ def thaw(o):
     [1, {'a': 3}]
     >>> thaw((1, v()))
     (1, [])
+    >>> shared = v(1, 2)
+    >>> result = thaw(v(shared, shared), share=True)
+    >>> result[0] is result[1]
+    True
     """
-    if isinstance(o, PVector):
-        return list(map(thaw, o))
-    if isinstance(o, PMap):
-        return dict((k, thaw(v)) for k, v in o.iteritems())
-    if isinstance(o, PSet):
+    kind = _THAW_KINDS.get(type(o))
+    if kind is None:
+        kind = _thaw_kind(type(o))
+
+    if kind == _THAW_PLAIN:
+        return o
+
+    if kind == _THAW_SET:
         return set(o)
-    if type(o) is tuple:
-        return tuple(map(thaw, o))
-    return o
+
+    raw = False
+    if kind == _THAW_VIEW:
+        # Frozen views are thawed by copying the plain document they wrap
+        o = o._data
+        kind = _THAW_RAW_KINDS[type(o)]
+        raw = True
+
+    # Depth first traversal using an explicit stack, see freeze. Within the plain document
+    # of a frozen view (raw) lists and dicts are copied as well.
+    memo = {} if share else None
+    stack = [(o, kind, _thaw_children(o, kind), [], raw)]
+    while stack:
+        container, kind, children, thawed_children, raw = stack[-1]
+        for child in children:
+            child_kind = _THAW_KINDS.get(type(child))
+            if child_kind is None:
+                child_kind = _thaw_kind(type(child))
+
+            child_raw = raw and child_kind != _THAW_VECTOR and child_kind != _THAW_MAP
+            if child_kind == _THAW_VIEW:
+                child = child._data
+                child_raw = True
+
+            if child_raw:
+                child_kind = _THAW_RAW_KINDS.get(type(child), child_kind)
+
+            if child_kind == _THAW_PLAIN:
+                thawed_children.append(child)
+            elif memo is not None and id(child) in memo:
+                thawed_children.append(memo[id(child)])
+            elif child_kind == _THAW_SET:
+                thawed = set(child)
+                if memo is not None:
+                    memo[id(child)] = thawed
+                thawed_children.append(thawed)
+            else:
+                stack.append((child, child_kind, _thaw_children(child, child_kind), [], child_raw))
+                break
+        else:
+            stack.pop()
+            if kind == _THAW_VECTOR or kind == _THAW_LIST:
+                thawed = thawed_children
+            elif kind == _THAW_MAP:
+                thawed = dict(zip(_map_keys(container), thawed_children))
+            elif kind == _THAW_DICT:
+                thawed = dict(zip(container, thawed_children))
+            else:
+                thawed = tuple(thawed_children)
+
+            if memo is not None:
+                memo[id(container)] = thawed
+
+            if stack:
+                stack[-1][3].append(thawed)
+
+    return thawed
+
+
+_THAW_PLAIN = 0
+_THAW_SET = 1
+_THAW_VECTOR = 2
+_THAW_MAP = 3
+_THAW_TUPLE = 4
+_THAW_VIEW = 5
+_THAW_LIST = 6
+_THAW_DICT = 7
+
+# Kinds of the plain containers in the documents wrapped by frozen views
+_THAW_RAW_KINDS = {list: _THAW_LIST, dict: _THAW_DICT, tuple: _THAW_TUPLE, set: _THAW_SET}
+
+# Cache of type -> kind of thaw conversion to avoid repeated isinstance checks against the ABCs.
+# Cleared when full to not keep growing, and keeping types alive, if many types are created.
+_THAW_KINDS = {}
+_THAW_KINDS_MAX_SIZE = 1000
+
+
+def _thaw_kind(typ):
+    from pyrsistent._frozen_view import _FrozenView
+    if issubclass(typ, PVector):
+        kind = _THAW_VECTOR
+    elif issubclass(typ, PMap):
+        kind = _THAW_MAP
+    elif issubclass(typ, PSet):
+        kind = _THAW_SET
+    elif typ is tuple:
+        kind = _THAW_TUPLE
+    elif issubclass(typ, _FrozenView):
+        kind = _THAW_VIEW
+    else:
+        kind = _THAW_PLAIN
+
+    if len(_THAW_KINDS) >= _THAW_KINDS_MAX_SIZE:
+        _THAW_KINDS.clear()
+
+    _THAW_KINDS[typ] = kind
+    return kind
+
+
+def _thaw_children(o, kind):
+    if kind == _THAW_MAP:
+        return iter(_map_values(o))
+
+    if kind == _THAW_DICT:
+        return iter(list(o.values()))
+
+    return iter(o)
+
+
+# The keys and values of a map are listed in the same order. Plain pmaps are read directly from
+# their buckets, subclasses such as compact records are iterated through the public API.
+def _map_keys(o):
+    if type(o) is PMap:
+        return [k for bucket in o._buckets if bucket for k, _ in bucket]
+
+    return [k for k, _ in o.iteritems()]
+
+
+def _map_values(o):
+    if type(o) is PMap:
+        return [v for bucket in o._buckets if bucket for _, v in bucket]
+
+    return [v for _, v in o.iteritems()]
 
 
 def mutant(fn):
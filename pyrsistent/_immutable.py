@@ -1,4 +1,4 @@
-import sys
+from collections import namedtuple
 
 import six
 
@@ -46,60 +46,54 @@ def immutable(members='', name='Immutable', verbose=False):
     >>> p.set(id_=18)
     Traceback (most recent call last):
     AttributeError: Cannot set frozen members id_
+
+    The underlying named tuple is shared between all classes with the same members, the class
+    returned is new for every call.
     """
 
     if isinstance(members, six.string_types):
         members = members.replace(',', ' ').split()
 
-    def frozen_member_test():
-        frozen_members = ["'%s'" % f for f in members if f.endswith('_')]
-        if frozen_members:
-            return """
-        frozen_fields = fields_to_modify & set([{frozen_members}])
-        if frozen_fields:
-            raise AttributeError('Cannot set frozen members %s' % ', '.join(frozen_fields))
-            """.format(frozen_members=', '.join(frozen_members))
+    members = tuple(members)
+    base = _immutable_base(members)
+    if verbose:
+        print("class {0}(namedtuple('ImmutableBase', {1!r})): ...".format(name, list(members)))
+
+    return type(name, (base,), {
+        '__slots__': (),
+        '__module__': 'pyrsistent_immutable',
+        '__repr__': lambda self: base.__repr__(self).replace('ImmutableBase', self.__class__.__name__),
+        'set': _make_set(members),
+    })
+
+
+# Named tuples by members, creating them is the expensive part of immutable()
+_immutable_bases = {}
 
-        return ''
 
-    verbose_string = ""
-    if sys.version_info < (3, 7):
-        # Verbose is no longer supported in Python 3.7
-        verbose_string = ", verbose={verbose}".format(verbose=verbose)
+def _immutable_base(members):
+    try:
+        return _immutable_bases[members]
+    except KeyError:
+        base = namedtuple('ImmutableBase', members)
+        _immutable_bases[members] = base
+        return base
 
-    quoted_members = ', '.join("'%s'" % m for m in members)
-    template = """
-class {class_name}(namedtuple('ImmutableBase', [{quoted_members}]{verbose_string})):
-    __slots__ = tuple()
 
-    def __repr__(self):
-        return super({class_name}, self).__repr__().replace('ImmutableBase', self.__class__.__name__)
+def _make_set(members):
+    member_set = frozenset(members)
+    frozen_members = frozenset(m for m in members if m.endswith('_'))
 
     def set(self, **kwargs):
         if not kwargs:
             return self
 
-        fields_to_modify = set(kwargs.keys())
-        if not fields_to_modify <= {member_set}:
-            raise AttributeError("'%s' is not a member" % ', '.join(fields_to_modify - {member_set}))
-
-        {frozen_member_test}
+        if not member_set.issuperset(kwargs):
+            raise AttributeError("'%s' is not a member" % ', '.join(k for k in kwargs if k not in member_set))
 
-        return self.__class__.__new__(self.__class__, *map(kwargs.pop, [{quoted_members}], self))
-""".format(quoted_members=quoted_members,
-               member_set="set([%s])" % quoted_members if quoted_members else 'set()',
-               frozen_member_test=frozen_member_test(),
-               verbose_string=verbose_string,
-               class_name=name)
+        if frozen_members and not frozen_members.isdisjoint(kwargs):
+            raise AttributeError('Cannot set frozen members %s' % ', '.join(frozen_members.intersection(kwargs)))
 
-    if verbose:
-        print(template)
-
-    from collections import namedtuple
-    namespace = dict(namedtuple=namedtuple, __name__='pyrsistent_immutable')
-    try:
-        six.exec_(template, namespace)
-    except SyntaxError as e:
-        raise SyntaxError(e.message + ':\n' + template)
+        return self.__class__.__new__(self.__class__, *map(kwargs.pop, members, self))
 
-    return namespace[name]
\ No newline at end of file
+    return set
@@ -1,7 +1,11 @@
+from types import MemberDescriptorType
+
 import six
-from pyrsistent._checked_types import (InvariantException, CheckedType, _restore_pickle, store_invariants)
+from pyrsistent._checked_types import (
+    InvariantException, CheckedType, _restore_pickle, store_invariants, get_type, _customizes_create)
 from pyrsistent._field_common import (
-    set_fields, check_type, is_field_ignore_extra_complaint, PFIELD_NO_INITIAL, serialize, check_global_invariants
+    set_fields, check_type, is_field_ignore_extra_complaint, PFIELD_NO_INITIAL, PFIELD_NO_FACTORY,
+    PFIELD_NO_INVARIANT, value_serializer, check_global_invariants
 )
 from pyrsistent._transformations import transform
 
@@ -17,22 +21,207 @@ class PClassMeta(type):
         dct['__slots__'] = ('_pclass_frozen',) + tuple(key for key in dct['_pclass_fields'])
 
         # There must only be one __weakref__ entry in the inheritance hierarchy,
-        # lets put it on the top level class.
+        # lets put it on the top level class. Same for the cached hash.
         if _is_pclass(bases):
-            dct['__slots__'] += ('__weakref__',)
+            dct['__slots__'] += ('__weakref__', '_pclass_hash')
+
+        # Generated on first instantiation, see _compile
+        dct['_pclass_constructor'] = None
+        dct['_pclass_updater'] = None
+        dct['_pclass_serializer'] = None
 
         return super(PClassMeta, mcs).__new__(mcs, name, bases, dct)
 
 _MISSING_VALUE = object()
 
 
-def _check_and_set_attr(cls, field, name, value, result, invariant_errors):
-    check_type(cls, field, name, value)
-    is_ok, error_code = field.invariant(value)
-    if not is_ok:
-        invariant_errors.append(error_code)
-    else:
-        setattr(result, name, value)
+def _factory_value(field, value, ignore_extra):
+    if is_field_ignore_extra_complaint(PClass, field, ignore_extra):
+        return field.factory(value, ignore_extra=ignore_extra)
+
+    return field.factory(value)
+
+
+def _slot_descriptor(cls, name):
+    # Slots are accessed through their descriptors, bypassing the frozen check in __setattr__
+    if cls.__setattr__ is PClass.__setattr__:
+        for klass in cls.__mro__:
+            descriptor = klass.__dict__.get(name)
+            if descriptor is not None:
+                return descriptor if isinstance(descriptor, MemberDescriptorType) else None
+
+    return None
+
+
+def _attribute_setter(cls, name):
+    descriptor = _slot_descriptor(cls, name)
+    if descriptor is not None:
+        return descriptor.__set__
+
+    return lambda obj, value: setattr(obj, name, value)
+
+
+def _attribute_getter(cls, name):
+    descriptor = _slot_descriptor(cls, name)
+    if descriptor is not None:
+        return descriptor.__get__
+
+    return lambda obj: getattr(obj, name)
+
+
+def _compile(cls):
+    """
+    Generate the constructor, the updater used by set() and the serializer for cls, specialised
+    for its fields, and store them on the class. Fields without factory, type or invariant are assigned directly.
+    Types given as strings are resolved here, fields with types that cannot be resolved yet fall
+    back to checking them on every use.
+    """
+    base_new = super(PClass, cls).__new__
+    namespace = {
+        'cls': cls,
+        '_new': object.__new__ if base_new is object.__new__ else lambda c: super(PClass, c).__new__(c),
+        '_check_type': check_type,
+        '_factory_value': _factory_value,
+        '_check_global_invariants': check_global_invariants,
+        '_invariants': cls._pclass_invariants,
+        '_set_frozen': _attribute_setter(cls, '_pclass_frozen'),
+        'InvariantException': InvariantException,
+    }
+
+    constructor = ['def constructor(cls, kwargs):',
+                   '    result = _new(cls)',
+                   "    factory_fields = kwargs.pop('_factory_fields', None)",
+                   "    ignore_extra = kwargs.pop('ignore_extra', None)",
+                   '    missing_fields = []',
+                   '    invariant_errors = []']
+
+    # Copies all slots of the original and validates the updated values only, the
+    # original is known to be valid
+    updater = ['def updater(self, kwargs):',
+               '    result = _new(cls)']
+    field_updaters = []
+
+    serializer = ['def serializer(self, format):',
+                  '    result = {}']
+
+    for i, (name, field) in enumerate(cls._pclass_fields.items()):
+        namespace['_field_{0}'.format(i)] = field
+        namespace['_set_{0}'.format(i)] = _attribute_setter(cls, name)
+        namespace['_get_{0}'.format(i)] = _attribute_getter(cls, name)
+        try:
+            types = tuple(get_type(t) for t in field.type)
+            factory = field.factory
+            ignore_extra_complaint = is_field_ignore_extra_complaint(PClass, field, True)
+            resolved = True
+        except Exception:
+            resolved = False
+
+        check = []
+        if not resolved:
+            factory_lines = ['value = _factory_value(_field_{0}, value, ignore_extra)'.format(i)]
+            update_factory_lines = ['value = _factory_value(_field_{0}, value, None)'.format(i)]
+            check.append('_check_type(cls, _field_{0}, {1!r}, value)'.format(i, name))
+        else:
+            factory_lines = update_factory_lines = []
+            if factory is not PFIELD_NO_FACTORY:
+                namespace['_factory_{0}'.format(i)] = factory
+                update_factory_lines = ['value = _factory_{0}(value)'.format(i)]
+                if ignore_extra_complaint:
+                    factory_lines = ['if ignore_extra:',
+                                     '    value = _factory_{0}(value, ignore_extra=ignore_extra)'.format(i),
+                                     'else:',
+                                     '    value = _factory_{0}(value)'.format(i)]
+                else:
+                    factory_lines = update_factory_lines
+
+            if types:
+                namespace['_types_{0}'.format(i)] = types
+                check.append('if not isinstance(value, _types_{0}):'.format(i))
+                check.append('    _check_type(cls, _field_{0}, {1!r}, value)'.format(i, name))
+
+        if field.invariant is PFIELD_NO_INVARIANT:
+            check.append('_set_{0}(result, value)'.format(i))
+        else:
+            namespace['_invariant_{0}'.format(i)] = field.invariant
+            check.extend(['is_ok, error_code = _invariant_{0}(value)'.format(i),
+                          'if is_ok:',
+                          '    _set_{0}(result, value)'.format(i),
+                          'else:',
+                          '    invariant_errors.append(error_code)'])
+
+        constructor.append('    if {0!r} in kwargs:'.format(name))
+        constructor.append('        value = kwargs.pop({0!r})'.format(name))
+        if factory_lines:
+            constructor.append('        if factory_fields is None or {0!r} in factory_fields:'.format(name))
+            constructor.extend('            ' + line for line in factory_lines)
+        constructor.extend('        ' + line for line in check)
+
+        if field.initial is not PFIELD_NO_INITIAL:
+            namespace['_initial_{0}'.format(i)] = field.initial
+            constructor.append('    else:')
+            constructor.append('        value = _initial_{0}{1}'.format(i, '()' if callable(field.initial) else ''))
+            constructor.extend('        ' + line for line in check)
+        elif field.mandatory:
+            constructor.append('    else:')
+            constructor.append('        missing_fields.append({0!r})'.format('{0}.{1}'.format(cls.__name__, name)))
+
+        updater.extend(['    try:',
+                        '        _set_{0}(result, _get_{0}(self))'.format(i),
+                        '    except AttributeError:',
+                        '        pass'])
+
+        value_serializer_fn = value_serializer(field)
+        serializer.extend(['    try:',
+                           '        value = _get_{0}(self)'.format(i),
+                           '    except AttributeError:',
+                           '        pass',
+                           '    else:'])
+        if value_serializer_fn is None:
+            serializer.append('        result[{0!r}] = value'.format(name))
+        else:
+            namespace['_serializer_{0}'.format(i)] = value_serializer_fn
+            serializer.append('        result[{0!r}] = _serializer_{1}(format, value)'.format(name, i))
+
+        field_updaters.append('def _update_{0}(cls, result, value, invariant_errors):'.format(i))
+        field_updaters.extend('    ' + line for line in update_factory_lines + check)
+        field_updaters.append('_updaters[{0!r}] = _update_{1}'.format(name, i))
+
+    constructor.extend([
+        '    if invariant_errors or missing_fields:',
+        "        raise InvariantException(tuple(invariant_errors), tuple(missing_fields), 'Field invariant failed')",
+        '    if kwargs:',
+        '        raise AttributeError("\'{0}\' are not among the specified fields for {1}".format(',
+        "            ', '.join(kwargs), cls.__name__))"])
+
+    updater.extend([
+        '    invariant_errors = []',
+        '    extra = []',
+        '    for name, value in kwargs.items():',
+        '        if name in _updaters:',
+        '            _updaters[name](cls, result, value, invariant_errors)',
+        '        else:',
+        '            extra.append(name)',
+        '    if invariant_errors:',
+        "        raise InvariantException(tuple(invariant_errors), (), 'Field invariant failed')",
+        '    if extra:',
+        '        raise AttributeError("\'{0}\' are not among the specified fields for {1}".format(',
+        "            ', '.join(extra), cls.__name__))"])
+
+    for lines in (constructor, updater):
+        if cls._pclass_invariants:
+            lines.append('    _check_global_invariants(result, _invariants)')
+
+        lines.extend(['    _set_frozen(result, True)',
+                      '    return result'])
+
+    serializer.append('    return result')
+
+    namespace['_updaters'] = {}
+    six.exec_('\n'.join(constructor + updater + field_updaters + serializer), namespace)
+    cls._pclass_constructor = staticmethod(namespace['constructor'])
+    cls._pclass_updater = staticmethod(namespace['updater'])
+    cls._pclass_serializer = staticmethod(namespace['serializer'])
+    return namespace['constructor']
 
 
 @six.add_metaclass(PClassMeta)
@@ -46,40 +235,11 @@ class PClass(CheckedType):
     More documentation and examples of PClass usage is available at https://github.com/tobgu/pyrsistent
     """
     def __new__(cls, **kwargs):    # Support *args?
-        result = super(PClass, cls).__new__(cls)
-        factory_fields = kwargs.pop('_factory_fields', None)
-        ignore_extra = kwargs.pop('ignore_extra', None)
-        missing_fields = []
-        invariant_errors = []
-        for name, field in cls._pclass_fields.items():
-            if name in kwargs:
-                if factory_fields is None or name in factory_fields:
-                    if is_field_ignore_extra_complaint(PClass, field, ignore_extra):
-                        value = field.factory(kwargs[name], ignore_extra=ignore_extra)
-                    else:
-                        value = field.factory(kwargs[name])
-                else:
-                    value = kwargs[name]
-                _check_and_set_attr(cls, field, name, value, result, invariant_errors)
-                del kwargs[name]
-            elif field.initial is not PFIELD_NO_INITIAL:
-                initial = field.initial() if callable(field.initial) else field.initial
-                _check_and_set_attr(
-                    cls, field, name, initial, result, invariant_errors)
-            elif field.mandatory:
-                missing_fields.append('{0}.{1}'.format(cls.__name__, name))
-
-        if invariant_errors or missing_fields:
-            raise InvariantException(tuple(invariant_errors), tuple(missing_fields), 'Field invariant failed')
-
-        if kwargs:
-            raise AttributeError("'{0}' are not among the specified fields for {1}".format(
-                ', '.join(kwargs), cls.__name__))
-
-        check_global_invariants(result, cls._pclass_invariants)
-
-        result._pclass_frozen = True
-        return result
+        constructor = cls._pclass_constructor
+        if constructor is None:
+            constructor = _compile(cls)
+
+        return constructor(cls, kwargs)
 
     def set(self, *args, **kwargs):
         """
@@ -103,6 +263,16 @@ class PClass(CheckedType):
         if args:
             kwargs[args[0]] = args[1]
 
+        cls = self.__class__
+        if cls.__new__ is PClass.__new__:
+            # Only the updated fields need to be validated unless the class customises construction
+            updater = cls._pclass_updater
+            if updater is None:
+                _compile(cls)
+                updater = cls._pclass_updater
+
+            return updater(self, kwargs)
+
         factory_fields = set(kwargs)
 
         for key in self._pclass_fields:
@@ -130,18 +300,52 @@ class PClass(CheckedType):
 
         return cls(_factory_fields=_factory_fields, ignore_extra=ignore_extra, **kwargs)
 
+    @classmethod
+    def create_many(cls, iterable, ignore_extra=False):
+        """
+        Create a list of instances of the current type from an iterable of mappings, see create().
+        Faster than calling create() for each mapping.
+
+        >>> from pyrsistent import PClass, field
+        >>> class Point(PClass):
+        ...     x = field(type=int)
+        ...     y = field(type=int)
+        ...
+        >>> Point.create_many([{'x': 1, 'y': 2}, {'x': 3, 'y': 4}])
+        [Point(x=1, y=2), Point(x=3, y=4)]
+        """
+        if _customizes_create(cls, PClass):
+            return super(PClass, cls).create_many(iterable, ignore_extra=ignore_extra)
+
+        constructor = cls._pclass_constructor
+        if constructor is None:
+            constructor = _compile(cls)
+
+        fields = cls._pclass_fields
+        result = []
+        for data in iterable:
+            if isinstance(data, cls):
+                result.append(data)
+            elif ignore_extra:
+                kwargs = dict((k, data[k]) for k in fields if k in data)
+                kwargs['ignore_extra'] = ignore_extra
+                result.append(constructor(cls, kwargs))
+            else:
+                result.append(constructor(cls, dict(data)))
+
+        return result
+
     def serialize(self, format=None):
         """
         Serialize the current PClass using custom serializer functions for fields where
         such have been supplied.
         """
-        result = {}
-        for name in self._pclass_fields:
-            value = getattr(self, name, _MISSING_VALUE)
-            if value is not _MISSING_VALUE:
-                result[name] = serialize(self._pclass_fields[name].serializer, format, value)
+        serializer = self._pclass_serializer
+        if serializer is None:
+            _compile(self.__class__)
+            serializer = self._pclass_serializer
 
-        return result
+        return serializer(self, format)
 
     def transform(self, *transformations):
         """
@@ -153,7 +357,16 @@ class PClass(CheckedType):
         return transform(self, transformations)
 
     def __eq__(self, other):
+        if self is other:
+            return True
+
         if isinstance(other, self.__class__):
+            # Instances are immutable, if both hashes have been computed they can be compared first
+            if type(other) is type(self):
+                self_hash = getattr(self, '_pclass_hash', None)
+                if self_hash is not None and self_hash != getattr(other, '_pclass_hash', self_hash):
+                    return False
+
             for name in self._pclass_fields:
                 if getattr(self, name, _MISSING_VALUE) != getattr(other, name, _MISSING_VALUE):
                     return False
@@ -166,8 +379,12 @@ class PClass(CheckedType):
         return not self == other
 
     def __hash__(self):
-        # May want to optimize this by caching the hash somehow
-        return hash(tuple((key, getattr(self, key, _MISSING_VALUE)) for key in self._pclass_fields))
+        try:
+            return self._pclass_hash
+        except AttributeError:
+            result = hash(tuple((key, getattr(self, key, _MISSING_VALUE)) for key in self._pclass_fields))
+            _set_hash(self, result)
+            return result
 
     def __setattr__(self, key, value):
         if getattr(self, '_pclass_frozen', False):
@@ -212,6 +429,10 @@ class PClass(CheckedType):
         return evolver.persistent()
 
 
+# The hash is cached through the slot descriptor to bypass the frozen check in __setattr__
+_set_hash = PClass._pclass_hash.__set__
+
+
 class _PClassEvolver(object):
     __slots__ = ('_pclass_evolver_original', '_pclass_evolver_data', '_pclass_evolver_data_is_dirty', '_factory_fields')
 
@@ -0,0 +1,362 @@
+import sys
+import time
+
+from pyrsistent._field_common import field
+from pyrsistent._pbag import PBag
+from pyrsistent._pclass import PClass
+from pyrsistent._pdeque import PDeque
+from pyrsistent._plist import plist, PList
+from pyrsistent._pmap import pmap, PMap
+from pyrsistent._precord import _CompactPRecord
+from pyrsistent._pset import PSet
+from pyrsistent._ptypedvector import PTypedVector
+from pyrsistent._pvector import pvector, PythonPVector, PVector
+
+# Approximate size of a node in the C vector implementation, 32 pointers and a reference count
+_C_VECTOR_NODE_SIZE = 33 * 8
+
+
+class HistoryVersion(PClass):
+    """
+    A version recorded in a :py:class:`PHistory`.
+
+    number is unique within the history, parent is the number of the version this version
+    was committed on top of, or None.
+    """
+    number = field(type=int, mandatory=True)
+    value = field(mandatory=True)
+    timestamp = field(type=(int, float), mandatory=True)
+    branch = field(mandatory=True)
+    parent = field(initial=None)
+    metadata = field(initial=pmap())
+
+
+class _Branch(PClass):
+    # The versions committed on the branch, in commit order
+    numbers = field(initial=pvector())
+    timestamps = field(initial=pvector())
+
+    # Current head, the version the branch was created from and undone versions that can be redone
+    head = field(initial=None)
+    base = field(initial=None)
+    redo = field(initial=plist())
+
+
+def _bisect_right(seq, x, hi):
+    lo = 0
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if x < seq[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+
+    return lo
+
+
+class PHistory(object):
+    """
+    Persistent record of versions of a value, with commit metadata, undo/redo and branches.
+
+    Versions are numbered in commit order. Lookups by number or by timestamp are O(log n).
+    Committing, undoing and redoing return a new history and leave the original unchanged.
+
+    Do not instantiate directly, instead use the factory function :py:func:`phistory`.
+
+    >>> h = phistory().commit(pvector([1]), timestamp=10, author='alice')
+    >>> h = h.commit(h.value.append(2), timestamp=20)
+    >>> h.value
+    pvector([1, 2])
+    >>> h.at(15).metadata['author']
+    'alice'
+    >>> h.undo().value
+    pvector([1])
+    >>> h.undo().redo().value
+    pvector([1, 2])
+    """
+    __slots__ = ('_versions', '_branches', '_current', '_count', '__weakref__')
+
+    def __new__(cls, versions, branches, current, count):
+        self = super(PHistory, cls).__new__(cls)
+        self._versions = versions
+        self._branches = branches
+        self._current = current
+        self._count = count
+        return self
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (v for v in self._versions if v is not None)
+
+    def __repr__(self):
+        return 'PHistory(current_branch={0!r}, versions={1}, branches={2})'.format(
+            self._current, self._count, sorted(self._branches.keys(), key=repr))
+
+    def _evolve(self, versions=None, branches=None, current=None, count=None):
+        return PHistory(self._versions if versions is None else versions,
+                        self._branches if branches is None else branches,
+                        self._current if current is None else current,
+                        self._count if count is None else count)
+
+    def _branch(self, name):
+        if name is None:
+            name = self._current
+
+        try:
+            return name, self._branches[name]
+        except KeyError:
+            raise KeyError('No branch {0!r}'.format(name))
+
+    @property
+    def current_branch(self):
+        """
+        Name of the branch that commits, undo and redo apply to by default.
+        """
+        return self._current
+
+    @property
+    def branches(self):
+        """
+        Names of all branches.
+        """
+        return list(self._branches.keys())
+
+    def head(self, branch=None):
+        """
+        The current version on branch, None if there is none.
+        """
+        _, b = self._branch(branch)
+        return None if b.head is None else self._versions[b.head]
+
+    @property
+    def value(self):
+        """
+        The value of the head of the current branch.
+        """
+        head = self.head()
+        if head is None:
+            raise LookupError('No versions on branch {0!r}'.format(self._current))
+
+        return head.value
+
+    def version(self, number):
+        """
+        Return the version with the given number. Raises KeyError if it does not exist or
+        has been pruned.
+        """
+        if 0 <= number < len(self._versions):
+            result = self._versions[number]
+            if result is not None:
+                return result
+
+        raise KeyError(number)
+
+    def at(self, timestamp, branch=None):
+        """
+        Return the latest version committed at or before timestamp on branch, or before it
+        was created on the branch it was created from. Raises KeyError if there is none.
+        """
+        name, b = self._branch(branch)
+        limit = len(b.numbers)
+        while True:
+            index = _bisect_right(b.timestamps, timestamp, limit)
+            if index:
+                return self._versions[b.numbers[index - 1]]
+
+            if b.base is None:
+                raise KeyError(timestamp)
+
+            # Continue on the branch this branch was created from, up to the branch point
+            base = self._versions[b.base]
+            b = self._branches[base.branch]
+            limit = _bisect_right(b.numbers, base.number, len(b.numbers))
+
+    def log(self, branch=None):
+        """
+        Return the versions leading up to the head of branch, newest first.
+        """
+        result = []
+        number = self._branch(branch)[1].head
+        while number is not None:
+            version = self._versions[number]
+            result.append(version)
+            number = version.parent
+
+        return result
+
+    def commit(self, value, timestamp=None, branch=None, **metadata):
+        """
+        Return a new history where value has been committed as the new head of branch, the
+        current branch by default. The timestamp defaults to the current time and may not be
+        earlier than that of the previous commit on the branch. Keyword arguments are stored
+        as the metadata of the version.
+        """
+        name, b = self._branch(branch)
+        if timestamp is None:
+            timestamp = time.time()
+
+        if b.timestamps and timestamp < b.timestamps[-1]:
+            raise ValueError('Timestamp {0} is earlier than the last commit on branch {1!r}'.format(timestamp, name))
+
+        number = len(self._versions)
+        version = HistoryVersion(number=number, value=value, timestamp=timestamp, branch=name,
+                                 parent=b.head, metadata=pmap(metadata))
+        b = b.set(numbers=b.numbers.append(number), timestamps=b.timestamps.append(timestamp),
+                  head=number, redo=plist())
+        return self._evolve(versions=self._versions.append(version), branches=self._branches.set(name, b),
+                            count=self._count + 1)
+
+    def undo(self, branch=None):
+        """
+        Return a new history where the head of branch has been moved back to its parent.
+        """
+        name, b = self._branch(branch)
+        if b.head is None or b.head == b.base:
+            raise LookupError('Nothing to undo on branch {0!r}'.format(name))
+
+        b = b.set(head=self._versions[b.head].parent, redo=b.redo.cons(b.head))
+        return self._evolve(branches=self._branches.set(name, b))
+
+    def redo(self, branch=None):
+        """
+        Return a new history where the last undo on branch has been reverted.
+        """
+        name, b = self._branch(branch)
+        if not b.redo:
+            raise LookupError('Nothing to redo on branch {0!r}'.format(name))
+
+        b = b.set(head=b.redo.first, redo=b.redo.rest)
+        return self._evolve(branches=self._branches.set(name, b))
+
+    def branch(self, name, version=None):
+        """
+        Return a new history with a new branch, starting at the version with the given number
+        or at the head of the current branch by default.
+        """
+        if name in self._branches:
+            raise ValueError('Branch {0!r} already exists'.format(name))
+
+        if version is None:
+            version = self._branches[self._current].head
+        else:
+            self.version(version)
+
+        return self._evolve(branches=self._branches.set(name, _Branch(head=version, base=version)))
+
+    def checkout(self, name):
+        """
+        Return a new history with name as the current branch.
+        """
+        self._branch(name)
+        return self._evolve(current=name)
+
+    def prune(self, keep_last=None, max_age=None, now=None):
+        """
+        Return a new history without the versions that match none of the retention policies.
+
+        keep_last keeps the last keep_last versions committed on each branch, max_age keeps
+        all versions younger than max_age seconds relative to now, which defaults to the
+        current time. Heads, branch points and versions that can be redone are always kept.
+        Parents of retained versions are updated to point at their closest retained ancestor.
+        """
+        if keep_last is None and max_age is None:
+            return self
+
+        if now is None:
+            now = time.time()
+
+        keep = set()
+        for b in self._branches.values():
+            keep.update(n for n in (b.head, b.base) if n is not None)
+            keep.update(b.redo)
+            if keep_last:
+                keep.update(b.numbers[-keep_last:])
+
+        if max_age is not None:
+            keep.update(v.number for v in self if now - v.timestamp < max_age)
+
+        # Versions are only ever committed on top of older versions, so ancestors are seen first
+        closest = {}
+        versions = self._versions.evolver()
+        for version in self:
+            parent = closest.get(version.parent)
+            if version.number in keep:
+                closest[version.number] = version.number
+                if parent != version.parent:
+                    versions[version.number] = version.set(parent=parent)
+            else:
+                closest[version.number] = parent
+                versions[version.number] = None
+
+        branches = pmap()
+        for name, b in self._branches.items():
+            kept = [i for i, n in enumerate(b.numbers) if n in keep]
+            branches = branches.set(name, b.set(numbers=b.numbers.take(kept), timestamps=b.timestamps.take(kept)))
+
+        return self._evolve(versions=versions.persistent(), branches=branches, count=len(keep))
+
+    def retained_size(self):
+        """
+        Return an estimate, in bytes, of the memory retained by the values and metadata of
+        all versions. Objects and trie nodes shared between versions are only counted once.
+        """
+        return _retained_size([(v.value, v.metadata) for v in self])
+
+
+def _retained_size(root):
+    seen = set()
+    c_nodes = set()
+    size = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        typ = type(obj)
+        if typ in (list, tuple, set, frozenset):
+            stack.extend(obj)
+        elif typ is dict:
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (PythonPVector, PTypedVector)):
+            stack.append(obj._root)
+            stack.append(obj._tail)
+        elif isinstance(obj, PVector) and hasattr(obj, '_collect_nodes'):
+            # The nodes of C vectors are not Python objects, they are identified by address.
+            # Only the elements of nodes that have not been seen before are pushed.
+            size += obj._collect_nodes(c_nodes, stack) * _C_VECTOR_NODE_SIZE
+        elif isinstance(obj, _CompactPRecord):
+            stack.extend(v for _, v in obj.iteritems())
+        elif isinstance(obj, PMap):
+            stack.append(obj._buckets)
+        elif isinstance(obj, PSet):
+            stack.append(obj._map)
+        elif isinstance(obj, PBag):
+            stack.append(obj._counts)
+        elif isinstance(obj, PDeque):
+            stack.append(obj._left_list)
+            stack.append(obj._right_list)
+        elif isinstance(obj, PList):
+            if obj:
+                stack.append(obj.first)
+                stack.append(obj.rest)
+        elif isinstance(obj, PClass):
+            stack.extend(getattr(obj, name, None) for name in obj._pclass_fields)
+
+    return size
+
+
+def phistory(branch='main'):
+    """
+    Create a new empty history with one branch, the current branch.
+
+    >>> h = phistory().commit(pvector([1]), timestamp=1.0)
+    >>> h.head().number, h.value
+    (0, pvector([1]))
+    """
+    return PHistory(pvector(), pmap({branch: _Branch()}), branch, 0)
@@ -410,15 +410,22 @@ def _turbo_mapping(initial, pre_size):
             # we can always reallocate later.
             size = 8
 
-    buckets = size * [None]
-
     if not isinstance(initial, Mapping):
         # Make a dictionary of the initial data if it isn't already,
         # that will save us some job further down since we can assume no
         # key collisions
         initial = dict(initial)
 
-    for k, v in six.iteritems(initial):
+    return _pmap_from_unique_items(six.iteritems(initial), len(initial), size)
+
+
+def _pmap_from_unique_items(items, count, size):
+    """
+    Build a map with size buckets directly from count key-value pairs. The keys
+    must be known to be unique, no check for duplicates is done.
+    """
+    buckets = size * [None]
+    for k, v in items:
         h = hash(k)
         index = h % size
         bucket = buckets[index]
@@ -428,7 +435,7 @@ def _turbo_mapping(initial, pre_size):
         else:
             buckets[index] = [(k, v)]
 
-    return PMap(len(initial), pvector().extend(buckets))
+    return PMap(count, pvector().extend(buckets))
 
 
 _EMPTY_PMAP = _turbo_mapping({}, 0)
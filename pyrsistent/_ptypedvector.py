@@ -0,0 +1,529 @@
+from array import array
+from numbers import Integral
+import operator
+import sys
+
+from pyrsistent._pvector import (
+    PVector, PythonPVector, BRANCH_FACTOR, BIT_MASK, SHIFT, PickleBuffer, compare_pvector, _index_or_slice,
+    _mset_many, _take, pvector)
+from pyrsistent._transformations import transform
+
+_node_for = PythonPVector._node_for
+
+
+def _readonly(view):
+    # Leaves are shared between vectors and must never be written through a view
+    return view.toreadonly() if hasattr(view, 'toreadonly') else view
+
+
+def _new_path(level, node):
+    if level == 0:
+        return node
+
+    return [_new_path(level - SHIFT, node)]
+
+
+def _push_leaf(level, parent, leaf, count):
+    ret = list(parent)
+    if level == SHIFT:
+        ret.append(leaf)
+        return ret
+
+    sub_index = ((count - 1) >> level) & BIT_MASK  # >>>
+    if len(parent) > sub_index:
+        ret[sub_index] = _push_leaf(level - SHIFT, parent[sub_index], leaf, count)
+        return ret
+
+    ret.append(_new_path(level - SHIFT, leaf))
+    return ret
+
+
+def _do_set(level, node, i, val):
+    # Slicing copies both internal nodes (lists) and leaves (arrays)
+    ret = node[:]
+    if level == 0:
+        ret[i & BIT_MASK] = val
+    else:
+        sub_index = (i >> level) & BIT_MASK  # >>>
+        ret[sub_index] = _do_set(level - SHIFT, node[sub_index], i, val)
+
+    return ret
+
+
+def _replace_leaf(level, node, i, leaf, copied):
+    if level == 0:
+        return leaf
+
+    if id(node) not in copied:
+        node = list(node)
+        copied.add(id(node))
+
+    sub_index = (i >> level) & BIT_MASK  # >>>
+    node[sub_index] = _replace_leaf(level - SHIFT, node[sub_index], i, leaf, copied)
+    return node
+
+
+def _map_node(node, level, fn, typecode):
+    if level:
+        return [_map_node(child, level - SHIFT, fn, typecode) for child in node]
+
+    return array(typecode, [fn(x) for x in node])
+
+
+def _fill_array(node, shift, result):
+    if shift:
+        shift -= SHIFT
+        for n in node:
+            _fill_array(n, shift, result)
+    else:
+        result.extend(node)
+
+
+def _leaf_nodes(node, shift):
+    if shift:
+        shift -= SHIFT
+        for n in node:
+            for leaf in _leaf_nodes(n, shift):
+                yield leaf
+    else:
+        yield node
+
+
+def _as_array(typecode, iterable):
+    if isinstance(iterable, PTypedVector):
+        iterable = iterable.toarray()
+
+    if isinstance(iterable, array) and iterable.typecode == typecode:
+        return iterable
+
+    return array(typecode, iterable)
+
+
+def _from_array(values):
+    """
+    Build a vector from values, an array that must not be modified afterwards. The leaves
+    are slices of values and the internal nodes are built bottom up.
+    """
+    count = len(values)
+    if not count:
+        return PTypedVector(values.typecode, 0, SHIFT, [], values)
+
+    # Like the C implementation the tail always holds the last 1 - 32 elements
+    tail_offset = ((count - 1) >> SHIFT) << SHIFT
+    root = [values[i:i + BRANCH_FACTOR] for i in range(0, tail_offset, BRANCH_FACTOR)]
+    shift = SHIFT
+    while len(root) > (1 << shift):
+        shift += SHIFT
+
+    for _ in range(shift // SHIFT - 1):
+        root = [root[i:i + BRANCH_FACTOR] for i in range(0, len(root), BRANCH_FACTOR)]
+
+    return PTypedVector(values.typecode, count, shift, root, values[tail_offset:])
+
+
+def _ptypedvector_from_bytes(typecode, data, byteorder):
+    values = array(typecode)
+    values.frombytes(memoryview(data).cast('B'))
+    if byteorder != sys.byteorder:
+        values.byteswap()
+
+    return _from_array(values)
+
+
+class PTypedVector(object):
+    """
+    Persistent vector of primitive values, such as floats or 64 bit ints, that uses the same
+    trie as :py:class:`PVector` but stores the values packed in :py:class:`array.array` leaves
+    instead of as boxed Python objects. The supported types are those of the array module,
+    values are converted and checked like they are by array.
+
+    The packed values can be read without copying through :py:meth:`leaves` and :py:meth:`buffer`.
+
+    Do not instantiate directly, instead use the factory function :py:func:`pvector_typed`.
+    """
+    __slots__ = ('_typecode', '_count', '_shift', '_root', '_tail', '_tail_offset', '__weakref__')
+
+    def __new__(cls, typecode, count, shift, root, tail):
+        self = super(PTypedVector, cls).__new__(cls)
+        self._typecode = typecode
+        self._count = count
+        self._shift = shift
+        self._root = root
+        self._tail = tail
+
+        # Derived attribute stored for performance
+        self._tail_offset = count - len(tail)
+        return self
+
+    @property
+    def typecode(self):
+        """
+        The array typecode of the values in the vector.
+        """
+        return self._typecode
+
+    @property
+    def itemsize(self):
+        """
+        The size in bytes of one value.
+        """
+        return self._tail.itemsize
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.start is None and index.stop is None and index.step is None:
+                return self
+
+            return _from_array(self.toarray()[index])
+
+        if index < 0:
+            index += self._count
+
+        return _node_for(self, index)[index & BIT_MASK]
+
+    def __add__(self, other):
+        return self.extend(other)
+
+    def __repr__(self):
+        return 'pvector_typed({0!r}, {1})'.format(self._typecode, str(self.tolist()))
+
+    __str__ = __repr__
+
+    def __iter__(self):
+        return iter(self.toarray())
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+
+        if isinstance(other, PTypedVector):
+            return self._count == other._count and self.toarray() == other.toarray()
+
+        return hasattr(other, '__len__') and self._count == len(other) and compare_pvector(self, other, operator.eq)
+
+    def __gt__(self, other):
+        return compare_pvector(self, other, operator.gt)
+
+    def __lt__(self, other):
+        return compare_pvector(self, other, operator.lt)
+
+    def __ge__(self, other):
+        return compare_pvector(self, other, operator.ge)
+
+    def __le__(self, other):
+        return compare_pvector(self, other, operator.le)
+
+    def __hash__(self):
+        # Equal vectors must hash equally, whether the C extension is used or not
+        return hash(pvector(self.tolist()))
+
+    def __mul__(self, times):
+        if times == 1:
+            return self
+
+        return _from_array(self.toarray() * max(times, 0))
+
+    __rmul__ = __mul__
+
+    def __reduce_ex__(self, protocol):
+        # The values are pickled as one block, out of band if possible
+        values = self.toarray()
+        data = PickleBuffer(values) if PickleBuffer is not None and protocol >= 5 else values.tobytes()
+        return _ptypedvector_from_bytes, (self._typecode, data, sys.byteorder)
+
+    def __reduce__(self):
+        return self.__reduce_ex__(2)
+
+    def toarray(self):
+        """
+        Return a new :py:class:`array.array` holding the values of the vector.
+
+        >>> pvector_typed('i', [1, 2, 3]).toarray()
+        array('i', [1, 2, 3])
+        """
+        result = array(self._typecode)
+        _fill_array(self._root, self._shift, result)
+        result.extend(self._tail)
+        return result
+
+    def tolist(self):
+        """
+        Return the values of the vector as a list.
+        """
+        return self.toarray().tolist()
+
+    def leaves(self):
+        """
+        Return an iterator of read only memoryviews of the leaves of the vector, in order.
+        No data is copied, the views can be passed to for example numpy.frombuffer.
+
+        >>> vec = pvector_typed('d', range(40))
+        >>> [len(leaf) for leaf in vec.leaves()]
+        [32, 8]
+        """
+        for leaf in _leaf_nodes(self._root, self._shift):
+            yield _readonly(memoryview(leaf))
+
+        if self._tail:
+            yield _readonly(memoryview(self._tail))
+
+    def buffer(self, start=0, stop=None):
+        """
+        Return a read only memoryview of the values from start to stop. Ranges within one leaf
+        of 32 values are returned without copying, larger ranges are packed into a new array.
+
+        >>> vec = pvector_typed('i', range(100))
+        >>> vec.buffer(40, 45).tolist()
+        [40, 41, 42, 43, 44]
+        """
+        start, stop, _ = slice(start, stop).indices(self._count)
+        if start >= stop:
+            return _readonly(memoryview(array(self._typecode)))
+
+        if (start >> SHIFT) == ((stop - 1) >> SHIFT):
+            offset = start & BIT_MASK
+            return _readonly(memoryview(_node_for(self, start)))[offset:offset + stop - start]
+
+        result = array(self._typecode)
+        for leaf_start in range(start & ~BIT_MASK, stop, BRANCH_FACTOR):
+            leaf = _node_for(self, leaf_start)
+            result.extend(leaf[max(start - leaf_start, 0):stop - leaf_start])
+
+        return _readonly(memoryview(result))
+
+    def append(self, val):
+        if len(self._tail) < BRANCH_FACTOR:
+            new_tail = self._tail[:]
+            new_tail.append(val)
+            return PTypedVector(self._typecode, self._count + 1, self._shift, self._root, new_tail)
+
+        new_root, new_shift = self._push_tail()
+        return PTypedVector(self._typecode, self._count + 1, new_shift, new_root, array(self._typecode, (val,)))
+
+    def _push_tail(self):
+        # Overflow root?
+        if (self._count >> SHIFT) > (1 << self._shift):  # >>>
+            return [self._root, _new_path(self._shift, self._tail)], self._shift + SHIFT
+
+        return _push_leaf(self._shift, self._root, self._tail, self._count), self._shift
+
+    def extend(self, obj):
+        values = _as_array(self._typecode, obj)
+        if not values:
+            return self
+
+        # Mutates the new vector directly for efficiency but that's only an
+        # implementation detail, once it is returned it should be considered immutable
+        result = PTypedVector(self._typecode, self._count, self._shift, self._root, self._tail[:])
+        offset = 0
+        while offset < len(values):
+            if len(result._tail) == BRANCH_FACTOR:
+                result._root, result._shift = result._push_tail()
+                result._tail = array(self._typecode)
+
+            delta = values[offset:offset + BRANCH_FACTOR - len(result._tail)]
+            result._tail.extend(delta)
+            result._count += len(delta)
+            offset += len(delta)
+
+        result._tail_offset = result._count - len(result._tail)
+        return result
+
+    def set(self, i, val):
+        if not isinstance(i, Integral):
+            raise TypeError("'%s' object cannot be interpreted as an index" % type(i).__name__)
+
+        if i < 0:
+            i += self._count
+
+        if 0 <= i < self._count:
+            if i >= self._tail_offset:
+                new_tail = self._tail[:]
+                new_tail[i & BIT_MASK] = val
+                return PTypedVector(self._typecode, self._count, self._shift, self._root, new_tail)
+
+            return PTypedVector(self._typecode, self._count, self._shift,
+                                _do_set(self._shift, self._root, i, val), self._tail)
+
+        if i == self._count:
+            return self.append(val)
+
+        raise IndexError("Index out of range: %s" % (i,))
+
+    def mset(self, *args):
+        if len(args) % 2:
+            raise TypeError("mset expected an even number of arguments")
+
+        evolver = self.evolver()
+        for i in range(0, len(args), 2):
+            evolver[args[i]] = args[i+1]
+
+        return evolver.persistent()
+
+    def mset_many(self, indices, values):
+        return _mset_many(self, indices, values)
+
+    def take(self, indices):
+        return _from_array(array(self._typecode, _take(self, indices)))
+
+    def map(self, fn):
+        return PTypedVector(self._typecode, self._count, self._shift,
+                            _map_node(self._root, self._shift, fn, self._typecode),
+                            _map_node(self._tail, 0, fn, self._typecode))
+
+    def _with_leaves(self, leaves):
+        """
+        Return a copy of the vector where the leaves at the indices in the leaves dict have
+        been replaced. Internal nodes on the paths to several of the leaves are only copied once.
+        """
+        root = self._root
+        tail = self._tail
+        tail_index = self._tail_offset >> SHIFT
+        copied = set()
+        for leaf_index, leaf in leaves.items():
+            if leaf_index == tail_index:
+                tail = leaf
+            else:
+                root = _replace_leaf(self._shift, root, leaf_index << SHIFT, leaf, copied)
+
+        return PTypedVector(self._typecode, self._count, self._shift, root, tail)
+
+    def index(self, value, *args, **kwargs):
+        return self.tolist().index(value, *args, **kwargs)
+
+    def count(self, value):
+        return self.toarray().count(value)
+
+    def delete(self, index, stop=None):
+        values = self.toarray()
+        del values[_index_or_slice(index, stop)]
+        return _from_array(values)
+
+    def remove(self, value):
+        values = self.toarray()
+        values.remove(value)
+        return _from_array(values)
+
+    def transform(self, *transformations):
+        return transform(self, transformations)
+
+    class Evolver(object):
+        __slots__ = ('_vector', '_leaves', '_extra_tail', '_orig_vector')
+
+        def __init__(self, vector):
+            self._reset(vector)
+
+        def _reset(self, vector):
+            self._vector = vector
+            self._orig_vector = vector
+
+            # Copies of the leaves that have been modified, by leaf index
+            self._leaves = {}
+            self._extra_tail = array(vector._typecode)
+
+        def _index(self, index):
+            if not isinstance(index, Integral):
+                raise TypeError("'%s' object cannot be interpreted as an index" % type(index).__name__)
+
+            if index < 0:
+                index += len(self)
+
+            return index
+
+        def __getitem__(self, index):
+            index = self._index(index)
+            count = self._vector._count
+            if index >= count:
+                return self._extra_tail[index - count]
+
+            leaf = self._leaves.get(index >> SHIFT)
+            if leaf is None:
+                leaf = _node_for(self._vector, index)
+
+            return leaf[index & BIT_MASK]
+
+        def __setitem__(self, index, val):
+            index = self._index(index)
+            count = self._vector._count
+            if 0 <= index < count:
+                leaf = self._leaves.get(index >> SHIFT)
+                if leaf is None:
+                    leaf = _node_for(self._vector, index)[:]
+                    self._leaves[index >> SHIFT] = leaf
+                leaf[index & BIT_MASK] = val
+            elif count <= index < len(self):
+                self._extra_tail[index - count] = val
+            elif index == len(self):
+                self._extra_tail.append(val)
+            else:
+                raise IndexError("Index out of range: %s" % (index,))
+
+        def set(self, index, val):
+            self[index] = val
+            return self
+
+        def append(self, element):
+            self._extra_tail.append(element)
+            return self
+
+        def extend(self, iterable):
+            self._extra_tail.extend(_as_array(self._extra_tail.typecode, iterable))
+            return self
+
+        def delete(self, index):
+            del self[index]
+            return self
+
+        def __delitem__(self, key):
+            values = self._current().toarray()
+            del values[key]
+
+            orig_vector = self._orig_vector
+            self._reset(_from_array(values))
+            self._orig_vector = orig_vector
+
+        def _current(self):
+            return self._vector._with_leaves(self._leaves).extend(self._extra_tail)
+
+        def persistent(self):
+            result = self._orig_vector
+            if self.is_dirty():
+                result = self._current()
+                self._reset(result)
+
+            return result
+
+        def __len__(self):
+            return self._vector._count + len(self._extra_tail)
+
+        def is_dirty(self):
+            return bool(self._leaves or self._extra_tail) or self._vector is not self._orig_vector
+
+    def evolver(self):
+        """
+        Create an evolver for the vector, see :py:meth:`PVector.evolver`.
+        """
+        return PTypedVector.Evolver(self)
+
+PVector.register(PTypedVector)
+
+
+def pvector_typed(typecode, iterable=()):
+    """
+    Create a new persistent vector of primitive values of the type given by typecode, one
+    of the typecodes of the array module such as 'd' for floats or 'q' for 64 bit ints.
+    The values are stored packed in the leaves of the vector rather than as Python objects.
+
+    >>> v1 = pvector_typed('d', [1, 2.5])
+    >>> v1
+    pvector_typed('d', [1.0, 2.5])
+    >>> v1.append(3)
+    pvector_typed('d', [1.0, 2.5, 3.0])
+    """
+    return _from_array(array(typecode, iterable))
@@ -1,7 +1,9 @@
 from abc import abstractmethod, ABCMeta
 from ._compat import Sequence, Hashable
 from numbers import Integral
+import array
 import operator
+import sys
 import six
 from pyrsistent._transformations import transform
 
@@ -14,6 +16,16 @@ BIT_MASK = BRANCH_FACTOR - 1
 SHIFT = _bitcount(BIT_MASK)
 
 
+try:
+    from pickle import PickleBuffer
+except ImportError:
+    # Out of band pickling requires Python 3.8+
+    PickleBuffer = None
+
+# Vectors of at least this size holding primitive values are pickled as a single buffer
+_OUT_OF_BAND_MIN_SIZE = 256
+
+
 def compare_pvector(v, other, operator):
     return operator(v.tolist(), other.tolist() if isinstance(other, PVector) else other)
 
@@ -138,6 +150,29 @@ class PythonPVector(object):
         # Pickling support
         return pvector, (self.tolist(),)
 
+    def __reduce_ex__(self, protocol):
+        # Subclasses, such as the checked vectors, provide their own reduce
+        if PickleBuffer is not None and protocol >= 5 and self._count >= _OUT_OF_BAND_MIN_SIZE and \
+                type(self) is PythonPVector:
+            packed = _pack_primitives(self.tolist())
+            if packed is not None:
+                return _pvector_from_buffer, (packed.typecode, PickleBuffer(packed), sys.byteorder)
+
+        return self.__reduce__()
+
+    def _trie_export(self, memo):
+        """
+        Export the trie as nested tuples, sharing tuples with earlier exports through memo.
+        Used by pyrsistent.serialization, see _trie_import.
+        """
+        root = self._root
+        tail = self._tail
+        if self._count and not tail:
+            # The exported trie always keeps the last elements in the tail, like the C implementation
+            root, tail = _split_last_leaf(root, self._shift)
+
+        return self._count, self._shift, _export_node(root, self._shift, memo), _export_node(tail, 0, memo)
+
     def mset(self, *args):
         if len(args) % 2:
             raise TypeError("mset expected an even number of arguments")
@@ -148,6 +183,16 @@ class PythonPVector(object):
 
         return evolver.persistent()
 
+    def mset_many(self, indices, values):
+        return _mset_many(self, indices, values)
+
+    def take(self, indices):
+        return _EMPTY_PVECTOR.extend(_take(self, indices))
+
+    def map(self, fn):
+        return PythonPVector(self._count, self._shift, _map_node(self._root, self._shift, fn),
+                             [fn(x) for x in self._tail])
+
     class Evolver(object):
         __slots__ = ('_count', '_shift', '_root', '_tail', '_tail_offset', '_dirty_nodes',
                      '_extra_tail', '_cached_leafs', '_orig_pvector')
@@ -560,6 +605,39 @@ class PVector(object):
         pvector([11, 2, 33])
         """
 
+    @abstractmethod
+    def mset_many(self, indices, values):
+        """
+        Return a new vector with the elements at indices replaced by the corresponding values.
+        Indices may be any iterable of integers, such as an array or a NumPy array. Each node in
+        the vector that is touched is only copied once, regardless of the number of values set in it.
+
+        >>> v1 = v(1, 2, 3)
+        >>> v1.mset_many([0, 2], [11, 33])
+        pvector([11, 2, 33])
+        """
+
+    @abstractmethod
+    def take(self, indices):
+        """
+        Return a new vector with the elements at indices. Indices may be any iterable of
+        integers, such as an array or a NumPy array.
+
+        >>> v1 = v(10, 20, 30)
+        >>> v1.take([2, 0, -1])
+        pvector([30, 10, 30])
+        """
+
+    @abstractmethod
+    def map(self, fn):
+        """
+        Return a new vector with the result of applying fn to each element, in order.
+
+        >>> v1 = v(1, 2, 3)
+        >>> v1.map(str)
+        pvector(['1', '2', '3'])
+        """
+
     @abstractmethod
     def set(self, i, val):
         """
@@ -675,6 +753,130 @@ class PVector(object):
         """
 
 
+def _take(vector, indices):
+    """
+    Return a list of the elements at indices in vector. The path to each leaf is only walked once.
+    """
+    leaves = {}
+    result = []
+    count = vector._count
+    for i in indices:
+        i = operator.index(i)
+        if i < 0:
+            i += count
+
+        if not 0 <= i < count:
+            raise IndexError("Index out of range: %s" % (i,))
+
+        leaf = leaves.get(i >> SHIFT)
+        if leaf is None:
+            leaf = leaves[i >> SHIFT] = PythonPVector._node_for(vector, i)
+
+        result.append(leaf[i & BIT_MASK])
+
+    return result
+
+
+def _mset_many(vector, indices, values):
+    indices = list(indices)
+    values = list(values)
+    if len(indices) != len(values):
+        raise ValueError("mset_many expected the same number of indices and values")
+
+    # The evolvers only copy each touched node once
+    evolver = vector.evolver()
+    for i, value in zip(indices, values):
+        evolver[i] = value
+
+    return evolver.persistent()
+
+
+def _map_node(node, level, fn):
+    if level:
+        return [_map_node(child, level - SHIFT, fn) for child in node]
+
+    return [fn(x) for x in node]
+
+
+def _pack_primitives(values):
+    """
+    Returns an array holding values if they are all floats or all ints that fit in
+    64 bits, None otherwise.
+    """
+    first_type = type(values[0])
+    if first_type is float:
+        typecode = 'd'
+    elif first_type is int:
+        typecode = 'q'
+    else:
+        return None
+
+    if not all(type(value) is first_type for value in values):
+        return None
+
+    try:
+        return array.array(typecode, values)
+    except OverflowError:
+        return None
+
+
+def _pvector_from_buffer(typecode, buffer, byteorder):
+    values = array.array(typecode)
+    values.frombytes(memoryview(buffer).cast('B'))
+    if byteorder != sys.byteorder:
+        values.byteswap()
+
+    return pvector(values.tolist())
+
+
+def _split_last_leaf(node, level):
+    if level == SHIFT:
+        return node[:-1], node[-1]
+
+    child, leaf = _split_last_leaf(node[-1], level - SHIFT)
+    return (node[:-1] + [child] if child else node[:-1]), leaf
+
+
+def _export_node(node, level, memo):
+    # The list is stored in the memo to keep its id valid
+    key = (id(node), len(node)) if level == 0 else id(node)
+    entry = memo.get(key)
+    if entry is None:
+        if level:
+            entry = tuple(_export_node(n, level - SHIFT, memo) for n in node), node
+        else:
+            entry = tuple(node), node
+
+        memo[key] = entry
+
+    return entry[0]
+
+
+def _import_node(node, level, memo):
+    entry = memo.get(id(node))
+    if entry is None:
+        if level:
+            entry = node, [_import_node(n, level - SHIFT, memo) for n in node]
+        else:
+            entry = node, list(node)
+
+        memo[id(node)] = entry
+
+    return entry[1]
+
+
+def _python_trie_import(count, shift, root, tail, memo):
+    """
+    Create a new PythonPVector from a trie exported with _trie_export. Nodes that
+    are shared in the exported tries will also be shared between the imported vectors
+    as long as the same memo is used.
+    """
+    if len(tail) > BRANCH_FACTOR or (count - len(tail)) % BRANCH_FACTOR:
+        raise ValueError('Trie does not match vector size')
+
+    return PythonPVector(count, shift, _import_node(root, shift, memo), list(tail))
+
+
 _EMPTY_PVECTOR = PythonPVector(0, SHIFT, [], [])
 PVector.register(PythonPVector)
 Sequence.register(PVector)
@@ -695,11 +897,13 @@ try:
     import os
     if os.environ.get('PYRSISTENT_NO_C_EXTENSION'):
         pvector = python_pvector
+        _trie_import = _python_trie_import
     else:
-        from pvectorc import pvector
+        from pvectorc import pvector, _trie_import
         PVector.register(type(pvector()))
 except ImportError:
     pvector = python_pvector
+    _trie_import = _python_trie_import
 
 
 def v(*elements):
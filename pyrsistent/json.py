@@ -0,0 +1,500 @@
+"""Convert between JSON and persistent structures without intermediate copies.
+
+The functions in this module mirror :py:func:`json.loads` and :py:func:`json.load` but return
+pmaps and pvectors built while the document is being parsed rather than plain dicts and
+lists that have to be copied with :py:func:`~pyrsistent.freeze` afterwards. This avoids
+holding two full copies of the document in memory at the same time.
+
+:py:func:`iterload` decodes a stream of documents, or the items of one large top level
+array, incrementally.
+
+:py:func:`dump` and :py:func:`dumps` encode persistent structures, including checked types
+with their custom serializers, by walking them directly instead of first converting them
+with :py:func:`~pyrsistent.thaw` or serialize().
+"""
+from __future__ import absolute_import
+
+import json as _json
+
+import six
+
+from pyrsistent._checked_types import (
+    CheckedType, CheckedPMap, CheckedPVector, _default_serializer, _default_map_serializer)
+from pyrsistent._compat import Mapping, Sequence
+from pyrsistent._field_common import PFIELD_NO_SERIALIZER
+from pyrsistent._pclass import PClass, _MISSING_VALUE
+from pyrsistent._pmap import PMap, pmap
+from pyrsistent._precord import PRecord
+from pyrsistent._pvector import PVector, PythonPVector, pvector
+
+__all__ = ('loads', 'load', 'iterload', 'dumps', 'dump')
+
+
+def _persistent_array(values):
+    # Arrays are always decoded to plain lists by the json module, objects have already
+    # been converted by the time an array containing them is seen.
+    for i, value in enumerate(values):
+        if type(value) is list:
+            values[i] = _persistent_array(value)
+
+    return pvector(values)
+
+
+def _persistent_object(pairs):
+    if not pairs:
+        return pmap()
+
+    size = 2 * len(pairs)
+    buckets = size * [None]
+    count = 0
+    for k, v in pairs:
+        if type(v) is list:
+            v = _persistent_array(v)
+
+        index = hash(k) % size
+        bucket = buckets[index]
+        if bucket:
+            for i, (k2, _) in enumerate(bucket):
+                if k2 == k:
+                    # Duplicate keys, the last one wins just like for json.loads
+                    bucket[i] = (k, v)
+                    break
+            else:
+                bucket.append((k, v))
+                count += 1
+        else:
+            buckets[index] = [(k, v)]
+            count += 1
+
+    return PMap(count, pvector().extend(buckets))
+
+
+def _decoder(kwargs):
+    if 'object_hook' in kwargs or 'object_pairs_hook' in kwargs:
+        raise TypeError('object_hook and object_pairs_hook are not supported')
+
+    return _json.JSONDecoder(object_pairs_hook=_persistent_object, **kwargs)
+
+
+def _finish(value, record_type, ignore_extra):
+    if type(value) is list:
+        value = _persistent_array(value)
+
+    if record_type is None:
+        return value
+
+    if ignore_extra:
+        return record_type.create(value, ignore_extra=True)
+
+    return record_type.create(value)
+
+
+def loads(s, record_type=None, ignore_extra=False, **kwargs):
+    """
+    Deserialize the JSON document in s into persistent structures. Objects are
+    decoded to pmaps and arrays to pvectors.
+
+    If record_type is given the decoded document is passed to its create() method,
+    record_type is typically a PRecord or PClass but can be any CheckedType.
+    ignore_extra is passed on to create() for types that support it.
+
+    Remaining keyword arguments are passed on to :py:class:`json.JSONDecoder`.
+
+    >>> loads('{"a": [1, {"b": 2}]}')
+    pmap({'a': pvector([1, pmap({'b': 2})])})
+    """
+    return _finish(_decoder(kwargs).decode(s), record_type, ignore_extra)
+
+
+def load(fp, record_type=None, ignore_extra=False, **kwargs):
+    """
+    Like :py:func:`loads` but reads the document from the file like object fp.
+    """
+    return loads(fp.read(), record_type=record_type, ignore_extra=ignore_extra, **kwargs)
+
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_START = '-0123456789'
+_NUMBER_CHARS = '+-.0123456789eE'
+
+
+class _Reader(object):
+    """
+    Buffer over a file like object that decodes one value at a time, only keeping
+    the text of the value currently being decoded in memory.
+    """
+    def __init__(self, fp, decoder, chunk_size):
+        self._fp = fp
+        self._decoder = decoder
+        self._chunk_size = chunk_size
+        self._buffer = fp.read(0)
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+
+        # Read at least as much as is currently buffered to avoid quadratic behaviour
+        # when decoding values that are much larger than the chunk size.
+        remaining = self._buffer[self._pos:]
+        data = self._fp.read(max(self._chunk_size, len(remaining)))
+        if not data:
+            self._eof = True
+            return False
+
+        self._buffer = remaining + data
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, or None at the end of the stream.
+        """
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+
+            if not self._fill():
+                return None
+
+    def skip(self):
+        self._pos += 1
+
+    def value(self):
+        if self.peek() is None:
+            raise ValueError('Unexpected end of JSON stream')
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if self._fill():
+                    continue
+                raise
+
+            # A number that reaches the end of the buffer, or is followed by characters
+            # that could continue it ('1.' or '2e'), may be completed by the next chunk.
+            buffer = self._buffer
+            if (buffer[self._pos] in _NUMBER_START and
+                    (end == len(buffer) or buffer[end] in _NUMBER_CHARS) and
+                    self._fill()):
+                continue
+
+            self._pos = end
+            return value
+
+
+def _expect(reader, expected):
+    char = reader.peek()
+    if char is None or char not in expected:
+        raise ValueError('Expected one of {0!r} in JSON array stream, found {1!r}'.format(expected, char))
+
+    reader.skip()
+    return char
+
+
+def iterload(fp, record_type=None, ignore_extra=False, array=False, chunk_size=65536, **kwargs):
+    """
+    Incrementally decode JSON from the file like object fp, yielding one persistent
+    value at a time. Only the text of the value currently being decoded is kept
+    in memory.
+
+    By default fp is expected to contain a sequence of whitespace separated documents,
+    for example JSON lines. If array is True fp must instead contain one top level array,
+    the items of which are decoded and yielded one by one.
+
+    record_type, ignore_extra and the keyword arguments are applied to every
+    yielded value as described for :py:func:`loads`.
+
+    >>> from io import StringIO
+    >>> list(iterload(StringIO(u'{"a": 1}\\n{"a": 2}\\n')))
+    [pmap({'a': 1}), pmap({'a': 2})]
+    >>> list(iterload(StringIO(u'[[1], [2, 3]]'), array=True))
+    [pvector([1]), pvector([2, 3])]
+    """
+    reader = _Reader(fp, _decoder(kwargs), chunk_size)
+    if array:
+        _expect(reader, '[')
+        if reader.peek() == ']':
+            reader.skip()
+        else:
+            while True:
+                yield _finish(reader.value(), record_type, ignore_extra)
+                if _expect(reader, ',]') == ']':
+                    break
+
+        if reader.peek() is not None:
+            raise ValueError('Extra data after JSON array')
+    else:
+        while reader.peek() is not None:
+            yield _finish(reader.value(), record_type, ignore_extra)
+
+
+_INFINITY = float('inf')
+
+# Number of encoded parts to collect before writing them to the output
+_FLUSH_THRESHOLD = 1024
+
+
+def _python_pvector_leaves(vector):
+    stack = [(vector._root, vector._shift)]
+    while stack:
+        node, shift = stack.pop()
+        if shift:
+            shift -= 5
+            stack.extend((n, shift) for n in reversed(node))
+        else:
+            yield node
+
+    yield vector._tail
+
+
+def _make_encoder(parts, flush, skipkeys, ensure_ascii, allow_nan, sort_keys, separators, default):
+    if separators:
+        item_separator, key_separator = separators
+    else:
+        item_separator, key_separator = ', ', ': '
+
+    encode_string = _json.encoder.encode_basestring_ascii if ensure_ascii else _json.encoder.encode_basestring
+    append = parts.append
+
+    def encode_float(o):
+        if o != o:
+            text = 'NaN'
+        elif o == _INFINITY:
+            text = 'Infinity'
+        elif o == -_INFINITY:
+            text = '-Infinity'
+        else:
+            return float.__repr__(o)
+
+        if not allow_nan:
+            raise ValueError('Out of range float values are not JSON compliant: ' + repr(o))
+
+        return text
+
+    def encode_key(key):
+        if isinstance(key, six.string_types):
+            return encode_string(key)
+
+        if key is True:
+            key = 'true'
+        elif key is False:
+            key = 'false'
+        elif key is None:
+            key = 'null'
+        elif isinstance(key, six.integer_types):
+            key = '%d' % key
+        elif isinstance(key, float):
+            key = encode_float(key)
+        elif skipkeys:
+            return None
+        else:
+            raise TypeError('keys must be str, int, float, bool or None, not {0}'.format(type(key).__name__))
+
+        return '"' + key + '"'
+
+    def encode_items(items, format):
+        # items is an iterable of (key, value, serializer) where the serializer is
+        # None if the value should be encoded as is.
+        if sort_keys:
+            items = sorted(items, key=lambda item: item[0])
+
+        append('{')
+        first = True
+        for key, value, serializer in items:
+            encoded_key = encode_key(key)
+            if encoded_key is None:
+                continue
+
+            if first:
+                first = False
+            else:
+                append(item_separator)
+
+            append(encoded_key)
+            append(key_separator)
+            if serializer is None:
+                encode(value, format)
+            else:
+                encode(serializer(format, value), format)
+
+            if len(parts) > _FLUSH_THRESHOLD:
+                flush()
+
+        append('}')
+
+    def encode_values(values, format, serializer=None):
+        append('[')
+        first = True
+        for value in values:
+            if first:
+                first = False
+            else:
+                append(item_separator)
+
+            if serializer is None:
+                encode(value, format)
+            else:
+                encode(serializer(format, value), format)
+
+            if len(parts) > _FLUSH_THRESHOLD:
+                flush()
+
+        append(']')
+
+    def pmap_items(o):
+        for bucket in o._buckets:
+            if bucket:
+                for k, v in bucket:
+                    yield k, v, None
+
+    def precord_items(o):
+        # Compact records have no buckets to read from
+        fields = o._precord_fields
+        for k, v in o.iteritems():
+            serializer = fields[k].serializer
+            if serializer is PFIELD_NO_SERIALIZER:
+                yield k, v, None
+            else:
+                yield k, v, serializer
+
+    def pclass_items(o):
+        for name, field in six.iteritems(o._pclass_fields):
+            value = getattr(o, name, _MISSING_VALUE)
+            if value is not _MISSING_VALUE:
+                serializer = field.serializer
+                yield name, value, None if serializer is PFIELD_NO_SERIALIZER else serializer
+
+    def checked_pmap_items(o, serializer, format):
+        for k, v, _ in pmap_items(o):
+            k, v = serializer(format, k, v)
+            yield k, v, None
+
+    def encode_vector(o, format, serializer=None):
+        if isinstance(o, PythonPVector):
+            append('[')
+            first = True
+            for leaf in _python_pvector_leaves(o):
+                for value in leaf:
+                    if first:
+                        first = False
+                    else:
+                        append(item_separator)
+
+                    if serializer is None:
+                        encode(value, format)
+                    else:
+                        encode(serializer(format, value), format)
+
+                if len(parts) > _FLUSH_THRESHOLD:
+                    flush()
+
+            append(']')
+        else:
+            encode_values(o, format, serializer)
+
+    def encode(o, format):
+        typ = type(o)
+        if typ is str or typ is six.text_type:
+            append(encode_string(o))
+        elif o is None:
+            append('null')
+        elif o is True:
+            append('true')
+        elif o is False:
+            append('false')
+        elif typ is int or isinstance(o, six.integer_types):
+            append('%d' % o)
+        elif isinstance(o, float):
+            append(encode_float(o))
+        elif isinstance(o, six.string_types):
+            append(encode_string(o))
+        elif isinstance(o, CheckedType):
+            encode_checked(o, format)
+        elif isinstance(o, PMap):
+            encode_items(pmap_items(o), format)
+        elif typ is list or typ is tuple or isinstance(o, PVector):
+            encode_vector(o, format)
+        elif isinstance(o, Mapping):
+            encode_items(((k, v, None) for k, v in six.iteritems(o)), format)
+        elif isinstance(o, (list, tuple, Sequence)):
+            encode_values(o, format)
+        elif default is not None:
+            encode(default(o), format)
+        else:
+            raise TypeError('Object of type {0} is not JSON serializable'.format(typ.__name__))
+
+    def encode_checked(o, format):
+        # Mirrors the serialize() methods of the checked types
+        if isinstance(o, PRecord):
+            encode_items(precord_items(o), format)
+        elif isinstance(o, PClass):
+            encode_items(pclass_items(o), format)
+        elif isinstance(o, CheckedPVector):
+            serializer = type(o).__serializer__
+            if getattr(serializer, '__func__', serializer) is _default_serializer:
+                # The default serializer serializes checked types without format
+                encode_vector(o, None)
+            else:
+                encode_vector(o, format, o.__serializer__)
+        elif isinstance(o, CheckedPMap):
+            serializer = type(o).__serializer__
+            if getattr(serializer, '__func__', serializer) is _default_map_serializer:
+                encode_items(pmap_items(o), None)
+            else:
+                encode_items(checked_pmap_items(o, o.__serializer__, format), format)
+        else:
+            encode(o.serialize(format), format)
+
+    return encode
+
+
+def dump(obj, fp, format=None, skipkeys=False, ensure_ascii=True, allow_nan=True,
+         sort_keys=False, separators=None, default=None):
+    """
+    Serialize obj as JSON to the file like object fp. The output is written in chunks
+    while obj is traversed so no full copy of the document is built in memory.
+
+    PMaps and PVectors, and other mappings and sequences, are encoded as objects and arrays.
+    PRecords, PClasses, CheckedPVectors and CheckedPMaps are encoded like the result of
+    their serialize(format) method, respecting custom field and type serializers. Other
+    CheckedTypes are encoded by calling serialize(format) on them.
+
+    The remaining arguments have the same meaning as for :py:func:`json.dump`.
+    """
+    parts = []
+
+    def flush():
+        fp.write(''.join(parts))
+        del parts[:]
+
+    encode = _make_encoder(parts, flush, skipkeys, ensure_ascii, allow_nan, sort_keys, separators, default)
+    encode(obj, format)
+    flush()
+
+
+def dumps(obj, format=None, skipkeys=False, ensure_ascii=True, allow_nan=True,
+          sort_keys=False, separators=None, default=None):
+    """
+    Serialize obj to a JSON formatted string, see :py:func:`dump`.
+
+    >>> dumps(pvector([1, pmap({'a': pvector([2.5, None])})]))
+    '[1, {"a": [2.5, null]}]'
+    """
+    parts = []
+
+    def flush():
+        # Everything is returned at once, just keep collecting parts
+        pass
+
+    encode = _make_encoder(parts, flush, skipkeys, ensure_ascii, allow_nan, sort_keys, separators, default)
+    encode(obj, format)
+    return ''.join(parts)
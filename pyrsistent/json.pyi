@@ -0,0 +1,20 @@
+# flake8: noqa: E704
+from typing import Any
+from typing import Callable
+from typing import IO
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+
+def loads(s: str, record_type: Optional[Type] = None, ignore_extra: bool = False, **kwargs: Any) -> Any: ...
+def load(fp: IO, record_type: Optional[Type] = None, ignore_extra: bool = False, **kwargs: Any) -> Any: ...
+def iterload(fp: IO, record_type: Optional[Type] = None, ignore_extra: bool = False, array: bool = False,
+             chunk_size: int = 65536, **kwargs: Any) -> Iterator[Any]: ...
+def dumps(obj: Any, format: Any = None, skipkeys: bool = False, ensure_ascii: bool = True, allow_nan: bool = True,
+          sort_keys: bool = False, separators: Optional[Tuple[str, str]] = None,
+          default: Optional[Callable[[Any], Any]] = None) -> str: ...
+def dump(obj: Any, fp: IO, format: Any = None, skipkeys: bool = False, ensure_ascii: bool = True,
+         allow_nan: bool = True, sort_keys: bool = False, separators: Optional[Tuple[str, str]] = None,
+         default: Optional[Callable[[Any], Any]] = None) -> None: ...
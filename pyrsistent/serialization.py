@@ -0,0 +1,240 @@
+"""Binary serialization of persistent structures that preserves structural sharing.
+
+Regular pickling of the persistent types converts every structure into a plain list or dict
+first. Structures that share most of their data, such as successive versions of the same
+map, are therefore stored as full independent copies and come back as such when loaded.
+
+The functions in this module are drop in replacements for those in the pickle module. They
+pickle vectors and maps, and the types built on top of them, as their underlying tries. Each
+trie node is written once, no matter how many structures in the pickled object graph share
+it, and the sharing is restored on load.
+
+>>> from pyrsistent import pmap
+>>> versions = [pmap(dict((i, i) for i in range(1000)))]
+>>> for i in range(99):
+...     versions.append(versions[-1].set(i, -i))
+>>> len(dumps(versions)) < len(pickle.dumps(versions)) / 10
+True
+>>> loads(dumps(versions)) == versions
+True
+
+The data format is pickle, the same caveats regarding security apply. Never load data
+received from an untrusted or unauthenticated source.
+"""
+from __future__ import absolute_import
+
+import io
+import pickle
+
+import six
+
+from pyrsistent._checked_types import CheckedType, CheckedPMap, CheckedPSet, CheckedPVector
+from pyrsistent._pbag import PBag
+from pyrsistent._pdeque import PDeque
+from pyrsistent._plist import PList
+from pyrsistent._pmap import PMap
+from pyrsistent._precord import PRecord
+from pyrsistent._pset import PSet
+from pyrsistent._pvector import PythonPVector, pvector, _trie_import, _python_trie_import
+
+__all__ = ('dumps', 'dump', 'loads', 'load')
+
+
+class _TrieMemo(dict):
+    """
+    Memo of imported trie nodes. A single, empty, instance is pickled and passed to every
+    vector that is restored so that nodes shared between vectors are only created once.
+    """
+    def __reduce__(self):
+        return _TrieMemo, ()
+
+
+def _pvector_from_trie(count, shift, root, tail, memo):
+    return _trie_import(count, shift, root, tail, memo)
+
+
+def _plist_from(values, base):
+    result = base
+    for value in reversed(values):
+        result = result.cons(value)
+
+    return result
+
+
+def _checked_type(restorer):
+    if isinstance(restorer, tuple):
+        # Types generated for fields are looked up in a registry
+        fn, args = restorer
+        return fn(*args)
+
+    return restorer
+
+
+def _checked_pvector_from_trie(restorer, count, shift, root, tail, memo):
+    # Checked vectors are always backed by the Python implementation
+    return _checked_type(restorer)(_python_trie_import(count, shift, root, tail, memo))
+
+
+def _checked_pset_from_map(restorer, m):
+    return _checked_type(restorer)(m)
+
+
+def _checked_pmap_from_buckets(restorer, size, buckets):
+    return _checked_type(restorer)(buckets, size)
+
+
+def _precord_from_buckets(cls, size, buckets):
+    return cls(_precord_size=size, _precord_buckets=buckets)
+
+
+class _DispatchTable(dict):
+    """
+    Pickler dispatch table that reduces persistent types to their underlying structure.
+    Reducers are looked up by type on first use and cached.
+    """
+    def __init__(self):
+        super(_DispatchTable, self).__init__()
+        self._ignored = set()
+        self._export_memo = {}
+        self._trie_memo = _TrieMemo()
+        self._python_trie_memo = _TrieMemo()
+        self._plist_heads = {}
+
+    def __missing__(self, typ):
+        if typ not in self._ignored:
+            reducer = self._reducer_for(typ)
+            if reducer is not None:
+                self[typ] = reducer
+                return reducer
+
+            self._ignored.add(typ)
+
+        raise KeyError(typ)
+
+    def _reducer_for(self, typ):
+        if issubclass(typ, PRecord):
+            return self._reduce_precord
+
+        if issubclass(typ, CheckedPVector):
+            return self._reduce_checked_pvector
+
+        if issubclass(typ, CheckedPSet):
+            return self._reduce_checked_pset
+
+        if issubclass(typ, CheckedPMap):
+            return self._reduce_checked_pmap
+
+        if issubclass(typ, CheckedType):
+            # Other checked types, such as PClasses, use their regular reduce
+            return None
+
+        if typ in _PVECTOR_TYPES:
+            return self._reduce_pvector
+
+        return {PMap: self._reduce_pmap,
+                PSet: self._reduce_pset,
+                PBag: self._reduce_pbag,
+                PDeque: self._reduce_pdeque,
+                PList: self._reduce_plist}.get(typ)
+
+    def _reduce_pvector(self, vector):
+        return _pvector_from_trie, vector._trie_export(self._export_memo) + (self._trie_memo,)
+
+    def _reduce_pmap(self, m):
+        return PMap, (m._size, m._buckets)
+
+    def _reduce_pset(self, s):
+        return PSet, (s._map,)
+
+    def _reduce_pbag(self, b):
+        return PBag, (b._counts,)
+
+    def _reduce_pdeque(self, d):
+        return PDeque, (d._left_list, d._right_list, d._length, d._maxlen)
+
+    def _reduce_plist(self, pl):
+        # Only the values up to the first cell that is the head of an already pickled
+        # list are stored, the rest of the list is a reference to that list.
+        values = []
+        cell = pl
+        while cell and id(cell) not in self._plist_heads:
+            values.append(cell.first)
+            cell = cell.rest
+
+        self._plist_heads[id(pl)] = pl
+        return _plist_from, (values, cell)
+
+    def _restorer(self, typ):
+        return typ.__dict__.get('_field_type_restorer', typ)
+
+    def _reduce_precord(self, record):
+        return _precord_from_buckets, (type(record), record._size, record._buckets)
+
+    def _reduce_checked_pvector(self, vector):
+        return _checked_pvector_from_trie, ((self._restorer(type(vector)),) +
+                                            vector._trie_export(self._export_memo) + (self._python_trie_memo,))
+
+    def _reduce_checked_pset(self, s):
+        return _checked_pset_from_map, (self._restorer(type(s)), s._map)
+
+    def _reduce_checked_pmap(self, m):
+        return _checked_pmap_from_buckets, (self._restorer(type(m)), m._size, m._buckets)
+
+
+_PVECTOR_TYPES = (PythonPVector, type(pvector()))
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, protocol):
+        pickle.Pickler.__init__(self, file, protocol)
+        self.dispatch_table = _DispatchTable()
+
+    if six.PY2:
+        # Dispatch tables are not supported by the Python 2 picklers
+        def save(self, obj):
+            if id(obj) not in self.memo:
+                try:
+                    reducer = self.dispatch_table[type(obj)]
+                except KeyError:
+                    pass
+                else:
+                    self.save_reduce(obj=obj, *reducer(obj))
+                    return
+
+            pickle.Pickler.save(self, obj)
+
+
+def dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL):
+    """
+    Write a pickled representation of obj to the binary file like object file, preserving
+    the structural sharing of all persistent structures in obj.
+    """
+    _Pickler(file, protocol).dump(obj)
+
+
+def dumps(obj, protocol=pickle.HIGHEST_PROTOCOL):
+    """
+    Return the pickled representation of obj as bytes, preserving the structural sharing
+    of all persistent structures in obj.
+    """
+    f = io.BytesIO()
+    dump(obj, f, protocol)
+    return f.getvalue()
+
+
+def load(file):
+    """
+    Read a pickled object written by :py:func:`dump` from the binary file like object file.
+
+    Never load data from untrusted sources.
+    """
+    return pickle.load(file)
+
+
+def loads(data):
+    """
+    Read a pickled object written by :py:func:`dumps` from data.
+
+    Never load data from untrusted sources.
+    """
+    return pickle.loads(data)
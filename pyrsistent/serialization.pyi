@@ -0,0 +1,9 @@
+# flake8: noqa: E704
+from typing import Any
+from typing import IO
+
+
+def dumps(obj: Any, protocol: int = ...) -> bytes: ...
+def dump(obj: Any, file: IO[bytes], protocol: int = ...) -> None: ...
+def loads(data: bytes) -> Any: ...
+def load(file: IO[bytes]) -> Any: ...
@@ -0,0 +1,644 @@
+"""Append only, memory mapped, on disk store for persistent vectors and maps.
+
+A :py:class:`NodeStore` is a file of trie nodes. Saving a structure writes the nodes that are
+not already in the file and returns a reference, the file offset of the saved version. Nodes
+are never rewritten so every saved version stays loadable through its reference.
+
+Loading a reference returns a :py:class:`StoredVector` or a :py:class:`StoredMap`. These read
+their nodes from the memory mapped file when they are accessed, keeping recently used nodes in
+a small LRU cache. Updating them creates new in memory nodes for the changed paths only, the
+rest of the structure keeps referring to the nodes on disk. Saving the updated structure
+therefore only appends the changed nodes to the file.
+
+>>> import os, tempfile
+>>> path = os.path.join(tempfile.mkdtemp(), 'versions.db')
+>>> with NodeStore(path) as store:
+...     ref1 = store.save(pvector(range(100000)))
+...     size = store.size
+...     ref2 = store.save(store.load(ref1).set(5, 'five'))
+...     store.size - size < 1000
+True
+>>> with NodeStore(path) as store:
+...     store.load(ref1)[5], store.load(ref2)[5]
+(5, 'five')
+
+Elements and map values are pickled leaf by leaf, the caveats of pickle regarding untrusted
+data apply. Map keys must be strings, bytes, numbers, None or tuples of these since they are
+hashed in a way that is stable between processes.
+"""
+from __future__ import absolute_import
+
+from collections import OrderedDict, namedtuple
+from numbers import Integral
+import mmap
+import operator
+import os
+import pickle
+import struct
+import weakref
+import zlib
+
+import six
+
+from pyrsistent._compat import Mapping, Sequence, Hashable
+from pyrsistent._pmap import pmap
+from pyrsistent._ptypedvector import PTypedVector
+from pyrsistent._pvector import PVector, BRANCH_FACTOR, BIT_MASK, SHIFT, compare_pvector, pvector, python_pvector
+
+__all__ = ('NodeStore', 'StoredVector', 'StoredMap')
+
+_MAGIC = b'PYRSTORE\x01'
+_RECORD = struct.Struct('<cI')
+_VECTOR_ROOT = struct.Struct('<QBqq')
+_MAP_ROOT = struct.Struct('<Qq')
+
+_INTERNAL_NODE = b'I'
+_LEAF_NODE = b'L'
+_VECTOR = b'V'
+_MAP = b'M'
+
+_MIN_BUCKETS = 8
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+def _normalized_key(key):
+    if isinstance(key, tuple):
+        return tuple(_normalized_key(k) for k in key)
+
+    if isinstance(key, bool):
+        return int(key)
+
+    if isinstance(key, float) and key.is_integer():
+        return int(key)
+
+    if key is None or isinstance(key, (six.text_type, bytes, float) + six.integer_types):
+        return key
+
+    raise TypeError('Stored map keys must be strings, bytes, numbers, None or tuples of these, not {0}'.format(
+        type(key).__name__))
+
+
+def _stable_hash(key):
+    # The built in hash of strings is randomized per process and can't be used for data on disk
+    return zlib.crc32(repr(_normalized_key(key)).encode('utf-8', 'surrogatepass'))
+
+
+class _Node(list):
+    # In memory node of a stored vector. Weakly referenceable so that the store can
+    # remember where it has been written for as long as it is alive.
+    __slots__ = ('__weakref__',)
+
+
+def _new_path(level, node):
+    if level == 0:
+        return node
+
+    return _Node([_new_path(level - SHIFT, node)])
+
+
+class NodeStore(object):
+    """
+    Append only file of trie nodes, see the module documentation. The file is created if it
+    does not exist. cache_size is the maximum number of decoded nodes kept in memory.
+    """
+    def __init__(self, path, cache_size=1024):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self._file.write(_MAGIC)
+            self._file.flush()
+
+        self._file.seek(0, os.SEEK_END)
+        self._end = self._file.tell()
+        self._mmap = None
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+        # id of in memory node -> (weak reference to node, offset) for all written nodes that are alive
+        self._written = {}
+        self._hits = 0
+        self._misses = 0
+
+        if self._end < len(_MAGIC) or self._buffer()[:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError('Not a pyrsistent node store: {0}'.format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Close the store. Structures loaded from it can not be used after this.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+        self._file.close()
+        self._cache.clear()
+        self._written.clear()
+
+    @property
+    def size(self):
+        """
+        The size of the store file in bytes.
+        """
+        return self._end
+
+    def cache_info(self):
+        """
+        Return statistics of the node cache, like functools.lru_cache.
+        """
+        return CacheInfo(self._hits, self._misses, self._cache_size, len(self._cache))
+
+    def _buffer(self):
+        if self._mmap is None or len(self._mmap) < self._end:
+            # The file has grown since it was mapped
+            self._file.flush()
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self._mmap
+
+    def _read_record(self, offset):
+        if not isinstance(offset, six.integer_types) or not len(_MAGIC) <= offset <= self._end - _RECORD.size:
+            raise ValueError('Invalid reference: {0}'.format(offset))
+
+        buf = self._buffer()
+        kind, length = _RECORD.unpack_from(buf, offset)
+        start = offset + _RECORD.size
+        if start + length > self._end:
+            raise ValueError('Invalid reference: {0}'.format(offset))
+
+        return kind, buf[start:start + length]
+
+    def _node(self, offset):
+        node = self._cache.get(offset)
+        if node is not None:
+            self._hits += 1
+            self._cache.move_to_end(offset)
+            return node
+
+        self._misses += 1
+        kind, payload = self._read_record(offset)
+        if kind == _INTERNAL_NODE:
+            node = struct.unpack('<{0}q'.format(len(payload) // 8), payload)
+        elif kind == _LEAF_NODE:
+            node = tuple(pickle.loads(payload))
+        else:
+            raise ValueError('Invalid node reference: {0}'.format(offset))
+
+        self._cache[offset] = node
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+        return node
+
+    def _resolve(self, node):
+        # Nodes are either in memory or referenced by their offset in the file
+        if type(node) is int:
+            return self._node(node)
+
+        return node
+
+    def _append(self, kind, payload):
+        offset = self._end
+        self._file.seek(offset)
+        self._file.write(_RECORD.pack(kind, len(payload)))
+        self._file.write(payload)
+        self._end += _RECORD.size + len(payload)
+        return offset
+
+    def _forget(self, key, ref):
+        entry = self._written.get(key)
+        if entry is not None and entry[0] is ref:
+            del self._written[key]
+
+    def _write_node(self, node, level, memo):
+        if type(node) is int:
+            return node
+
+        # Nodes created by updates of stored vectors are shared with the versions derived
+        # from them and are only written once. Other nodes are only shared within one save.
+        is_node = type(node) is _Node
+        entry = (self._written if is_node else memo).get(id(node))
+        if entry is not None:
+            return entry[1]
+
+        if level:
+            children = [self._write_node(child, level - SHIFT, memo) for child in node]
+            offset = self._append(_INTERNAL_NODE, struct.pack('<{0}q'.format(len(children)), *children))
+        else:
+            offset = self._append(_LEAF_NODE, pickle.dumps(tuple(node), pickle.HIGHEST_PROTOCOL))
+
+        if is_node:
+            key = id(node)
+            self._written[key] = (weakref.ref(node, lambda ref: self._forget(key, ref)), offset)
+        else:
+            # The node is kept alive by the memo so that its id is not reused
+            memo[id(node)] = (node, offset)
+
+        return offset
+
+    def _save_vector(self, vector, memo):
+        if vector._store is not self:
+            raise ValueError('The vector belongs to a different store')
+
+        root = self._write_node(vector._root, vector._shift, memo)
+        tail = vector._tail_ref
+        if tail is None:
+            tail = self._write_node(vector._tail, 0, memo)
+
+        return self._append(_VECTOR, _VECTOR_ROOT.pack(vector._count, vector._shift, root, tail))
+
+    def save(self, obj, sync=False):
+        """
+        Save obj, a vector or a map, and return the reference to load it with. Only nodes
+        that are not already stored are written. If sync is True the file is synced to disk
+        before returning.
+        """
+        if isinstance(obj, StoredMap):
+            buckets = self._save_vector(obj._buckets, {})
+            ref = self._append(_MAP, _MAP_ROOT.pack(obj._size, buckets))
+        elif isinstance(obj, StoredVector):
+            ref = self._save_vector(obj, {})
+        elif isinstance(obj, PVector):
+            ref = self._save_vector(_stored_vector(self, obj), {})
+        elif isinstance(obj, Mapping):
+            return self.save(_stored_map(self, six.iteritems(obj), len(obj)), sync)
+        else:
+            raise TypeError('Only vectors and maps can be stored, not {0}'.format(type(obj).__name__))
+
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+        return ref
+
+    def load(self, ref):
+        """
+        Return the vector or map saved with reference ref. Nodes are read lazily on access.
+        """
+        kind, payload = self._read_record(ref)
+        if kind == _VECTOR:
+            count, shift, root, tail = _VECTOR_ROOT.unpack(payload)
+            return StoredVector(self, count, shift, root, self._node(tail), tail)
+
+        if kind == _MAP:
+            size, buckets = _MAP_ROOT.unpack(payload)
+            return StoredMap(self, size, self.load(buckets))
+
+        raise ValueError('No vector or map stored at {0}'.format(ref))
+
+
+def _stored_vector(store, vector):
+    if not hasattr(vector, '_trie_export') or isinstance(vector, PTypedVector):
+        vector = python_pvector(vector)
+
+    count, shift, root, tail = vector._trie_export({})
+    return StoredVector(store, count, shift, root, tail)
+
+
+def _stored_map(store, items, size):
+    # items must not contain duplicate keys
+    bucket_count = max(_MIN_BUCKETS, 2 * size)
+    buckets = [None] * bucket_count
+    for key, value in items:
+        index = _stable_hash(key) % bucket_count
+        buckets[index] = (buckets[index] or ()) + ((key, value),)
+
+    return StoredMap(store, size, _stored_vector(store, python_pvector(buckets)))
+
+
+class StoredVector(object):
+    """
+    Persistent vector backed by a :py:class:`NodeStore`. Has the reading API of
+    :py:class:`~pyrsistent.PVector` and supports set, mset, append and extend which return
+    new stored vectors sharing all unchanged nodes.
+
+    Use :py:meth:`NodeStore.load` to create instances.
+    """
+    __slots__ = ('_store', '_count', '_shift', '_root', '_tail', '_tail_offset', '_tail_ref')
+
+    def __new__(cls, store, count, shift, root, tail, tail_ref=None):
+        self = super(StoredVector, cls).__new__(cls)
+        self._store = store
+        self._count = count
+        self._shift = shift
+        self._root = root
+        self._tail = tail
+        self._tail_offset = count - len(tail)
+
+        # Offset of the tail if it was loaded from the store, it is not written again
+        self._tail_ref = tail_ref
+        return self
+
+    def __len__(self):
+        return self._count
+
+    def _leaf_for(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError("Index out of range: %s" % (i,))
+
+        if i >= self._tail_offset:
+            return self._tail
+
+        resolve = self._store._resolve
+        node = resolve(self._root)
+        for level in range(self._shift, 0, -SHIFT):
+            node = resolve(node[(i >> level) & BIT_MASK])  # >>>
+
+        return node
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return pvector(self.tolist()[index])
+
+        if index < 0:
+            index += self._count
+
+        return self._leaf_for(index)[index & BIT_MASK]
+
+    def _leaves(self, node, level):
+        node = self._store._resolve(node)
+        if level:
+            for child in node:
+                for leaf in self._leaves(child, level - SHIFT):
+                    yield leaf
+        else:
+            yield node
+
+    def __iter__(self):
+        for leaf in self._leaves(self._root, self._shift):
+            for value in leaf:
+                yield value
+
+        for value in self._tail:
+            yield value
+
+    def tolist(self):
+        return list(self)
+
+    def persistent(self):
+        """
+        Return an in memory pvector with the elements of this vector.
+        """
+        return pvector(self)
+
+    def __repr__(self):
+        return 'StoredVector({0})'.format(self.tolist())
+
+    def __eq__(self, other):
+        return self is other or (hasattr(other, '__len__') and self._count == len(other)) and \
+            compare_pvector(self, other, operator.eq)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return compare_pvector(self, other, operator.lt)
+
+    def __le__(self, other):
+        return compare_pvector(self, other, operator.le)
+
+    def __gt__(self, other):
+        return compare_pvector(self, other, operator.gt)
+
+    def __ge__(self, other):
+        return compare_pvector(self, other, operator.ge)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def index(self, value, *args, **kwargs):
+        return self.tolist().index(value, *args, **kwargs)
+
+    def count(self, value):
+        return self.tolist().count(value)
+
+    def _do_set(self, level, node, i, val):
+        ret = _Node(self._store._resolve(node))
+        if level == 0:
+            ret[i & BIT_MASK] = val
+        else:
+            sub_index = (i >> level) & BIT_MASK  # >>>
+            ret[sub_index] = self._do_set(level - SHIFT, ret[sub_index], i, val)
+
+        return ret
+
+    def set(self, i, val):
+        if not isinstance(i, Integral):
+            raise TypeError("'%s' object cannot be interpreted as an index" % type(i).__name__)
+
+        if i < 0:
+            i += self._count
+
+        if 0 <= i < self._count:
+            if i >= self._tail_offset:
+                new_tail = _Node(self._tail)
+                new_tail[i & BIT_MASK] = val
+                return StoredVector(self._store, self._count, self._shift, self._root, new_tail)
+
+            return StoredVector(self._store, self._count, self._shift,
+                                self._do_set(self._shift, self._root, i, val), self._tail, self._tail_ref)
+
+        if i == self._count:
+            return self.append(val)
+
+        raise IndexError("Index out of range: %s" % (i,))
+
+    def mset(self, *args):
+        if len(args) % 2:
+            raise TypeError("mset expected an even number of arguments")
+
+        result = self
+        for i in range(0, len(args), 2):
+            result = result.set(args[i], args[i + 1])
+
+        return result
+
+    def _push_tail(self, level, parent, tail):
+        ret = _Node(self._store._resolve(parent))
+        if level == SHIFT:
+            ret.append(tail)
+            return ret
+
+        sub_index = ((self._count - 1) >> level) & BIT_MASK  # >>>
+        if len(ret) > sub_index:
+            ret[sub_index] = self._push_tail(level - SHIFT, ret[sub_index], tail)
+            return ret
+
+        ret.append(_new_path(level - SHIFT, tail))
+        return ret
+
+    def append(self, val):
+        if len(self._tail) < BRANCH_FACTOR:
+            new_tail = _Node(self._tail)
+            new_tail.append(val)
+            return StoredVector(self._store, self._count + 1, self._shift, self._root, new_tail)
+
+        # Like the C implementation the tail is only pushed into the trie when it is full
+        tail = self._tail if self._tail_ref is None else self._tail_ref
+        if (self._count >> SHIFT) > (1 << self._shift):  # >>>
+            new_root = _Node([self._root, _new_path(self._shift, tail)])
+            new_shift = self._shift + SHIFT
+        else:
+            new_root = self._push_tail(self._shift, self._root, tail)
+            new_shift = self._shift
+
+        return StoredVector(self._store, self._count + 1, new_shift, new_root, _Node([val]))
+
+    def extend(self, obj):
+        result = self
+        for value in obj:
+            result = result.append(value)
+
+        return result
+
+    def __add__(self, other):
+        return self.extend(other)
+
+
+class StoredMap(object):
+    """
+    Persistent map backed by a :py:class:`NodeStore`, implemented as a stored vector of hash
+    buckets. Has the reading API of :py:class:`~pyrsistent.PMap` and supports set, remove,
+    discard and update which return new stored maps sharing all unchanged nodes.
+
+    Use :py:meth:`NodeStore.load` to create instances.
+    """
+    __slots__ = ('_store', '_size', '_buckets')
+
+    def __new__(cls, store, size, buckets):
+        self = super(StoredMap, cls).__new__(cls)
+        self._store = store
+        self._size = size
+        self._buckets = buckets
+        return self
+
+    def __len__(self):
+        return self._size
+
+    def _bucket(self, key):
+        index = _stable_hash(key) % len(self._buckets)
+        return index, self._buckets[index] or ()
+
+    def __getitem__(self, key):
+        for k, v in self._bucket(key)[1]:
+            if k == key:
+                return v
+
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except (KeyError, TypeError):
+            return False
+
+    def iteritems(self):
+        for bucket in self._buckets:
+            if bucket:
+                for item in bucket:
+                    yield item
+
+    def iterkeys(self):
+        for k, _ in self.iteritems():
+            yield k
+
+    def itervalues(self):
+        for _, v in self.iteritems():
+            yield v
+
+    __iter__ = iterkeys
+
+    def items(self):
+        return list(self.iteritems())
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def persistent(self):
+        """
+        Return an in memory pmap with the items of this map.
+        """
+        return pmap(dict(self.iteritems()))
+
+    def __repr__(self):
+        return 'StoredMap({0})'.format(dict(self.iteritems()))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+
+        if not isinstance(other, Mapping) or len(self) != len(other):
+            return False
+
+        return dict(self.iteritems()) == dict(six.iteritems(other))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.persistent())
+
+    def set(self, key, val):
+        index, bucket = self._bucket(key)
+        for i, (k, v) in enumerate(bucket):
+            if k == key:
+                if v is val:
+                    return self
+
+                new_bucket = list(bucket)
+                new_bucket[i] = (k, val)
+                return StoredMap(self._store, self._size, self._buckets.set(index, tuple(new_bucket)))
+
+        result = StoredMap(self._store, self._size + 1, self._buckets.set(index, tuple(bucket) + ((key, val),)))
+        if 3 * result._size > 2 * len(result._buckets):
+            # Rehash all items into twice as many buckets, like PMap
+            return _stored_map(self._store, result.iteritems(), result._size)
+
+        return result
+
+    def remove(self, key):
+        index, bucket = self._bucket(key)
+        new_bucket = tuple((k, v) for k, v in bucket if k != key)
+        if len(new_bucket) == len(bucket):
+            raise KeyError(key)
+
+        return StoredMap(self._store, self._size - 1, self._buckets.set(index, new_bucket or None))
+
+    def discard(self, key):
+        try:
+            return self.remove(key)
+        except KeyError:
+            return self
+
+    def update(self, *maps):
+        result = self
+        for m in maps:
+            for key, value in six.iteritems(m):
+                result = result.set(key, value)
+
+        return result
+
+
+Sequence.register(StoredVector)
+Hashable.register(StoredVector)
+Mapping.register(StoredMap)
+Hashable.register(StoredMap)
@@ -0,0 +1,58 @@
+# flake8: noqa: E704
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from pyrsistent.typing import PMap
+from pyrsistent.typing import PVector
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class StoredVector(Sequence[Any]):
+    def __hash__(self) -> int: ...
+    def __len__(self) -> int: ...
+    def __getitem__(self, index: Any) -> Any: ...
+    def __add__(self, other: Iterable[Any]) -> StoredVector: ...
+    def tolist(self) -> List[Any]: ...
+    def persistent(self) -> PVector[Any]: ...
+    def set(self, i: int, val: Any) -> StoredVector: ...
+    def mset(self, *args: Any) -> StoredVector: ...
+    def append(self, val: Any) -> StoredVector: ...
+    def extend(self, obj: Iterable[Any]) -> StoredVector: ...
+
+
+class StoredMap(Mapping[Any, Any]):
+    def __hash__(self) -> int: ...
+    def __len__(self) -> int: ...
+    def __getitem__(self, key: Any) -> Any: ...
+    def __iter__(self) -> Iterator[Any]: ...
+    def persistent(self) -> PMap[Any, Any]: ...
+    def set(self, key: Any, val: Any) -> StoredMap: ...
+    def remove(self, key: Any) -> StoredMap: ...
+    def discard(self, key: Any) -> StoredMap: ...
+    def update(self, *maps: Mapping[Any, Any]) -> StoredMap: ...
+
+
+class NodeStore(object):
+    def __init__(self, path: str, cache_size: int = 1024) -> None: ...
+    def __enter__(self) -> NodeStore: ...
+    def __exit__(self, *args: Any) -> None: ...
+    def close(self) -> None: ...
+    @property
+    def size(self) -> int: ...
+    def cache_info(self) -> CacheInfo: ...
+    def save(self, obj: Union[PVector[Any], Mapping[Any, Any], StoredVector, StoredMap], sync: bool = False) -> int: ...
+    def load(self, ref: int) -> Union[StoredVector, StoredMap]: ...
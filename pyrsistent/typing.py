@@ -32,6 +32,7 @@ try:
         'PList',
         'PMap',
         'PSet',
+        'PTypedVector',
         'PVector',
     ]
 
@@ -68,6 +69,9 @@ try:
     class PVector(Sequence[T], Hashable):
         pass
 
+    class PTypedVector(Sequence[T], Hashable):
+        pass
+
     class PVectorEvolver(Generic[T]):
         pass
 
@@ -8,6 +8,7 @@ from typing import Dict
 from typing import Generic
 from typing import Hashable
 from typing import Iterator
+from typing import IO
 from typing import Iterable
 from typing import List
 from typing import Mapping
@@ -73,6 +74,9 @@ class PVector(Sequence[T], Hashable):
     def extend(self, obj: Iterable[T]) -> PVector[T]: ...
     def tolist(self) -> List[T]: ...
     def mset(self, *args: Iterable[Union[T, int]]) -> PVector[T]: ...
+    def mset_many(self, indices: Iterable[int], values: Iterable[T]) -> PVector[T]: ...
+    def take(self, indices: Iterable[int]) -> PVector[T]: ...
+    def map(self, fn: Callable[[T], Any]) -> PVector[Any]: ...
     def remove(self, value: T) -> PVector[T]: ...
     # Not compatible with MutableSequence
     def set(self, i: int, val: T) -> PVector[T]: ...
@@ -96,6 +100,16 @@ class PVectorEvolver(Sequence[T], Sized):
     def set(self, i: int, val: T) -> PVectorEvolver[T]: ...
 
 
+class PTypedVector(PVector[T]):
+    @property
+    def typecode(self) -> str: ...
+    @property
+    def itemsize(self) -> int: ...
+    def toarray(self) -> Any: ...
+    def leaves(self) -> Iterator[memoryview]: ...
+    def buffer(self, start: int = 0, stop: Optional[int] = None) -> memoryview: ...
+
+
 class PSet(AbstractSet[T], Hashable):
     def __contains__(self, element: object) -> bool: ...
     def __hash__(self) -> int: ...
@@ -197,7 +211,14 @@ class PClass(Hashable):
         _factory_fields: Optional[Any] = ...,
         ignore_extra: bool = ...,
     ) -> T_PClass: ...
+    @classmethod
+    def create_many(
+        cls: Type[T_PClass],
+        iterable: Iterable[Any],
+        ignore_extra: bool = ...,
+    ) -> List[T_PClass]: ...
     def serialize(self, format: Optional[Any] = ...): ...
+    def serialize_to(self, fp: IO, format: Optional[Any] = ..., **kwargs: Any) -> None: ...
     def transform(self, *transformations: Any): ...
     def __eq__(self, other: object): ...
     def __ne__(self, other: object): ...
@@ -225,6 +246,7 @@ class CheckedPMap(PMap[KT, VT]):
     @classmethod
     def create(cls, source_data: Mapping[KT, VT], _factory_fields: Any = ...) -> CheckedPMap[KT, VT]: ...
     def serialize(self, format: Optional[Any] = ...) -> Dict[KT, VT]: ...
+    def serialize_to(self, fp: IO, format: Optional[Any] = ..., **kwargs: Any) -> None: ...
 
 
 class CheckedPVector(PVector[T]):
@@ -232,7 +254,10 @@ class CheckedPVector(PVector[T]):
     def __new__(self, initial: Iterable[T] = ...) -> CheckedPVector: ...
     @classmethod
     def create(cls, source_data: Iterable[T], _factory_fields: Any = ...) -> CheckedPVector[T]: ...
+    def take(self, indices: Iterable[int]) -> CheckedPVector[T]: ...
+    def map(self, fn: Callable[[T], T]) -> CheckedPVector[T]: ...
     def serialize(self, format: Optional[Any] = ...) -> List[T]: ...
+    def serialize_to(self, fp: IO, format: Optional[Any] = ..., **kwargs: Any) -> None: ...
 
 
 class CheckedPSet(PSet[T]):
@@ -241,6 +266,7 @@ class CheckedPSet(PSet[T]):
     @classmethod
     def create(cls, source_data: Iterable[T], _factory_fields: Any = ...) -> CheckedPSet[T]: ...
     def serialize(self, format: Optional[Any] = ...) -> Set[T]: ...
+    def serialize_to(self, fp: IO, format: Optional[Any] = ..., **kwargs: Any) -> None: ...
 
 
 class InvariantException(Exception):
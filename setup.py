@@ -77,5 +77,5 @@ setup(
     cmdclass={'build_ext': custom_build_ext},
     install_requires=['six'],
     packages=['pyrsistent'],
-    package_data={'pyrsistent': ['py.typed', '__init__.pyi', 'typing.pyi']},
+    package_data={'pyrsistent': ['py.typed', '__init__.pyi', 'typing.pyi', 'json.pyi', 'serialization.pyi', 'store.pyi']},
 )
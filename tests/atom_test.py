@@ -0,0 +1,104 @@
+import threading
+import pytest
+from pyrsistent import atom, Atom, pmap, pvector, inc, InvariantException
+
+
+def test_deref_and_repr():
+    a = atom(pvector([1]))
+    assert isinstance(a, Atom)
+    assert a.deref() == pvector([1])
+    assert repr(a) == 'atom(pvector([1]))'
+
+
+def test_swap_with_arguments():
+    a = atom(pmap())
+    assert a.swap(lambda m, k, v: m.set(k, v), 'a', 1) == pmap({'a': 1})
+    assert a.swap(lambda m, **kw: m.update(kw), b=2) == pmap({'a': 1, 'b': 2})
+    assert a.deref() == pmap({'a': 1, 'b': 2})
+
+
+def test_transform():
+    a = atom(pmap({'a': pmap({'b': 1})}))
+    assert a.transform(['a', 'b'], inc) == pmap({'a': pmap({'b': 2})})
+    assert a.deref()['a']['b'] == 2
+
+
+def test_compare_and_set_compares_identity():
+    original = pvector([1])
+    a = atom(original)
+    assert not a.compare_and_set(pvector([1]), pvector([2]))
+    assert a.deref() is original
+    assert a.compare_and_set(original, pvector([2]))
+    assert a.deref() == pvector([2])
+
+
+def test_reset():
+    a = atom(1)
+    assert a.reset(2) == 2
+    assert a.deref() == 2
+
+
+def test_validator():
+    a = atom(0, validator=lambda x: (x >= 0, 'negative'))
+    assert a.swap(lambda x: x + 1) == 1
+
+    with pytest.raises(InvariantException) as e:
+        a.swap(lambda x: x - 2)
+
+    assert e.value.invariant_errors == ('negative',)
+    assert a.deref() == 1
+
+    with pytest.raises(InvariantException):
+        a.reset(-1)
+
+    with pytest.raises(InvariantException):
+        atom(-1, validator=lambda x: (x >= 0, 'negative'))
+
+
+def test_watches():
+    calls = []
+    a = atom(0).add_watch('w', lambda *args: calls.append(args))
+    a.swap(lambda x: x + 1)
+    a.reset(5)
+    assert not a.compare_and_set(0, 1)
+    assert calls == [('w', a, 0, 1), ('w', a, 1, 5)]
+    assert list(a.watches.keys()) == ['w']
+
+    a.remove_watch('w')
+    a.reset(6)
+    assert len(calls) == 2
+    assert a.watches == pmap()
+
+
+def test_swap_retries_on_conflict():
+    a = atom(0)
+    calls = []
+
+    def fn(x):
+        calls.append(x)
+        if len(calls) == 1:
+            # Simulate another thread updating the value while fn is running
+            a.reset(10)
+
+        return x + 1
+
+    assert a.swap(fn) == 11
+    assert calls == [0, 10]
+
+
+def test_concurrent_swaps_are_not_lost():
+    a = atom(pmap({'count': 0}))
+    thread_count, iterations = 8, 2000
+
+    def worker():
+        for _ in range(iterations):
+            a.transform(['count'], inc)
+
+    threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    assert a.deref()['count'] == thread_count * iterations
@@ -150,3 +150,47 @@ def test_type_creation_with_string_specification():
 def test_supports_weakref():
     import weakref
     weakref.ref(VectorToSetMap({}))
+
+
+def test_key_and_value_type_errors_after_types_are_resolved():
+    m = FloatToIntMap({1.0: 1})
+    with pytest.raises(CheckedKeyTypeError):
+        m.set('a', 1)
+
+    with pytest.raises(CheckedValueTypeError) as e:
+        m.set(2.0, 'b')
+
+    assert e.value.expected_types == (int,)
+
+
+def test_update_with_map_of_same_class_skips_checks():
+    checked = []
+
+    class Counted(CheckedPMap):
+        __key_type__ = int
+        __invariant__ = lambda key, value: checked.append(key) or (True, 'Never')
+
+    small = Counted({1: 'a', 2: 'b'})
+    large = Counted(dict((i, 'x') for i in range(2, 20)))
+    del checked[:]
+
+    expected = dict((i, 'x') for i in range(2, 20))
+    expected[1] = 'a'
+    assert small.update(large) == expected
+    assert type(small.update(large)) is Counted
+    assert (small + large) == expected
+
+    expected[2] = 'b'
+    assert large.update(small) == expected
+    assert checked == []
+
+    assert small.update(large, {3: 'c'})[3] == 'c'
+    assert checked == [3]
+
+
+def test_update_with_map_of_other_class_is_checked():
+    class Anything(CheckedPMap):
+        pass
+
+    with pytest.raises(CheckedKeyTypeError):
+        FloatToIntMap({1.0: 1}).update(Anything({'a': 1}))
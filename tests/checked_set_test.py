@@ -82,4 +82,31 @@ def test_pickling():
 
 def test_supports_weakref():
     import weakref
-    weakref.ref(Naturals([1, 2]))
\ No newline at end of file
+    weakref.ref(Naturals([1, 2]))
+
+def test_update_with_set_of_same_class_skips_checks():
+    checked = []
+
+    class Counted(CheckedPSet):
+        __type__ = int
+        __invariant__ = lambda value: checked.append(value) or (True, 'Never')
+
+    small = Counted([1, 2])
+    large = Counted(range(10, 20))
+    del checked[:]
+
+    assert small.update(large) == set([1, 2]) | set(range(10, 20))
+    assert large.update(small) == set([1, 2]) | set(range(10, 20))
+    assert type(small.update(large)) is Counted
+    assert checked == []
+
+    assert small.update([3]) == set([1, 2, 3])
+    assert checked == [3]
+
+
+def test_update_with_set_of_other_class_is_checked():
+    class Anything(CheckedPSet):
+        pass
+
+    with pytest.raises(InvariantException):
+        Naturals([1]).update(Anything([-1]))
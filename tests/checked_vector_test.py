@@ -210,4 +210,114 @@ def test_create_with_generator_iterator():
         __type__ = int
 
     n = Numbers(i for i in [1, 2, 3])
-    assert n == Numbers([1, 2, 3])
\ No newline at end of file
+    assert n == Numbers([1, 2, 3])
+
+class LaterDefinedVector(CheckedPVector):
+    __type__ = 'checked_vector_test.DefinedLater'
+
+
+def test_string_specification_resolved_on_first_use():
+    v = LaterDefinedVector([DefinedLater()])
+    assert isinstance(v[0], DefinedLater)
+
+    with pytest.raises(CheckedValueTypeError) as e:
+        v.append(1)
+
+    assert e.value.expected_types == ('checked_vector_test.DefinedLater',)
+    assert 'DefinedLater' in str(e.value)
+
+
+class DefinedLater(object):
+    pass
+
+
+def test_resolved_types_are_not_shared_with_subclasses():
+    class Numbers(CheckedPVector):
+        __type__ = int
+
+    class MoreNumbers(Numbers):
+        __type__ = float
+
+    assert Numbers([1]) == [1]
+    assert MoreNumbers([1, 2.0]) == [1, 2.0]
+
+    with pytest.raises(CheckedValueTypeError):
+        Numbers([2.0])
+
+
+def test_all_invariant_errors_from_extend_in_order():
+    class Small(CheckedPVector):
+        __invariant__ = lambda n: ((n >= 0, 'Negative'), (n < 10, 'Large'))
+
+    with pytest.raises(InvariantException) as e:
+        Small([1, 2]).extend([-1, 11, 3, -2])
+
+    assert e.value.invariant_errors == (('Negative',), ('Large',), ('Negative',))
+
+
+def test_extend_with_vector_of_same_class_skips_checks():
+    checked = []
+
+    class Counted(CheckedPVector):
+        __type__ = int
+        __invariant__ = lambda value: checked.append(value) or (True, 'Never')
+
+    v1 = Counted([1, 2])
+    v2 = Counted(range(3, 100))
+    del checked[:]
+
+    assert v1.extend(v2) == list(range(1, 100))
+    assert type(v1 + v2) is Counted
+    assert Counted().extend(v2) is v2
+    assert checked == []
+
+    assert v1.extend([3]) == [1, 2, 3]
+    assert checked == [3]
+
+
+def test_extend_with_vector_of_subclass_is_checked():
+    class Numbers(CheckedPVector):
+        __type__ = int
+
+    class MoreNumbers(Numbers):
+        __type__ = float
+
+    with pytest.raises(CheckedValueTypeError):
+        Numbers([1]).extend(MoreNumbers([2.0]))
+
+
+def test_take_returns_same_class():
+    x = Naturals(range(100)).take([99, 0, -2])
+
+    assert x == [99, 0, 98]
+    assert type(x) is Naturals
+    assert type(Naturals().take([])) is Naturals
+
+
+def test_map_returns_same_class_and_checks_results():
+    x = Naturals([1, 2, 3]).map(lambda n: n * 2)
+
+    assert x == [2, 4, 6]
+    assert type(x) is Naturals
+
+    with pytest.raises(InvariantException):
+        Naturals([1, 2]).map(lambda n: -n)
+
+    with pytest.raises(CheckedValueTypeError):
+        Naturals([1, 2]).map(str)
+
+
+def test_serialize_scalars_returns_new_list():
+    v = Naturals([1, 2])
+    serialized = v.serialize()
+    serialized.append(3)
+    assert v.serialize() == [1, 2]
+
+    class Strings(CheckedPVector):
+        __type__ = str
+
+        @staticmethod
+        def __serializer__(format, s):
+            return s.upper()
+
+    assert Strings(['a']).serialize() == ['A']
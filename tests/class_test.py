@@ -5,7 +5,7 @@ import pytest
 import sys
 import uuid
 from pyrsistent import (
-    field, InvariantException, PClass, optional, CheckedPVector,
+    field, InvariantException, PClass, optional, CheckedPVector, PTypeError,
     pmap_field, pset_field, pvector_field)
 
 
@@ -475,3 +475,230 @@ def test_value_can_be_overridden_in_subclass_new():
     a = X(y=[])
     b = a.set(y=None)
     assert a == b
+
+
+class ForwardRef(PClass):
+    # A single string type is resolved when declaring the field, two are resolved lazily
+    other = field(type=('class_test.DefinedLater', type(None)))
+
+
+class DefinedLater(PClass):
+    x = field()
+
+
+def test_string_type_resolved_after_class_definition():
+    assert ForwardRef(other=DefinedLater(x=1)).other.x == 1
+    assert ForwardRef(other=None).other is None
+
+    with pytest.raises(PTypeError):
+        ForwardRef(other=1)
+
+
+def test_unresolvable_string_type_only_fails_when_field_is_used():
+    class Unresolvable(PClass):
+        x = field()
+        y = field(type=('class_test.DoesNotExist', type(None)))
+
+    assert Unresolvable(x=1).x == 1
+
+    with pytest.raises(AttributeError):
+        Unresolvable(y=1)
+
+
+def test_subclass_gets_its_own_constructor():
+    class Base(PClass):
+        x = field(type=int)
+
+    class Derived(Base):
+        y = field(type=int, mandatory=True)
+
+    assert Base(x=1).x == 1
+    assert Derived(x=1, y=2).y == 2
+
+    with pytest.raises(InvariantException) as e:
+        Derived(x=1)
+
+    assert e.value.missing_fields == ('Derived.y',)
+
+    with pytest.raises(AttributeError):
+        Base(y=2)
+
+
+def test_custom_setattr_is_used_when_constructing():
+    class Recording(PClass):
+        x = field()
+
+        def __setattr__(self, key, value):
+            if key == 'x':
+                value = value * 2
+            super(Recording, self).__setattr__(key, value)
+
+    assert Recording(x=2).x == 4
+
+
+def test_errors_are_reported_for_all_fields():
+    class Checked(PClass):
+        a = field(invariant=lambda x: (x > 0, 'a'))
+        b = field(invariant=lambda x: (x > 0, 'b'), initial=0)
+        c = field(mandatory=True)
+
+    with pytest.raises(InvariantException) as e:
+        Checked(a=0)
+
+    assert e.value.invariant_errors == ('a', 'b')
+    assert e.value.missing_fields == ('Checked.c',)
+
+
+def test_set_only_validates_updated_fields():
+    calls = []
+
+    def invariant(name):
+        def check(value):
+            calls.append(name)
+            return value >= 0, name
+        return check
+
+    class Validated(PClass):
+        a = field(type=int, invariant=invariant('a'))
+        b = field(type=int, invariant=invariant('b'), factory=int)
+        c = field()
+
+    v = Validated(a=1, b=2)
+    del calls[:]
+
+    v2 = v.set(b='3')
+    assert calls == ['b']
+    assert (v2.a, v2.b) == (1, 3)
+    assert not hasattr(v2, 'c')
+    assert (v.a, v.b) == (1, 2)
+
+    with pytest.raises(InvariantException) as e:
+        v.set(a=-1)
+    assert e.value.invariant_errors == ('a',)
+
+    with pytest.raises(PTypeError):
+        v.set(a='1')
+
+    with pytest.raises(AttributeError) as e:
+        v.set(d=1, e=2)
+    assert str(e.value) == "'d, e' are not among the specified fields for Validated"
+
+    with pytest.raises(AttributeError):
+        v2.a = 5
+
+
+def test_set_checks_global_invariants():
+    class Ordered(PClass):
+        low = field()
+        high = field()
+        __invariant__ = lambda r: (r.low <= r.high, 'order')
+
+    o = Ordered(low=1, high=2)
+    assert o.set(high=5).high == 5
+
+    with pytest.raises(InvariantException) as e:
+        o.set(high=0)
+    assert e.value.invariant_errors == ('order',)
+
+
+def test_create_many():
+    existing = Point(x=5, y=6)
+    points = Point.create_many([{'x': 1, 'y': 2}, {'x': 3, 'y': 4, 'q': 5}, existing], ignore_extra=True)
+    assert points == [Point(x=1, y=2), Point(x=3, y=4), existing]
+    assert points[2] is existing
+
+    with pytest.raises(AttributeError):
+        Point.create_many([{'x': 1, 'y': 2, 'q': 5}])
+
+    with pytest.raises(InvariantException):
+        Point.create_many([{'x': 1}, {'x': -1}])
+
+
+def test_create_many_with_custom_new():
+    class Custom(PClass):
+        x = field(type=int)
+
+        def __new__(cls, **kwargs):
+            kwargs['x'] = kwargs.get('x', 0) + 1
+            return super(Custom, cls).__new__(cls, **kwargs)
+
+    assert Custom.create_many([{'x': 1}, {}]) == [Custom.create({'x': 1}), Custom.create({})]
+
+
+def test_create_many_uses_overridden_create():
+    class Converted(PClass):
+        x = field(type=int)
+
+        @classmethod
+        def create(cls, kwargs, _factory_fields=None, ignore_extra=False):
+            return super(Converted, cls).create({'x': int(kwargs['x'])}, _factory_fields, ignore_extra)
+
+    class Holder(PClass):
+        items = pvector_field(Converted)
+
+    assert Holder.create({'items': [{'x': '5'}, Converted(x=6)]}).items == [Converted(x=5), Converted(x=6)]
+    assert Converted.create_many([{'x': '1'}]) == [Converted(x=1)]
+
+
+def test_serialize_nested_and_unset_fields():
+    class Inner(PClass):
+        a = field(type=int)
+        b = field(serializer=lambda format, value: format)
+
+    class Outer(PClass):
+        inner = field(type=Inner)
+        anything = field()
+        checked = field(type=(Inner, type(None)))
+        numbers = pvector_field(int)
+
+    o = Outer(inner=Inner(a=1, b=2), anything=Inner(b=3), checked=Inner(a=4), numbers=[1, 2])
+    assert o.serialize('f') == {'inner': {'a': 1, 'b': 'f'}, 'anything': {'b': 'f'}, 'checked': {'a': 4},
+                                'numbers': [1, 2]}
+    assert Outer().serialize() == {'numbers': []}
+    assert Outer(checked=None).serialize() == {'checked': None, 'numbers': []}
+
+
+class HashCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __hash__(self):
+        self.count += 1
+        return 17
+
+
+def test_hash_is_cached():
+    class Holder(PClass):
+        value = field()
+
+    counter = HashCounter()
+    h = Holder(value=counter)
+    assert hash(h) == hash(h)
+    assert counter.count == 1
+
+    h2 = h.set(value=1)
+    assert hash(h2) == hash(Holder(value=1))
+    assert counter.count == 1
+
+
+def test_equality_with_cached_hashes():
+    p1 = Point(x=1, y=2)
+    p2 = Point(x=1, y=2)
+    p3 = Point(x=1, y=3)
+    assert p1 == p1
+    assert hash(p1) == hash(p2)
+    hash(p3)
+
+    assert p1 == p2
+    assert p1 != p3
+    assert len(set([p1, p2, p3])) == 2
+
+
+def test_hash_of_unhashable_field_raises():
+    class Holder(PClass):
+        value = field()
+
+    h = Holder(value=[1])
+    for _ in range(2):
+        with pytest.raises(TypeError):
+            hash(h)
@@ -1,6 +1,12 @@
 """Tests for freeze and thaw."""
 
-from pyrsistent import v, m, s, freeze, thaw, PRecord, field, mutant
+import gc
+import sys
+import weakref
+
+import pytest
+
+from pyrsistent import v, m, s, freeze, thaw, PRecord, field, mutant, intern
 
 
 ## Freeze
@@ -38,6 +44,118 @@ def test_freeze_recurse_in_tuples():
     assert result == ('a', m())
     assert type(result[1]) is type(m())
 
+def test_freeze_recurse_in_sets_is_not_done():
+    result = freeze(set([(1, 2)]))
+    assert result == s((1, 2))
+    assert type(result) is type(s())
+
+def test_freeze_deeply_nested_structure():
+    doc = []
+    current = doc
+    for _ in range(sys.getrecursionlimit() * 2):
+        nested = {'a': []}
+        current.append(nested)
+        current = nested['a']
+
+    result = freeze(doc)
+    for _ in range(sys.getrecursionlimit() * 2):
+        result = result[0]['a']
+        assert type(result) is type(v())
+
+    assert result == v()
+
+def test_freeze_shared_sub_structures_only_once():
+    shared = {'b': [1, 2]}
+    result = freeze({'x': shared, 'y': [shared, (shared,)]})
+    assert result['x'] == m(b=v(1, 2))
+    assert result['x'] is result['y'][0]
+    assert result['x'] is result['y'][1][0]
+
+def test_freeze_self_referencing_structure_raises_value_error():
+    doc = [1]
+    doc.append({'a': doc})
+    with pytest.raises(ValueError):
+        freeze(doc)
+
+def test_freeze_intern_shares_equal_sub_documents():
+    result = freeze({'a': [1, {'b': 2}], 'c': [1, {'b': 2}]}, intern=True)
+    assert result == m(a=v(1, m(b=2)), c=v(1, m(b=2)))
+    assert result['a'] is result['c']
+
+def test_freeze_intern_shares_between_calls():
+    first = freeze({'a': [1, 2]}, intern=True)
+    second = freeze({'a': [1, 2]}, intern=True)
+    assert first is second
+
+def test_freeze_without_intern_does_not_share():
+    result = freeze([[1], [1]])
+    assert result[0] == result[1]
+    assert result[0] is not result[1]
+
+
+## Intern
+
+def test_intern_returns_canonical_instance():
+    m1 = intern(m(a=1, b=2))
+    assert intern(m(a=1, b=2)) is m1
+    assert intern(m(a=2)) is not m1
+
+def test_intern_distinguishes_types():
+    assert type(intern(s(1, 2))) is type(s())
+    assert type(intern(freeze([1, 2]))) is type(v())
+
+def test_intern_returns_unhashable_objects_unchanged():
+    x = v([1])
+    assert intern(x) is x
+
+def test_intern_returns_objects_that_are_not_weakly_referenceable_unchanged():
+    x = (1, 2)
+    assert intern(x) is x
+
+def test_intern_does_not_keep_instances_alive():
+    x = intern(v(1, 2, 3, 'intern-test'))
+    x_ref = weakref.ref(x)
+    del x
+    gc.collect()
+
+    assert x_ref() is None
+    y = v(1, 2, 3, 'intern-test')
+    assert intern(y) is y
+
+def test_intern_does_not_merge_values_with_different_element_types():
+    ints = intern(v(1, m(a=1), s(1)))
+    assert type(intern(v(True, m(a=1), s(1)))[0]) is bool
+    assert type(intern(v(1.0, m(a=1), s(1)))[0]) is float
+    assert type(intern(v(1, m(a=1.0), s(1)))[1]['a']) is float
+    assert type(list(intern(v(1, m(a=1), s(True)))[2])[0]) is bool
+    assert type(list(intern(m().set(1, 'x')).keys())[0]) is int
+    assert type(list(intern(m().set(True, 'x')).keys())[0]) is bool
+    assert intern(v(1, m(a=1), s(1))) is ints
+
+    assert str(intern(freeze([0.0]))[0]) == '0.0'
+    assert str(intern(freeze([-0.0]))[0]) == '-0.0'
+
+    doc = freeze({'a': [1], 'b': [True]}, intern=True)
+    assert type(doc['a'][0]) is int
+    assert type(doc['b'][0]) is bool
+
+
+def test_intern_keeps_all_values_with_colliding_hashes():
+    class Collides(object):
+        def __init__(self, value):
+            self.value = value
+
+        def __hash__(self):
+            return 1
+
+        def __eq__(self, other):
+            return self.value == other.value
+
+    first = intern(v(Collides(1)))
+    second = intern(v(Collides(2)))
+    assert hash(first) == hash(second)
+    assert intern(v(Collides(1))) is first
+    assert intern(v(Collides(2))) is second
 
 
 ## Thaw
@@ -76,6 +194,32 @@ def test_thaw_recurse_in_tuples():
     assert result == ('a', {})
     assert type(result[1]) is dict
 
+def test_thaw_deeply_nested_structure():
+    structure = v()
+    for _ in range(sys.getrecursionlimit() * 2):
+        structure = v(m(a=structure))
+
+    result = thaw(structure)
+    for _ in range(sys.getrecursionlimit() * 2):
+        result = result[0]['a']
+        assert type(result) is list
+
+    assert result == []
+
+def test_thaw_returns_independent_containers_for_shared_sub_structures_by_default():
+    shared = v(1, m(a=2))
+    result = thaw(m(x=shared, y=v(shared)))
+    assert result == {'x': [1, {'a': 2}], 'y': [[1, {'a': 2}]]}
+    assert result['x'] is not result['y'][0]
+    assert result['x'][1] is not result['y'][0][1]
+
+def test_thaw_share_returns_same_container_for_shared_sub_structures():
+    shared = v(1, m(a=s(2)))
+    result = thaw(m(x=shared, y=v(shared, (shared,))), share=True)
+    assert result == {'x': [1, {'a': set([2])}], 'y': [[1, {'a': set([2])}], ([1, {'a': set([2])}],)]}
+    assert result['x'] is result['y'][0]
+    assert result['x'] is result['y'][1][0]
+
 def test_thaw_can_handle_subclasses_of_persistent_base_types():
     class R(PRecord):
         x = field()
@@ -85,6 +229,26 @@ def test_thaw_can_handle_subclasses_of_persistent_base_types():
     assert type(result) is dict
 
 
+def test_thaw_compact_records_through_their_public_api():
+    class Compact(PRecord):
+        __compact__ = True
+        x = field()
+        y = field()
+
+    result = thaw(v(Compact(x=v(1), y=m(a=2)), Compact(x=3)))
+    assert result == [{'x': [1], 'y': {'a': 2}}, {'x': 3}]
+    assert type(result[0]) is dict
+
+
+def test_thaw_type_cache_is_bounded():
+    from pyrsistent import _helpers
+    for _ in range(_helpers._THAW_KINDS_MAX_SIZE + 10):
+        thaw(v(type('Leaf', (object,), {})()))
+
+    assert len(_helpers._THAW_KINDS) <= _helpers._THAW_KINDS_MAX_SIZE
+    assert thaw(v(m(a=s(1)))) == [{'a': set([1])}]
+
+
 def test_mutant_decorator():
     @mutant
     def fn(a_list, a_dict):
@@ -0,0 +1,164 @@
+import pickle
+import pytest
+from pyrsistent import frozen_view, freeze, thaw, get_in, m, v, s, ny, PVector
+from pyrsistent._compat import Mapping, Sequence, Hashable
+
+
+def document():
+    return {'a': [1, {'b': 2}, (3, [4])], 'c': {'d': set([5])}, 'e': 'f'}
+
+
+def test_frozen_view_of_non_container_freezes():
+    assert frozen_view(1) == 1
+    assert frozen_view((1, [2])) == (1, v(2))
+    assert type(frozen_view(set([1]))) is type(s())
+
+
+def test_map_view_read_access():
+    view = frozen_view(document())
+    assert isinstance(view, Mapping)
+    assert isinstance(view, Hashable)
+    assert len(view) == 3
+    assert view['e'] == 'f'
+    assert view.e == 'f'
+    assert view.get('x', 17) == 17
+    assert 'a' in view
+    assert 'x' not in view
+    assert set(view) == set(['a', 'c', 'e'])
+    assert set(view.keys()) == set(['a', 'c', 'e'])
+
+    with pytest.raises(KeyError):
+        view['x']
+
+    with pytest.raises(AttributeError):
+        view.x
+
+
+def test_vector_view_read_access():
+    view = frozen_view([1, [2, 3], {'a': 4}])
+    assert isinstance(view, Sequence)
+    assert len(view) == 3
+    assert view[0] == 1
+    assert view[-1]['a'] == 4
+    assert view[1:] == [[2, 3], {'a': 4}]
+    assert list(view)[1][1] == 3
+    assert view.index(1) == 0
+    assert view.count(1) == 1
+
+    with pytest.raises(IndexError):
+        view[3]
+
+
+def test_nested_containers_are_wrapped_lazily_and_cached():
+    data = document()
+    view = frozen_view(data)
+    assert not view._children
+
+    nested = view['a']
+    assert nested is view['a']
+    assert list(view._children) == ['a']
+    assert nested[1]['b'] == 2
+    assert nested[2] == (3, v(4))
+    assert view.c.d == s(5)
+
+
+def test_get_in():
+    view = frozen_view(document())
+    assert get_in(['a', 1, 'b'], view) == 2
+    assert get_in(['a', 7, 'b'], view) is None
+
+
+def test_equality_with_persistent_and_plain_structures():
+    data = document()
+    view = frozen_view(data)
+    assert view == freeze(data)
+    assert freeze(data) == view
+    assert view == data
+    assert view == frozen_view(document())
+    assert view != frozen_view({'a': 1})
+    assert frozen_view([1, 2]) == v(1, 2)
+    assert frozen_view([1, 2]) < v(1, 3)
+    assert hash(view) == hash(freeze(data))
+
+
+def test_map_view_writes_return_pmaps():
+    view = frozen_view(document())
+    result = view.set('x', 1)
+    assert result == freeze(document()).set('x', 1)
+    assert type(result) is type(m())
+    assert view.remove('e') == freeze(document()).remove('e')
+    assert view.discard('x') == freeze(document())
+    assert view.update({'e': 'g'})['e'] == 'g'
+
+    e = view.evolver()
+    e['e'] = 'h'
+    assert e.persistent()['e'] == 'h'
+
+
+def test_vector_view_writes_return_pvectors():
+    view = frozen_view([1, [2]])
+    result = view.append(3)
+    assert result == v(1, v(2), 3)
+    assert isinstance(result, PVector)
+    assert view.set(0, 0) == v(0, v(2))
+    assert view.mset(0, 0) == v(0, v(2))
+    assert view.delete(0) == v(v(2))
+    assert view + [4] == v(1, v(2), 4)
+    assert view * 2 == v(1, v(2), 1, v(2))
+
+
+def test_transform():
+    view = frozen_view({'articles': [{'content': 'A very long text'}, {'content': 'Short'}]})
+    result = view.transform(['articles', ny, 'content'], lambda c: c[:6])
+    assert result == freeze({'articles': [{'content': 'A very'}, {'content': 'Short'}]})
+
+
+def test_conversion_reuses_converted_sub_documents():
+    view = frozen_view(document())
+    nested = view['a'].persistent()
+    assert view.persistent()['a'] is nested
+    assert view.persistent() is view.persistent()
+
+
+def test_conversion_does_not_touch_the_original_document():
+    data = document()
+    view = frozen_view(data)
+    view.set('e', 'g')
+    view['a'].set(0, 17)
+    assert data == document()
+
+
+def test_thaw():
+    view = frozen_view(document())
+    result = thaw(view)
+    assert result == document()
+    assert result is not view._data
+    assert thaw(m(x=view)) == {'x': document()}
+
+
+def test_pickling():
+    view = frozen_view(document())
+    result = pickle.loads(pickle.dumps(view))
+    assert result == view
+    assert type(result) is type(view)
+
+
+def test_thaw_copies_underlying_document_without_converting_view():
+    data = {'a': [1, {'b': 2}, (3, [4]), v(5, {'c': 6})], 'd': set([7])}
+    view = frozen_view(data)
+    result = thaw(view)
+
+    assert result == {'a': [1, {'b': 2}, (3, [4]), [5, {'c': 6}]], 'd': set([7])}
+    assert result['a'] is not data['a']
+    assert result['a'][1] is not data['a'][1]
+    assert result['a'][2][1] is not data['a'][2][1]
+    assert result['d'] is not data['d']
+    assert view._persistent is None
+
+    shared = [1]
+    result = thaw(frozen_view([shared, shared]), share=True)
+    assert result == [[1], [1]]
+    assert result[0] is result[1]
+    assert result[0] is not shared
+
+    assert thaw(v(view['a'])) == [[1, {'b': 2}, (3, [4]), [5, {'c': 6}]]]
@@ -0,0 +1,237 @@
+import pytest
+from pyrsistent import phistory, PHistory, HistoryVersion, pvector, pmap, pvector_typed
+
+
+def history_of(*values, **kwargs):
+    h = phistory(**kwargs)
+    for i, value in enumerate(values):
+        h = h.commit(value, timestamp=10 * (i + 1))
+
+    return h
+
+
+def test_empty_history():
+    h = phistory()
+    assert len(h) == 0
+    assert list(h) == []
+    assert h.head() is None
+    assert h.current_branch == 'main'
+    assert h.branches == ['main']
+
+    with pytest.raises(LookupError):
+        h.value
+
+
+def test_commit_records_versions():
+    h = phistory().commit('a', timestamp=1, author='alice').commit('b', timestamp=2)
+    assert isinstance(h, PHistory)
+    assert len(h) == 2
+    assert h.value == 'b'
+    assert [v.value for v in h] == ['a', 'b']
+
+    version = h.version(0)
+    assert isinstance(version, HistoryVersion)
+    assert version.number == 0
+    assert version.timestamp == 1
+    assert version.branch == 'main'
+    assert version.parent is None
+    assert version.metadata == pmap({'author': 'alice'})
+    assert h.version(1).parent == 0
+
+
+def test_commit_does_not_change_original():
+    h = history_of('a')
+    h.commit('b', timestamp=20)
+    assert len(h) == 1
+    assert h.value == 'a'
+
+
+def test_commit_defaults_timestamp_to_now():
+    h = phistory().commit('a')
+    assert h.head().timestamp > 0
+
+
+def test_commit_with_decreasing_timestamp_fails():
+    h = history_of('a')
+    with pytest.raises(ValueError):
+        h.commit('b', timestamp=5)
+
+
+def test_missing_version():
+    h = history_of('a')
+    with pytest.raises(KeyError):
+        h.version(1)
+
+    with pytest.raises(KeyError):
+        h.version(-1)
+
+
+def test_at():
+    h = history_of('a', 'b', 'c')
+    assert h.at(10).value == 'a'
+    assert h.at(15).value == 'a'
+    assert h.at(20).value == 'b'
+    assert h.at(1000).value == 'c'
+
+    with pytest.raises(KeyError):
+        h.at(9)
+
+
+def test_at_many_versions():
+    h = phistory()
+    for i in range(2000):
+        h = h.commit(i, timestamp=i * 2)
+
+    assert all(h.at(i * 2 + 1).value == i for i in range(0, 2000, 7))
+
+
+def test_log():
+    h = history_of('a', 'b', 'c')
+    assert [v.value for v in h.log()] == ['c', 'b', 'a']
+    assert [v.value for v in h.undo().log()] == ['b', 'a']
+
+
+def test_undo_and_redo():
+    h = history_of('a', 'b', 'c')
+    assert h.undo().value == 'b'
+    assert h.undo().undo().value == 'a'
+    assert h.undo().undo().redo().value == 'b'
+    assert h.undo().undo().redo().redo().value == 'c'
+    assert h.value == 'c'
+
+    with pytest.raises(LookupError):
+        h.redo()
+
+    empty = h.undo().undo().undo()
+    assert empty.head() is None
+    assert empty.redo().value == 'a'
+
+    with pytest.raises(LookupError):
+        empty.undo()
+
+    with pytest.raises(LookupError):
+        phistory().undo()
+
+
+def test_commit_clears_redo():
+    h = history_of('a', 'b').undo().commit('c', timestamp=30)
+    assert h.value == 'c'
+    assert h.head().parent == 0
+
+    with pytest.raises(LookupError):
+        h.redo()
+
+
+def test_branches():
+    h = history_of('a', 'b').branch('feature').checkout('feature')
+    assert h.current_branch == 'feature'
+    assert sorted(h.branches) == ['feature', 'main']
+    assert h.value == 'b'
+
+    h = h.commit('c', timestamp=30)
+    assert h.value == 'c'
+    assert h.head('main').value == 'b'
+    assert h.head().branch == 'feature'
+    assert [v.value for v in h.log()] == ['c', 'b', 'a']
+
+    h = h.commit('d', timestamp=40, branch='main')
+    assert h.head('main').value == 'd'
+    assert h.value == 'c'
+
+
+def test_branch_from_version():
+    h = history_of('a', 'b', 'c').branch('old', version=0)
+    assert h.head('old').value == 'a'
+
+    with pytest.raises(KeyError):
+        h.branch('other', version=17)
+
+
+def test_branch_errors():
+    h = history_of('a').branch('feature')
+    with pytest.raises(ValueError):
+        h.branch('feature')
+
+    with pytest.raises(KeyError):
+        h.checkout('missing')
+
+    with pytest.raises(KeyError):
+        h.commit('b', branch='missing')
+
+
+def test_cannot_undo_past_branch_point():
+    h = history_of('a', 'b').branch('feature').checkout('feature').commit('c', timestamp=30)
+    assert h.undo().value == 'b'
+
+    with pytest.raises(LookupError):
+        h.undo().undo()
+
+
+def test_at_falls_back_to_base_branch():
+    h = history_of('a', 'b', 'c').branch('feature', version=1).checkout('feature')
+    h = h.commit('x', timestamp=100)
+    assert h.at(100).value == 'x'
+    assert h.at(50).value == 'b'
+    assert h.at(15).value == 'a'
+    assert h.at(50, branch='main').value == 'c'
+
+
+def test_prune_keep_last():
+    h = history_of(*'abcdef')
+    pruned = h.prune(keep_last=2)
+    assert [v.value for v in pruned] == ['e', 'f']
+    assert len(pruned) == 2
+    assert pruned.version(4).parent is None
+    assert pruned.head().parent == 4
+    assert pruned.value == 'f'
+
+    with pytest.raises(KeyError):
+        pruned.version(0)
+
+    with pytest.raises(KeyError):
+        pruned.at(30)
+
+    assert pruned.at(55).value == 'e'
+    assert len(h) == 6
+
+
+def test_prune_max_age():
+    h = history_of(*'abcdef')
+    pruned = h.prune(max_age=25, now=60)
+    assert [v.value for v in pruned] == ['d', 'e', 'f']
+
+
+def test_prune_without_policy_returns_same_history():
+    h = history_of('a')
+    assert h.prune() is h
+
+
+def test_prune_keeps_heads_branch_points_and_redo():
+    h = history_of(*'abcdef').branch('old', version=1).undo()
+    pruned = h.prune(keep_last=1)
+    assert [v.value for v in pruned] == ['b', 'e', 'f']
+    assert pruned.version(4).parent == 1
+    assert pruned.redo().value == 'f'
+    assert pruned.head('old').value == 'b'
+    assert [v.value for v in pruned.log()] == ['e', 'b']
+
+
+def test_retained_size_counts_shared_data_once():
+    data = pvector(range(10000))
+    h = phistory().commit(data, timestamp=1)
+    single = h.retained_size()
+
+    shared = h.commit(data.set(0, -1), timestamp=2)
+    copied = h.commit(pvector(list(range(1, 10000)) + [-1]), timestamp=2)
+    assert single < shared.retained_size() < copied.retained_size()
+
+
+def test_retained_size_of_typed_vectors():
+    data = pvector_typed('q', range(10000))
+    h = phistory().commit(data, timestamp=1)
+    shared = h.commit(data.set(0, -1), timestamp=2)
+    assert shared.retained_size() < 1.5 * h.retained_size()
+
+
+def test_repr():
+    assert repr(history_of('a')) == "PHistory(current_branch='main', versions=1, branches=['main'])"
@@ -65,3 +65,29 @@ def test_derived_class_with_new():
     d2 = d.set(x=3)
 
     assert d2.x == 3
+
+
+def test_classes_with_same_members_are_distinct():
+    A = immutable('x, y', name='A')
+    B = immutable(['x', 'y'], name='B')
+
+    assert A is not B
+    assert A.__name__ == 'A'
+    assert repr(B(1, 2)) == 'B(x=1, y=2)'
+    assert not isinstance(A(1, 2), B)
+    assert A.__bases__ == B.__bases__
+
+
+def test_set_error_messages():
+    t = FrozenMember(1, 2)
+
+    with pytest.raises(AttributeError) as e:
+        t.set(x=2, z=3)
+
+    assert str(e.value) == "'z' is not a member"
+
+    with pytest.raises(AttributeError) as e:
+        t.set(x=2, y_=3)
+
+    assert str(e.value) == 'Cannot set frozen members y_'
+    assert t.set(x=2) == (2, 2)
@@ -0,0 +1,290 @@
+from io import StringIO
+import json
+import pytest
+from pyrsistent import json as pjson
+from pyrsistent import m, v, pmap, freeze, PRecord, PClass, field, pvector_field, CheckedPVector, CheckedPMap
+
+
+def test_loads_objects_and_arrays_to_persistent_structures():
+    result = pjson.loads('{"a": [1, [2, {"b": []}]], "c": {}, "d": "e"}')
+    assert result == m(a=v(1, v(2, m(b=v()))), c=m(), d='e')
+    assert type(result) is type(m())
+    assert type(result['a']) is type(v())
+    assert type(result['a'][1]) is type(v())
+    assert type(result['a'][1][1]['b']) is type(v())
+
+
+def test_loads_top_level_array():
+    result = pjson.loads('[[1], {"a": [2]}]')
+    assert result == v(v(1), m(a=v(2)))
+    assert type(result[0]) is type(v())
+
+
+def test_loads_scalars():
+    assert pjson.loads('1') == 1
+    assert pjson.loads('"a"') == 'a'
+    assert pjson.loads('null') is None
+
+
+def test_loads_same_result_as_freezing():
+    doc = {'a': [{'b': i, 'c': [i, {'d': str(i)}]} for i in range(100)], 'e': {'f': 1.5}}
+    assert pjson.loads(json.dumps(doc)) == freeze(doc)
+
+
+def test_loads_duplicate_keys_last_one_wins():
+    result = pjson.loads('{"a": 1, "b": 2, "a": 3}')
+    assert result == m(a=3, b=2)
+    assert len(result) == 2
+
+
+def test_loads_larger_objects_are_equal_to_pmaps():
+    doc = dict(('key{0}'.format(i), i) for i in range(1000))
+    result = pjson.loads(json.dumps(doc))
+    assert result == pmap(doc)
+    assert result.set('key1', 17)['key1'] == 17
+    assert result.remove('key2') == pmap(doc).remove('key2')
+
+
+def test_loads_passes_keyword_arguments_to_decoder():
+    assert pjson.loads('[1.5]', parse_float=str) == v('1.5')
+
+
+def test_loads_does_not_allow_object_hooks():
+    with pytest.raises(TypeError):
+        pjson.loads('{}', object_hook=dict)
+
+
+def test_load_from_file():
+    assert pjson.load(StringIO(u'{"a": [1]}')) == m(a=v(1))
+
+
+class Point(PRecord):
+    x = field(type=int)
+    y = field(type=int)
+
+
+class Points(CheckedPVector):
+    __type__ = Point
+
+
+class Line(PClass):
+    name = field(type=str)
+    points = field(type=Points, factory=Points.create)
+
+
+class Numbers(PRecord):
+    values = pvector_field(int)
+
+
+def test_loads_record_type():
+    assert pjson.loads('{"x": 1, "y": 2}', record_type=Point) == Point(x=1, y=2)
+    assert pjson.loads('{"values": [1, 2]}', record_type=Numbers) == Numbers(values=[1, 2])
+
+
+def test_loads_class_type_with_nested_records():
+    result = pjson.loads('{"name": "a", "points": [{"x": 1, "y": 2}]}', record_type=Line)
+    assert result == Line(name='a', points=Points([Point(x=1, y=2)]))
+
+
+def test_loads_record_type_ignore_extra():
+    assert pjson.loads('{"x": 1, "y": 2, "z": 3}', record_type=Point, ignore_extra=True) == Point(x=1, y=2)
+
+    with pytest.raises(AttributeError):
+        pjson.loads('{"x": 1, "y": 2, "z": 3}', record_type=Point)
+
+
+def test_iterload_json_lines():
+    stream = StringIO(u'{"a": [1]}\n{"a": 2}\n\n  3 "b"\n[4]\n')
+    assert list(pjson.iterload(stream)) == [m(a=v(1)), m(a=2), 3, 'b', v(4)]
+
+
+def test_iterload_empty_stream():
+    assert list(pjson.iterload(StringIO(u''))) == []
+    assert list(pjson.iterload(StringIO(u' \n'))) == []
+
+
+def test_iterload_is_lazy():
+    stream = StringIO(u'{"x": 1, "y": 2}\n{"x": 3, "y": 4}\n')
+    it = pjson.iterload(stream, record_type=Point)
+    assert next(it) == Point(x=1, y=2)
+    assert next(it) == Point(x=3, y=4)
+    with pytest.raises(StopIteration):
+        next(it)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 65536])
+def test_iterload_values_spanning_chunks(chunk_size):
+    docs = [{'a': 'x' * 20, 'b': [123456789, 1.25]}, 123456789, 'y' * 10, [{}], None]
+    stream = StringIO(u'\n'.join(json.dumps(d) for d in docs))
+    assert list(pjson.iterload(stream, chunk_size=chunk_size)) == [freeze(d) for d in docs]
+
+
+NUMBERS_ARRAY = u'[1.25, 2e5, 3, -0.5E-2, 1e+3]'
+
+
+@pytest.mark.parametrize('chunk_size', range(1, len(NUMBERS_ARRAY) + 1))
+def test_iterload_array_numbers_split_at_any_chunk_boundary(chunk_size):
+    result = list(pjson.iterload(StringIO(NUMBERS_ARRAY), array=True, chunk_size=chunk_size))
+    assert result == [1.25, 2e5, 3, -0.5E-2, 1e+3]
+
+
+NUMBER_LINES = u'1.25\n2e5\n-3\n12345\n'
+
+
+@pytest.mark.parametrize('chunk_size', range(1, len(NUMBER_LINES) + 1))
+def test_iterload_number_lines_split_at_any_chunk_boundary(chunk_size):
+    result = list(pjson.iterload(StringIO(NUMBER_LINES), chunk_size=chunk_size))
+    assert result == [1.25, 2e5, -3, 12345]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 65536])
+def test_iterload_array_items(chunk_size):
+    docs = [{'a': 'x' * 20, 'b': [1, 2]}, 123456789, [], 'y']
+    stream = StringIO(u' [ ' + u' , '.join(json.dumps(d) for d in docs) + u' ] \n')
+    assert list(pjson.iterload(stream, array=True, chunk_size=chunk_size)) == [freeze(d) for d in docs]
+
+
+def test_iterload_empty_array():
+    assert list(pjson.iterload(StringIO(u'[ ]'), array=True)) == []
+
+
+def test_iterload_array_with_record_type():
+    stream = StringIO(u'[{"x": 1, "y": 2, "z": 0}, {"x": 3, "y": 4}]')
+    result = list(pjson.iterload(stream, array=True, record_type=Point, ignore_extra=True))
+    assert result == [Point(x=1, y=2), Point(x=3, y=4)]
+
+
+@pytest.mark.parametrize('data', [u'', u'{}', u'[1 2]', u'[1,', u'[1] 2', u'[1,]'])
+def test_iterload_array_invalid_data(data):
+    with pytest.raises(ValueError):
+        list(pjson.iterload(StringIO(data), array=True))
+
+
+def test_iterload_invalid_data():
+    it = pjson.iterload(StringIO(u'{"a": 1}\n{"a": }\n'))
+    assert next(it) == m(a=1)
+    with pytest.raises(ValueError):
+        next(it)
+
+
+class Measurement(PRecord):
+    value = field(serializer=lambda format, value: '{0}{1}'.format(value, format or ''))
+    tags = pvector_field(str)
+
+
+class Measurements(CheckedPVector):
+    __type__ = Measurement
+
+
+class UpperMeasurements(CheckedPVector):
+    __type__ = Measurement
+    __serializer__ = lambda self, format, m: m.serialize((format or 'none').upper())
+
+
+class MeasurementsByName(CheckedPMap):
+    __key_type__ = str
+    __value_type__ = Measurement
+
+
+class Report(PClass):
+    title = field(type=str, serializer=lambda format, value: value.upper())
+    measurements = field(type=Measurements)
+    upper = field(type=UpperMeasurements)
+    by_name = field(type=MeasurementsByName)
+    comment = field()
+
+
+def report():
+    return Report(title='report',
+                  measurements=Measurements([Measurement(value=1, tags=['a']), Measurement(value=2)]),
+                  upper=UpperMeasurements([Measurement(value=3)]),
+                  by_name=MeasurementsByName({'x': Measurement(value=4, tags=['b', 'c'])}))
+
+
+def test_dumps_persistent_structures():
+    doc = {'a': [1, 2.5, None, True, False, {'b': u'\xe5'}], 'c': {}, 'd': [], 'e': (1, 2)}
+    assert json.loads(pjson.dumps(freeze(doc))) == json.loads(json.dumps(doc))
+
+
+def test_dumps_python_and_c_vectors():
+    from pyrsistent._pvector import python_pvector
+    values = list(range(2000)) + [{'a': 1}]
+    assert pjson.dumps(python_pvector(values)) == json.dumps(values)
+    assert pjson.dumps(freeze(values)) == json.dumps(values)
+
+
+def test_dumps_non_string_keys():
+    result = pjson.loads(pjson.dumps(m(a=1).set(1, 2).set(None, 3).set(2.5, 4).set(False, 5)))
+    assert result == pmap({'a': 1, '1': 2, 'null': 3, '2.5': 4, 'false': 5})
+
+
+def test_dumps_invalid_keys():
+    with pytest.raises(TypeError):
+        pjson.dumps(pmap({(1, 2): 3}))
+
+    assert pjson.dumps(pmap({(1, 2): 3, 'a': 4}), skipkeys=True) == '{"a": 4}'
+
+
+def test_dumps_unserializable_values():
+    from pyrsistent import s
+    with pytest.raises(TypeError):
+        pjson.dumps(v(s(1)))
+
+    assert pjson.dumps(v(s(1)), default=list) == '[[1]]'
+
+
+def test_dumps_float_values():
+    assert pjson.dumps(v(float('nan'), float('inf'), -float('inf'))) == '[NaN, Infinity, -Infinity]'
+
+    with pytest.raises(ValueError):
+        pjson.dumps(v(float('inf')), allow_nan=False)
+
+
+def test_dumps_formatting_options():
+    assert pjson.dumps(m(a=v(1, 2)), separators=(',', ':')) == '{"a":[1,2]}'
+    assert pjson.dumps(pmap({'b': 1, 'a': 2}), sort_keys=True) == '{"a": 2, "b": 1}'
+    assert pjson.dumps(v(u'\xe5'), ensure_ascii=False) == u'["\xe5"]'
+
+
+def test_dumps_checked_types_like_serialize():
+    for format in (None, 'kg'):
+        assert json.loads(pjson.dumps(report(), format)) == json.loads(json.dumps(report().serialize(format)))
+
+
+def test_dumps_uses_field_and_type_serializers():
+    assert json.loads(pjson.dumps(report(), 'kg')) == {
+        'title': 'REPORT',
+        'measurements': [{'value': '1', 'tags': ['a']}, {'value': '2', 'tags': []}],
+        'upper': [{'value': '3KG', 'tags': []}],
+        'by_name': {'x': {'value': '4', 'tags': ['b', 'c']}},
+    }
+
+
+def test_dump_writes_in_chunks():
+    class Writer(object):
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, data):
+            self.chunks.append(data)
+
+    values = [{'a': i, 'b': [i, str(i)]} for i in range(5000)]
+    writer = Writer()
+    pjson.dump(freeze(values), writer)
+    assert len(writer.chunks) > 1
+    assert json.loads(''.join(writer.chunks)) == values
+
+
+def test_dump_load_roundtrip():
+    line = Line(name='a', points=Points([Point(x=1, y=2), Point(x=3, y=4)]))
+    stream = StringIO()
+    pjson.dump(line, stream)
+    stream.seek(0)
+    assert pjson.load(stream, record_type=Line) == line
+
+
+def test_serialize_to():
+    for format in (None, 'kg'):
+        out = StringIO()
+        report().serialize_to(out, format, sort_keys=True)
+        assert out.getvalue() == json.dumps(report().serialize(format), sort_keys=True)
@@ -877,3 +877,317 @@ def test_pickle_with_one_way_factory():
     """
     thing = UniqueThing(id='25544626-86da-4bce-b6b6-9186c0804d64')
     assert thing == pickle.loads(pickle.dumps(thing))
+
+
+class CompactRecord(PRecord):
+    __compact__ = True
+    x = field(type=int, invariant=lambda x: (x >= 0, 'x negative'))
+    y = field()
+    items = field(initial=0)
+
+
+class CompactHierarchy(PRecord):
+    __compact__ = True
+    point = field(CompactRecord)
+    points = pvector_field(CompactRecord)
+
+
+def test_compact_record_mapping_api():
+    r = CompactRecord(x=1, y='a')
+    assert isinstance(r, PRecord)
+    assert isinstance(r, PMap)
+    assert r['x'] == 1
+    assert r.y == 'a'
+    assert r['items'] == 0
+    assert r.get('x') == 1
+    assert len(r) == 3
+    assert 'y' in r
+    assert 'z' not in r
+    assert [] not in r
+    assert list(r) == ['x', 'y', 'items']
+    assert r.keys() == pvector(['x', 'y', 'items'])
+    assert r.values() == pvector([1, 'a', 0])
+    assert dict(r.items()) == {'x': 1, 'y': 'a', 'items': 0}
+    assert repr(r) == "CompactRecord(x=1, y='a', items=0)"
+
+    with pytest.raises(KeyError):
+        r['z']
+
+    with pytest.raises(AttributeError):
+        r.z
+
+
+def test_compact_record_missing_optional_field():
+    r = CompactRecord(x=1)
+    assert len(r) == 2
+    assert 'y' not in r
+    assert dict(r) == {'x': 1, 'items': 0}
+
+    with pytest.raises(KeyError):
+        r['y']
+
+
+def test_compact_record_updates():
+    r = CompactRecord(x=1, y='a')
+    assert r.set(x=2) == CompactRecord(x=2, y='a')
+    assert r.set('y', 'b').y == 'b'
+    assert r.update({'x': 3}).x == 3
+    assert r.remove('y') == CompactRecord(x=1)
+    assert r.discard('z') is r
+    assert r.transform(['x'], lambda x: x + 1).x == 2
+    assert type(r.set(x=2)) is CompactRecord
+    assert r == CompactRecord(x=1, y='a')
+
+    e = r.evolver()
+    e['x'] = 5
+    assert e.persistent() == CompactRecord(x=5, y='a')
+
+
+def test_compact_record_validation():
+    with pytest.raises(PTypeError):
+        CompactRecord(x='1')
+
+    with pytest.raises(InvariantException):
+        CompactRecord(x=-1)
+
+    with pytest.raises(InvariantException):
+        CompactRecord(x=1).set(x=-1)
+
+    with pytest.raises(AttributeError):
+        CompactRecord(z=1)
+
+
+def test_compact_record_equality_and_hash():
+    r = CompactRecord(x=1, y='a')
+    assert r == CompactRecord(x=1, y='a')
+    assert r != CompactRecord(x=1)
+    assert r == {'x': 1, 'y': 'a', 'items': 0}
+    assert r == pmap({'x': 1, 'y': 'a', 'items': 0})
+    assert pmap({'x': 1, 'y': 'a', 'items': 0}) == r
+    assert r != {'x': 1}
+    assert hash(r) == hash(CompactRecord(x=1, y='a'))
+    assert hash(r) == hash(pmap({'x': 1, 'y': 'a', 'items': 0}))
+
+
+def test_compact_record_nesting_serialization_and_pickling():
+    h = CompactHierarchy.create({'point': {'x': 1}, 'points': [{'x': 2, 'y': 3}]})
+    assert h.point == CompactRecord(x=1)
+    assert h.serialize() == {'point': {'x': 1, 'items': 0}, 'points': [{'x': 2, 'y': 3, 'items': 0}]}
+    assert pickle.loads(pickle.dumps(h)) == h
+
+
+def test_compact_record_subclass_is_compact():
+    class Extended(CompactRecord):
+        z = field()
+
+    r = Extended(x=1, z=2)
+    assert dict(r) == {'x': 1, 'items': 0, 'z': 2}
+    assert not hasattr(r, '_precord_field_y')
+
+
+class BucketlessRecord(CompactRecord):
+    @property
+    def _buckets(self):
+        raise AssertionError('Compact records should not need buckets')
+
+
+def test_compact_record_size_and_updates_without_buckets():
+    from pyrsistent import json as pjson
+    r = BucketlessRecord(x=1)
+    assert len(r) == 2
+    assert len(r.set(y=2)) == 3
+    assert len(r.set(y=2).remove('y')) == 2
+    assert len(r.discard('y')) == 2
+    assert r.set(x=1) is r
+
+    e = r.evolver()
+    e['y'] = 'a'
+    e.set('x', 2)
+    assert len(e) == 3
+    assert 'y' in e and e['y'] == 'a'
+    del e['items']
+    result = e.persistent()
+    assert type(result) is BucketlessRecord
+    assert dict(result) == {'x': 2, 'y': 'a'}
+    assert len(result) == 2
+
+    assert r.update({'y': 3}) == {'x': 1, 'y': 3, 'items': 0}
+    assert pjson.loads(pjson.dumps(result)) == {'x': 2, 'y': 'a'}
+
+    with pytest.raises(InvariantException):
+        r.set(x=-1)
+
+    with pytest.raises(AttributeError):
+        r.set(z=1)
+
+
+def test_compact_record_subclass_cannot_opt_out_of_compact():
+    with pytest.raises(TypeError) as e:
+        class Extended(CompactRecord):
+            __compact__ = False
+            z = field()
+
+    assert 'Extended' in str(e.value)
+
+
+def test_compact_record_uses_less_memory():
+    class Regular(PRecord):
+        x = field()
+        y = field()
+
+    class Compact(PRecord):
+        __compact__ = True
+        x = field()
+        y = field()
+
+    import sys
+    regular = Regular(x=1, y=2)
+    compact = Compact(x=1, y=2)
+    assert sys.getsizeof(compact) < sys.getsizeof(regular) + sys.getsizeof(regular._buckets)
+    assert not hasattr(compact, '__dict__')
+
+
+class ManyRecord(PRecord):
+    __invariant__ = lambda r: (r.get('y', 0) <= r.x, 'y larger than x')
+    x = field(type=int, mandatory=True, invariant=lambda x: (x >= 0, 'Negative x'))
+    y = field(type=int, initial=0)
+    point = field(ARecord)
+
+
+def test_create_many():
+    existing = ManyRecord(x=5)
+    rows = [{'x': 1}, {'x': 2, 'y': 1, 'point': {'x': 1, 'y': 'a'}}, existing]
+
+    records = ManyRecord.create_many(rows)
+    assert records == [ManyRecord.create(row) for row in rows]
+    assert records[1].point == ARecord(x=1, y='a')
+    assert type(records[0]) is ManyRecord
+    assert records[2] is existing
+
+
+def test_create_many_ignore_extra():
+    records = ManyRecord.create_many([{'x': 1, 'z': 2, 'point': {'x': 1, 'q': 3}}], ignore_extra=True)
+    assert records == [ManyRecord(x=1, point=ARecord(x=1))]
+
+    with pytest.raises(AttributeError):
+        ManyRecord.create_many([{'x': 1, 'z': 2}])
+
+
+def test_create_many_errors():
+    with pytest.raises(PTypeError) as e:
+        ManyRecord.create_many([{'x': 1}, {'x': 'a'}])
+
+    assert e.value.field == 'x'
+
+    with pytest.raises(InvariantException) as e:
+        ManyRecord.create_many([{'x': -1, 'point': {'x': 1, 'y': 2}}])
+
+    assert e.value.invariant_errors == ('Negative x',)
+    assert e.value.missing_fields == ()
+
+    with pytest.raises(InvariantException) as e:
+        ManyRecord.create_many([{'y': 1}])
+
+    assert e.value.missing_fields == ('ManyRecord.x',)
+
+    with pytest.raises(InvariantException) as e:
+        ManyRecord.create_many([{'x': 1, 'y': 2}])
+
+    assert e.value.invariant_errors == ('y larger than x',)
+
+
+def test_create_many_compact():
+    class CompactMany(ManyRecord):
+        __compact__ = True
+
+    records = CompactMany.create_many([{'x': 1}, {'x': 2, 'y': 2}])
+    assert records == [CompactMany(x=1), CompactMany(x=2, y=2)]
+    assert all(type(r) is CompactMany for r in records)
+
+
+def test_create_many_uses_overridden_create():
+    class Converted(PRecord):
+        x = field(type=int)
+
+        @classmethod
+        def create(cls, kwargs, _factory_fields=None, ignore_extra=False):
+            return super(Converted, cls).create({'x': int(kwargs['x'])}, _factory_fields, ignore_extra)
+
+    class Holder(PRecord):
+        entries = pvector_field(Converted)
+
+    assert Holder.create({'entries': [{'x': '5'}, Converted(x=6)]}).entries == [Converted(x=5), Converted(x=6)]
+    assert Converted.create_many([{'x': '1'}]) == [Converted(x=1)]
+
+
+def test_create_many_uses_overridden_new():
+    class Shifted(PRecord):
+        x = field(type=int)
+
+        def __new__(cls, **kwargs):
+            if 'x' in kwargs:
+                kwargs['x'] += 100
+            return super(Shifted, cls).__new__(cls, **kwargs)
+
+    class Holder(PRecord):
+        entries = pvector_field(Shifted)
+
+    assert Holder.create({'entries': [{'x': 1}]}).entries[0].x == 101
+    assert Shifted.create_many([{'x': 1}]) == [Shifted.create({'x': 1})]
+
+
+def test_create_nested_vector_of_records():
+    h = Hierarchy.create({'points': [{'x': 1, 'y': 'a'}, ARecord(x=2)]})
+    assert h.points == [ARecord(x=1, y='a'), ARecord(x=2)]
+
+
+def test_serialize_specialised_per_field():
+    class Inner(PRecord):
+        a = field(type=int)
+        b = field(serializer=lambda format, value: format)
+
+    class Outer(PRecord):
+        inner = field(type=Inner)
+        anything = field()
+        numbers = pvector_field(int)
+
+    r = Outer(inner=Inner(a=1, b=2), anything=Inner(b=3), numbers=[1, 2])
+    assert r.serialize('f') == {'inner': {'a': 1, 'b': 'f'}, 'anything': {'b': 'f'}, 'numbers': [1, 2]}
+    assert Outer(anything=5).serialize() == {'anything': 5, 'numbers': []}
+
+    class CompactOuter(Outer):
+        __compact__ = True
+
+    assert CompactOuter(inner=Inner(a=1), numbers=[3]).serialize() == {'inner': {'a': 1}, 'numbers': [3]}
+
+
+class ForwardRecord(PRecord):
+    x = field(type=int)
+    later = field(type=('record_test.RecordDefinedLater', type(None)))
+
+
+# Created before the type of the later field can be resolved
+EARLY_FORWARD_RECORD = ForwardRecord(x=1)
+
+
+class RecordDefinedLater(PRecord):
+    y = field(type=int)
+
+
+def test_string_types_resolved_on_use_when_not_yet_defined():
+    assert EARLY_FORWARD_RECORD == {'x': 1}
+    assert ForwardRecord(later=RecordDefinedLater(y=2)).later.y == 2
+    assert ForwardRecord(later=None).later is None
+
+    with pytest.raises(PTypeError):
+        ForwardRecord(later=1)
+
+
+class Doubled(PRecord):
+    x = field(factory=lambda x: 2 * x)
+
+
+def test_factories_only_applied_to_factory_fields():
+    assert Doubled(x=1).x == 2
+    assert Doubled.create({'x': 1}, _factory_fields=set()).x == 1
+    assert pickle.loads(pickle.dumps(Doubled(x=1))).x == 2
@@ -0,0 +1,159 @@
+import io
+import pickle
+import pytest
+from pyrsistent import serialization
+from pyrsistent import (pmap, pvector, pset, pbag, pdeque, plist, m, v, PRecord, PClass, field, pvector_field,
+                        pmap_field, pset_field, CheckedPVector, CheckedPMap, CheckedPSet, PVector)
+from pyrsistent._pvector import python_pvector, _python_trie_import, _trie_import
+
+
+class Record(PRecord):
+    a = field()
+    numbers = pvector_field(int)
+    mapping = pmap_field(str, int)
+    items = pset_field(int)
+
+
+class Ints(CheckedPVector):
+    __type__ = int
+
+
+class IntSet(CheckedPSet):
+    __type__ = int
+
+
+class StrToInt(CheckedPMap):
+    __key_type__ = str
+    __value_type__ = int
+
+
+class Point(PClass):
+    x = field()
+    y = field()
+
+
+def roundtrip(obj):
+    return serialization.loads(serialization.dumps(obj))
+
+
+@pytest.mark.parametrize('obj', [
+    pvector(), pvector(range(10)), pvector(range(32)), pvector(range(33)), pvector(range(1057)),
+    pvector(range(40000)), python_pvector(range(2000)),
+    pmap(), pmap({'a': 1, 'b': v(1, 2)}), pmap(dict((i, str(i)) for i in range(2000))),
+    pset(), pset(range(100)),
+    pbag([1, 1, 2]),
+    pdeque(), pdeque([1, 2, 3]), pdeque([1, 2, 3], maxlen=5),
+    plist(), plist([1, 2, 3]),
+])
+def test_roundtrip(obj):
+    result = roundtrip(obj)
+    assert result == obj
+
+    # Like regular pickling vectors are restored using the available implementation
+    assert type(result) is (type(pvector()) if isinstance(obj, PVector) else type(obj))
+
+
+def test_roundtrip_checked_types():
+    objs = [Record(a=m(x=1), numbers=[1, 2], mapping={'a': 1}, items=[3]),
+            Ints(range(1000)), IntSet([1, 2]), StrToInt({'a': 1, 'b': 2}),
+            Point(x=v(1), y=2)]
+
+    result = roundtrip(objs)
+    assert result == objs
+    assert [type(r) for r in result] == [type(o) for o in objs]
+    assert type(result[0].numbers) is type(objs[0].numbers)
+    assert type(result[0].mapping) is type(objs[0].mapping)
+
+
+def test_restored_checked_types_keep_checking():
+    record, ints = roundtrip([Record(numbers=[1]), Ints([1, 2])])
+    assert record.set(numbers=[1, 2]).numbers == v(1, 2)
+    with pytest.raises(TypeError):
+        record.set(numbers=['a'])
+
+    with pytest.raises(TypeError):
+        ints.append('a')
+
+
+def test_restored_structures_can_be_updated():
+    vec, vec2, pm = roundtrip([pvector(range(3000)), python_pvector(range(100)), pmap({'a': 1})])
+    assert vec.set(2000, 'a')[2000] == 'a'
+    assert vec.append(3000)[-1] == 3000
+    assert vec.delete(0)[0] == 1
+    assert vec.evolver().set(5, 'x').persistent()[5] == 'x'
+    assert vec2.append(100) == pvector(range(101))
+    assert pm.set('b', 2) == pmap({'a': 1, 'b': 2})
+
+
+def test_shared_vector_nodes_are_stored_once():
+    base = pvector(range(10000))
+    versions = [base.set(i * 100, -1) for i in range(100)]
+
+    assert len(serialization.dumps(versions)) * 10 < len(pickle.dumps(versions))
+
+
+def test_shared_map_versions_are_stored_once():
+    versions = [pmap(dict((i, i) for i in range(5000)))]
+    for i in range(1, 100):
+        versions.append(versions[-1].set(i, -i))
+
+    assert len(serialization.dumps(versions)) * 10 < len(pickle.dumps(versions))
+    assert roundtrip(versions) == versions
+
+
+def test_sharing_is_restored_on_load():
+    pm = pmap(dict((i, i) for i in range(5000)))
+    first, second = roundtrip([pm, pm.set(1, -1)])
+    assert first._buckets[4000] is second._buckets[4000]
+
+    vec = Ints(range(5000))
+    first, second = roundtrip([vec, vec.set(0, -1)])
+    assert first._root[-1] is second._root[-1]
+
+
+def test_plist_tails_are_shared():
+    pl = plist(range(1000))
+    first, second, third = roundtrip([pl, pl.cons(-1), pl.cons(-2).cons(-3)])
+    assert second.rest is first
+    assert third.rest.rest is first
+
+    d = pdeque(range(1000))
+    first, second = roundtrip([d, d.append(1000)])
+    assert second == d.append(1000)
+    assert second._right_list.rest is first._right_list
+
+
+def test_python_import_of_exported_trie():
+    vec = pvector(range(5000))
+    memo = {}
+    result = _python_trie_import(*(vec._trie_export({}) + (memo,)))
+    assert result == vec
+    assert type(result) is type(python_pvector())
+
+
+@pytest.mark.parametrize('count, shift, root, tail', [
+    (40, 5, (), tuple(range(8))),
+    (40, 5, (tuple(range(32)),), tuple(range(7))),
+    (40, 5, (tuple(range(31)),), tuple(range(8))),
+    (40, 5, ((1,),), tuple(range(8))),
+    (40, 7, (tuple(range(32)),), tuple(range(8))),
+    (40, 5, [tuple(range(32))], tuple(range(8))),
+])
+@pytest.mark.skipif(_trie_import is _python_trie_import, reason='Only the C implementation validates tries')
+def test_invalid_tries_are_rejected_by_c_implementation(count, shift, root, tail):
+    with pytest.raises((ValueError, TypeError)):
+        _trie_import(count, shift, root, tail, {})
+
+
+def test_dump_and_load_files():
+    obj = m(a=v(1, 2), b=pset([3]))
+    f = io.BytesIO()
+    serialization.dump(obj, f)
+    f.seek(0)
+    assert serialization.load(f) == obj
+
+
+def test_regular_pickle_is_not_affected():
+    vec = pvector(range(100))
+    serialization.dumps(vec)
+    assert pickle.loads(pickle.dumps(vec)) == vec
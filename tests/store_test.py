@@ -0,0 +1,213 @@
+import os
+import pytest
+from pyrsistent import pvector, pmap, pvector_typed, m, v
+from pyrsistent.store import NodeStore, StoredVector, StoredMap, _RECORD, _VECTOR_ROOT
+
+
+@pytest.fixture
+def path(tmpdir):
+    return str(tmpdir.join('store.db'))
+
+
+@pytest.mark.parametrize('size', [0, 1, 32, 33, 1056, 1057, 40000])
+def test_save_and_load_vector(path, size):
+    vec = pvector(range(size))
+    with NodeStore(path) as store:
+        ref = store.save(vec)
+        loaded = store.load(ref)
+        assert isinstance(loaded, StoredVector)
+        assert loaded == vec
+        assert len(loaded) == size
+
+    with NodeStore(path) as store:
+        loaded = store.load(ref)
+        assert loaded == vec
+        assert list(loaded) == list(range(size))
+        if size:
+            assert loaded[-1] == size - 1
+            assert loaded[size // 2] == size // 2
+
+
+def test_vectors_of_any_kind_can_be_saved(path):
+    from pyrsistent._pvector import python_pvector
+    with NodeStore(path) as store:
+        for vec in (python_pvector(range(100)), pvector_typed('d', range(100)), v(m(a=1), 'b', None)):
+            assert store.load(store.save(vec)) == vec
+
+
+def test_updates_only_write_changed_nodes(path):
+    with NodeStore(path) as store:
+        ref = store.save(pvector(range(100000)))
+        size = store.size
+        refs = [ref]
+        vec = store.load(ref)
+        for i in range(10):
+            vec = vec.set(i * 1000, -i)
+            refs.append(store.save(vec))
+
+        # Each version only adds a path of four nodes
+        assert (store.size - size) / 10 < 1000
+
+    with NodeStore(path) as store:
+        assert store.load(refs[0])[1000] == 1000
+        assert store.load(refs[-1])[1000] == -1
+        assert store.load(refs[-1]) == pvector(range(100000)).mset(*[x for i in range(10) for x in (i * 1000, -i)])
+
+
+def test_saving_does_not_modify_the_vector(path):
+    with NodeStore(path) as store:
+        vec = store.load(store.save(pvector(range(1000)))).set(5, 'five')
+        root, tail = vec._root, vec._tail
+        store.save(vec)
+        assert vec._root is root
+        assert vec._tail is tail
+
+
+def test_nodes_are_only_written_once(path):
+    def written(vec):
+        size = store.size
+        store.save(vec)
+        return store.size - size
+
+    with NodeStore(path) as store:
+        ref = store.save(pvector(range(100010)))
+        vec = store.load(ref).set(5, 'five')
+        store.save(vec)
+
+        # Neither the changed path nor the tail loaded from the store are written again
+        assert written(vec) == written(store.load(ref)) == _RECORD.size + _VECTOR_ROOT.size
+
+        # Versions derived from a saved version only write the nodes that differ from it
+        assert written(vec.set(99000, 'x')) == written(store.load(ref).set(99000, 'x'))
+        assert store.load(store.save(vec.set(99000, 'x'))) == pvector(range(100010)).mset(5, 'five', 99000, 'x')
+
+
+@pytest.mark.parametrize('size', [0, 1, 31, 32, 33, 1024, 1056, 1057])
+def test_append_and_extend(path, size):
+    with NodeStore(path) as store:
+        vec = store.load(store.save(pvector(range(size))))
+        extended = vec.extend(range(size, size + 1100))
+        assert extended == pvector(range(size + 1100))
+        assert vec.append('a')[-1] == 'a'
+        assert vec == pvector(range(size))
+
+        assert store.load(store.save(extended)) == pvector(range(size + 1100))
+
+
+def test_vector_api(path):
+    with NodeStore(path) as store:
+        vec = store.load(store.save(pvector(range(100))))
+        assert vec[10:20] == pvector(range(10, 20))
+        assert vec.index(50) == 50
+        assert vec.count(50) == 1
+        assert vec.mset(1, -1, 2, -2)[:3] == pvector([0, -1, -2])
+        assert vec.persistent() == pvector(range(100))
+        assert hash(vec) == hash(tuple(range(100)))
+        assert vec < v(1)
+
+        with pytest.raises(IndexError):
+            vec[100]
+
+        with pytest.raises(IndexError):
+            vec.set(101, 1)
+
+
+def test_save_and_load_map(path):
+    pm = pmap(dict(('key{0}'.format(i), i) for i in range(1000)))
+    with NodeStore(path) as store:
+        ref = store.save(pm)
+
+    with NodeStore(path) as store:
+        loaded = store.load(ref)
+        assert isinstance(loaded, StoredMap)
+        assert loaded == pm
+        assert loaded['key10'] == 10
+        assert loaded.get('missing', 17) == 17
+        assert 'key999' in loaded
+        assert 'missing' not in loaded
+        assert set(loaded) == set(pm)
+        assert loaded.persistent() == pm
+        assert hash(loaded) == hash(pm)
+
+
+def test_map_updates(path):
+    with NodeStore(path) as store:
+        sm = store.load(store.save(m()))
+        for i in range(200):
+            sm = sm.set(i, str(i))
+
+        sm = sm.set(1.0, 'one').set(True, 'true').remove(2).discard(3).discard('missing')
+        sm = sm.update({'a': 1}, {(1, 'b'): 2})
+        expected = dict((i, str(i)) for i in range(200))
+        expected.update({1: 'true', 'a': 1, (1, 'b'): 2})
+        del expected[2], expected[3]
+        assert sm == expected
+        assert sm.set('a', 1) is sm
+
+        with pytest.raises(KeyError):
+            sm.remove('missing')
+
+        ref = store.save(sm)
+
+    with NodeStore(path) as store:
+        assert store.load(ref) == expected
+
+
+def test_map_keys_are_hashed_stably_between_processes(path):
+    import subprocess
+    import sys
+    with NodeStore(path) as store:
+        ref = store.save(pmap({'abc': 1, (b'x', 2.5, None): 2}))
+
+    code = ('from pyrsistent.store import NodeStore\n'
+            'with NodeStore({0!r}) as store:\n'
+            '    sm = store.load({1})\n'
+            '    assert sm["abc"] == 1 and sm[(b"x", 2.5, None)] == 2\n').format(path, ref)
+    env = dict(os.environ, PYTHONHASHSEED='random')
+    subprocess.check_call([sys.executable, '-c', code], env=env, cwd=os.path.dirname(os.path.dirname(__file__)))
+
+
+def test_unsupported_map_keys(path):
+    with NodeStore(path) as store:
+        with pytest.raises(TypeError):
+            store.save(pmap({frozenset(): 1}))
+
+
+def test_node_cache_is_bounded(path):
+    with NodeStore(path, cache_size=10) as store:
+        vec = store.load(store.save(pvector(range(10000))))
+        assert list(vec) == list(range(10000))
+        info = store.cache_info()
+        assert info.currsize == 10
+        assert info.maxsize == 10
+
+        vec[5000]
+        vec[5001]
+        assert store.cache_info().hits > info.hits
+
+
+def test_invalid_files_and_references(path):
+    with open(path, 'wb') as f:
+        f.write(b'not a store')
+
+    with pytest.raises(ValueError):
+        NodeStore(path)
+
+    os.remove(path)
+    with NodeStore(path) as store:
+        ref = store.save(pvector([1]))
+        with pytest.raises(ValueError):
+            store.load(ref + 1000)
+
+        with pytest.raises(ValueError):
+            store.load(0)
+
+        with pytest.raises(TypeError):
+            store.save(1)
+
+
+def test_structures_from_another_store_are_rejected(tmpdir):
+    with NodeStore(str(tmpdir.join('a'))) as a, NodeStore(str(tmpdir.join('b'))) as b:
+        vec = a.load(a.save(pvector([1])))
+        with pytest.raises(ValueError):
+            b.save(vec)
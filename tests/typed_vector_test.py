@@ -0,0 +1,272 @@
+from array import array
+import pickle
+import pytest
+from pyrsistent import pvector_typed, PTypedVector, PVector, pvector, v, freeze, thaw
+
+
+def check_structure(vec):
+    # The tail holds the last 1 - 32 elements and all leaves but the tail are full
+    leaves = list(vec.leaves())
+    assert sum(len(leaf) for leaf in leaves) == len(vec)
+    assert all(len(leaf) == 32 for leaf in leaves[:-1])
+    assert not vec or 1 <= len(vec._tail) <= 32
+
+
+@pytest.mark.parametrize('size', [0, 1, 31, 32, 33, 64, 65, 1024, 1056, 1057, 33 * 1024 + 1, 70000])
+def test_create_and_access(size):
+    vec = pvector_typed('q', range(size))
+    assert len(vec) == size
+    assert vec.tolist() == list(range(size))
+    assert list(vec) == list(range(size))
+    if size:
+        assert vec[0] == 0
+        assert vec[-1] == size - 1
+        assert vec[size // 2] == size // 2
+
+    check_structure(vec)
+
+
+def test_is_a_pvector():
+    vec = pvector_typed('d', [1, 2])
+    assert isinstance(vec, PVector)
+    assert isinstance(vec, PTypedVector)
+    assert vec.typecode == 'd'
+    assert vec.itemsize == 8
+
+
+def test_values_are_converted_and_checked_like_arrays():
+    assert pvector_typed('d', [1, 2]).tolist() == [1.0, 2.0]
+    assert type(pvector_typed('d', [1])[0]) is float
+
+    with pytest.raises(TypeError):
+        pvector_typed('d', ['a'])
+
+    with pytest.raises(OverflowError):
+        pvector_typed('b', [1000])
+
+    with pytest.raises(TypeError):
+        pvector_typed('d', [1]).set(0, 'a')
+
+    with pytest.raises(TypeError):
+        pvector_typed('q', [1]).append(1.5)
+
+
+def test_equality_and_hash():
+    vec = pvector_typed('q', range(100))
+    assert vec == pvector_typed('q', range(100))
+    assert vec == pvector_typed('d', range(100))
+    assert vec != pvector_typed('q', range(99))
+    assert vec == pvector(range(100))
+    assert vec == list(range(100))
+    assert hash(vec) == hash(pvector_typed('q', range(100)))
+    assert pvector_typed('q', [1, 2]) < v(1, 3)
+
+
+@pytest.mark.parametrize('typecode, values', [('q', [1, 2]), ('q', range(1000)), ('d', [0.5, -1.5]), ('q', [])])
+def test_hash_matches_pvector(typecode, values):
+    typed = pvector_typed(typecode, values)
+    plain = pvector(values)
+    assert typed == plain
+    assert hash(typed) == hash(plain)
+    assert {plain: 'x'}[typed] == 'x'
+    assert typed in {plain}
+    assert plain in {typed}
+
+
+def test_repr():
+    assert repr(pvector_typed('q', [1, 2])) == "pvector_typed('q', [1, 2])"
+
+
+@pytest.mark.parametrize('size', [1, 32, 33, 1056, 1057, 40000])
+def test_append(size):
+    vec = pvector_typed('q')
+    for i in range(size):
+        vec = vec.append(i)
+
+    assert vec == pvector_typed('q', range(size))
+    assert vec._shift == pvector_typed('q', range(size))._shift
+    check_structure(vec)
+
+
+@pytest.mark.parametrize('initial, extra', [(0, 0), (0, 100), (10, 22), (10, 23), (32, 1), (33, 5000),
+                                            (1056, 1), (1000, 40000)])
+def test_extend(initial, extra):
+    base = pvector_typed('q', range(initial))
+    vec = base.extend(range(initial, initial + extra))
+    assert vec == pvector_typed('q', range(initial + extra))
+    assert base == pvector_typed('q', range(initial))
+    assert base + pvector_typed('q', [1]) == base.append(1)
+    check_structure(vec)
+
+
+def test_set_shares_structure():
+    vec = pvector_typed('d', range(5000))
+    vec2 = vec.set(2000, -1).set(-1, -2)
+    assert vec2[2000] == -1
+    assert vec2[4999] == -2
+    assert vec[2000] == 2000
+    assert vec[4999] == 4999
+    assert vec2.set(5000, 1)[5000] == 1
+
+    leaves, leaves2 = list(vec.leaves()), list(vec2.leaves())
+    shared = sum(1 for a, b in zip(leaves, leaves2) if a.obj is b.obj)
+    assert shared == len(leaves) - 2
+
+    with pytest.raises(IndexError):
+        vec.set(5001, 1)
+
+
+def test_slicing():
+    vec = pvector_typed('q', range(100))
+    assert vec[:] is vec
+    assert vec[10:20] == pvector_typed('q', range(10, 20))
+    assert vec[::-10] == pvector_typed('q', range(99, -1, -10))
+    assert type(vec[1:2]) is PTypedVector
+
+
+def test_delete_and_remove():
+    vec = pvector_typed('q', range(100))
+    assert vec.delete(0) == pvector_typed('q', range(1, 100))
+    assert vec.delete(10, 90) == pvector_typed('q', list(range(10)) + list(range(90, 100)))
+    assert vec.remove(50) == vec.delete(50)
+
+    with pytest.raises(ValueError):
+        vec.remove(100)
+
+
+def test_index_count_mul():
+    vec = pvector_typed('q', [1, 2, 1])
+    assert vec.index(2) == 1
+    assert vec.count(1) == 2
+    assert vec * 2 == pvector_typed('q', [1, 2, 1, 1, 2, 1])
+    assert 2 * vec == vec * 2
+    assert vec * 0 == pvector_typed('q')
+
+
+def test_evolver():
+    vec = pvector_typed('d', range(3000))
+    e = vec.evolver()
+    assert not e.is_dirty()
+    assert e.persistent() is vec
+
+    e[0] = -1
+    e[100] = -2
+    e[101] = -3
+    e.set(-1, -4)
+    e.append(3000).extend([3001, 3002])
+    e[3001] = -5
+    assert e[100] == -2
+    assert e[3000] == 3000
+    assert len(e) == 3003
+    assert e.is_dirty()
+
+    result = e.persistent()
+    expected = list(range(3003))
+    expected[0], expected[100], expected[101], expected[2999], expected[3001] = -1, -2, -3, -4, -5
+    assert result == pvector_typed('d', expected)
+    assert vec == pvector_typed('d', range(3000))
+    assert not e.is_dirty()
+    check_structure(result)
+
+    with pytest.raises(IndexError):
+        e[3004] = 1
+
+
+def test_evolver_delete():
+    vec = pvector_typed('q', range(100))
+    e = vec.evolver()
+    e[5] = -1
+    del e[0]
+    e.delete(-1)
+    assert e.is_dirty()
+    assert e.persistent() == pvector_typed('q', [1, 2, 3, 4, -1] + list(range(6, 99)))
+
+
+def test_mset_and_transform():
+    vec = pvector_typed('q', range(100))
+    assert vec.mset(1, -1, 99, -99) == vec.set(1, -1).set(99, -99)
+    assert vec.transform([5], lambda x: x * 10)[5] == 50
+
+
+def test_leaves_are_read_only_views_without_copy():
+    vec = pvector_typed('d', range(100))
+    leaves = list(vec.leaves())
+    assert [len(leaf) for leaf in leaves] == [32, 32, 32, 4]
+    assert leaves[0].format == 'd'
+    assert leaves[1].tolist() == list(range(32, 64))
+    assert leaves[0].obj is vec._root[0]
+
+    with pytest.raises(TypeError):
+        leaves[0][0] = 17.0
+
+
+@pytest.mark.parametrize('start, stop', [(0, None), (0, 0), (3, 10), (32, 64), (-5, None), (10, 90), (90, 10)])
+def test_buffer(start, stop):
+    vec = pvector_typed('q', range(100))
+    buf = vec.buffer(start, stop)
+    assert buf.tolist() == list(range(100))[start:stop]
+    assert buf.readonly
+
+
+def test_buffer_within_leaf_is_not_copied():
+    vec = pvector_typed('q', range(100))
+    assert vec.buffer(35, 40).obj is vec._root[1]
+
+
+@pytest.mark.parametrize('protocol', range(2, pickle.HIGHEST_PROTOCOL + 1))
+def test_pickling(protocol):
+    vec = pvector_typed('d', [x / 3.0 for x in range(2000)])
+    result = pickle.loads(pickle.dumps(vec, protocol))
+    assert result == vec
+    assert result.typecode == 'd'
+    check_structure(result)
+
+
+def test_pickling_out_of_band():
+    if not hasattr(pickle, 'PickleBuffer'):
+        pytest.skip('Out of band pickling requires Python 3.8+')
+
+    vec = pvector_typed('q', range(10000))
+    buffers = []
+    data = pickle.dumps(vec, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1
+    assert len(data) < 200
+    assert pickle.loads(data, buffers=buffers) == vec
+
+
+def test_freeze_and_thaw():
+    vec = pvector_typed('q', [1, 2])
+    assert thaw(vec) == [1, 2]
+    assert freeze(vec) is vec
+
+
+def test_numpy_reads_leaves_without_copy():
+    np = pytest.importorskip('numpy')
+    vec = pvector_typed('d', range(64))
+    leaf = np.frombuffer(next(vec.leaves()), dtype=np.float64)
+    assert leaf.sum() == sum(range(32))
+    assert not leaf.flags.writeable
+
+
+def test_copies_input_arrays():
+    values = array('q', range(10))
+    vec = pvector_typed('q', values)
+    values[0] = 17
+    assert vec[0] == 0
+
+
+def test_bulk_operations():
+    vec = pvector_typed('q', range(3000))
+    assert vec.take([0, -1, 1000]) == pvector_typed('q', [0, 2999, 1000])
+    assert type(vec.take([1])) is PTypedVector
+
+    result = vec.mset_many(range(0, 3000, 3), [-1] * 1000)
+    assert result.tolist() == [-1 if i % 3 == 0 else i for i in range(3000)]
+
+    mapped = vec.map(lambda x: x * 2)
+    assert mapped == pvector_typed('q', range(0, 6000, 2))
+    assert mapped.typecode == 'q'
+    check_structure(mapped)
+
+    with pytest.raises(TypeError):
+        vec.map(str)
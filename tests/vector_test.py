@@ -1,5 +1,7 @@
 import os
+import array
 import pickle
+import threading
 import pytest
 
 from pyrsistent._pvector import python_pvector
@@ -932,3 +934,198 @@ def test_iterable(pvector):
     """
 
     assert pvector(iter("a")) == pvector(iter("a"))
+
+
+@pytest.mark.parametrize('values', [
+    [float(i) / 3 for i in range(2000)],
+    list(range(-1000, 1000)) + [2 ** 63 - 1, -2 ** 63],
+])
+def test_pickling_large_primitive_vector_out_of_band(pvector, values):
+    if not hasattr(pickle, 'PickleBuffer'):
+        pytest.skip('Out of band pickling requires Python 3.8+')
+
+    vec = pvector(values)
+    buffers = []
+    data = pickle.dumps(vec, protocol=5, buffer_callback=buffers.append)
+    assert len(buffers) == 1
+    assert len(data) < 200
+
+    result = pickle.loads(data, buffers=buffers)
+    assert result == vec
+    assert [type(x) for x in result] == [type(x) for x in values]
+    assert pickle.loads(pickle.dumps(vec, protocol=5)) == vec
+
+
+@pytest.mark.parametrize('values', [
+    list(range(1000)) + [1.5],
+    [1.5] * 1000 + [1],
+    list(range(1000)) + [True],
+    list(range(1000)) + [2 ** 64],
+    list(range(100)),
+])
+def test_pickling_vector_that_cannot_be_packed_in_band(pvector, values):
+    vec = pvector(values)
+    buffers = []
+    kwargs = {'buffer_callback': buffers.append} if hasattr(pickle, 'PickleBuffer') else {}
+    result = pickle.loads(pickle.dumps(vec, pickle.HIGHEST_PROTOCOL, **kwargs))
+    assert not buffers
+    assert result == vec
+    assert [type(x) for x in result] == [type(x) for x in values]
+
+
+def test_take(pvector):
+    vec = pvector(range(3000))
+    assert vec.take([0, 2999, -1, 1500, 1501, 0]) == pvector([0, 2999, 2999, 1500, 1501, 0])
+    assert vec.take(range(1000, 1100)) == pvector(range(1000, 1100))
+    assert vec.take([]) == pvector()
+    assert vec.take(array.array('q', [5, 6])) == pvector([5, 6])
+
+    with pytest.raises(IndexError):
+        vec.take([1, 3000])
+
+    with pytest.raises(IndexError):
+        vec.take([-3001])
+
+    with pytest.raises(TypeError):
+        vec.take(['a'])
+
+
+def test_mset_many(pvector):
+    vec = pvector(range(3000))
+    indices = list(range(0, 3000, 7)) + [-1]
+    result = vec.mset_many(indices, (-i for i in indices))
+
+    expected = list(range(3000))
+    for i in indices:
+        expected[i] = -i
+    assert result == pvector(expected)
+    assert vec == pvector(range(3000))
+    assert vec.mset_many([], []) == vec
+    assert vec.mset_many(array.array('q', [3000]), ['a'])[3000] == 'a'
+
+
+def test_mset_many_length_mismatch(pvector):
+    vec = pvector(range(10))
+    with pytest.raises(ValueError):
+        vec.mset_many([1, 2], [1])
+
+    with pytest.raises(ValueError):
+        vec.mset_many([1], [1, 2])
+
+    with pytest.raises(IndexError):
+        vec.mset_many([20], [1])
+
+
+def test_map(pvector):
+    for size in (0, 1, 32, 33, 1057, 3000):
+        assert pvector(range(size)).map(str) == pvector(str(i) for i in range(size))
+
+    calls = []
+    pvector(range(100)).map(calls.append)
+    assert calls == list(range(100))
+
+    def fail(x):
+        if x == 50:
+            raise ValueError(x)
+        return x
+
+    with pytest.raises(ValueError):
+        pvector(range(100)).map(fail)
+
+
+def test_bulk_operations_with_numpy_indices(pvector):
+    np = pytest.importorskip('numpy')
+    vec = pvector(range(100))
+    assert vec.take(np.array([3, 4, -1])) == pvector([3, 4, 99])
+    assert vec.mset_many(np.array([1, 2]), np.array([10, 20])).take([1, 2]) == pvector([10, 20])
+
+
+def test_sharing_vectors_between_threads(pvector):
+    # Exercises concurrent reference counting of shared nodes, most relevant on free-threaded builds
+    base = pvector(range(5000))
+    errors = []
+
+    def worker(seed):
+        try:
+            for i in range(300):
+                index = (seed * 7919 + i * 31) % 5000
+                changed = base.set(index, -1).append(seed)
+                e = changed.evolver()
+                e[0] = seed
+                e.extend([1, 2])
+                result = e.persistent()
+                assert result[index] == -1 or index == 0
+                assert result[0] == seed
+                assert len(result) == 5003
+                del changed, e, result
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert base == pvector(range(5000))
+
+
+@pytest.fixture
+def pvectorc():
+    if os.environ.get('PYRSISTENT_NO_C_EXTENSION'):
+        pytest.skip('Configured to not run tests for C extension')
+
+    return pytest.importorskip('pvectorc')
+
+
+def test_node_allocator_stats(pvectorc):
+    before = pvectorc.stats()
+    vector = pvectorc.pvector(range(2000))
+    vector.set(0, -1)
+    after = pvectorc.stats()
+
+    assert after['node_size'] > 32 * 4
+    assert after['allocations'] > before['allocations']
+    assert after['copies'] > before['copies']
+    assert after['live_nodes'] == after['allocations'] - after['frees']
+    assert after['cache_hits'] <= after['allocations']
+
+    live = after['live_nodes']
+    del vector
+    assert pvectorc.stats()['live_nodes'] < live
+
+
+def test_set_node_cache_size(pvectorc):
+    previous = pvectorc.set_node_cache_size(10)
+    try:
+        pvectorc.pvector(range(5000)).set(0, -1)
+        stats = pvectorc.stats()
+        assert stats['node_cache_size'] == 10
+        assert stats['cached_nodes'] <= 10
+
+        assert pvectorc.set_node_cache_size(0) == 10
+        assert pvectorc.stats()['cached_nodes'] == 0
+        assert pvectorc.pvector(range(100)).set(0, 1)[0] == 1
+
+        with pytest.raises(ValueError):
+            pvectorc.set_node_cache_size(-1)
+    finally:
+        pvectorc.set_node_cache_size(previous)
+
+
+def test_collect_nodes_only_visits_unseen_nodes(pvectorc):
+    seen = set()
+    elements = []
+    v1 = pvectorc.pvector(range(100))
+    assert v1._collect_nodes(seen, elements) == 5
+    assert sorted(elements) == list(range(100))
+
+    # Only the new root and the leaf holding the changed element are visited
+    del elements[:]
+    assert v1.set(0, -1)._collect_nodes(seen, elements) == 2
+    assert sorted(elements) == [-1] + list(range(1, 32))
+
+    assert v1._collect_nodes(seen, elements) == 0
+    assert len(elements) == 32